@@ -1,52 +1,147 @@
-from flask import Flask, request, jsonify, Response
+from flask import Flask, request, jsonify, Response, send_file
 from flask_cors import CORS
 from flask_pymongo import PyMongo
-from flask_jwt_extended import JWTManager, jwt_required, create_access_token, get_jwt_identity, get_jwt
+from flask_jwt_extended import JWTManager, jwt_required, create_access_token, get_jwt_identity, get_jwt, verify_jwt_in_request
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta
 import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from bson.objectid import ObjectId
+from bson.errors import InvalidId
+from pymongo import ReturnDocument, UpdateOne, monitoring
+from pymongo.errors import BulkWriteError, OperationFailure
 import csv
 from io import StringIO, BytesIO
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter      
 from reportlab.lib import colors
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
-import joblib
 from textblob import TextBlob
+from config import Config
+from serialization import json_response, parse_fields, compact_text
+from inference import predict_batch, needs_review, UNCATEGORIZED
+from model_registry import ModelRegistry, complaint_label, in_holdout
+from event_log import EventLog, MongoEventSink, FileEventSink
+from rate_limit import RateLimiter, LoadShedder, MemoryBucketStore, SQLiteBucketStore
+from retention import CollectionArchive, FileArchive, ROLLUP_ID, merge_rollup
+import profiling
+from profiling import stage, SamplingCoordinator
+from languages import LanguageDetector, LanguageModels, PROFILES, UNDETERMINED, lexicon_sentiment
+from priority import PriorityEngine, build_features
+from user_stats import UserStats, sweep_breaches, breached_on_resolve
+from retrain_policy import RetrainPolicy, recency_weights, lease_owner
+from train_model import SEED_TRAINING_DATA
 
 load_dotenv()
 
 app = Flask(__name__)
-CORS(app, origins=["http://localhost:3000"], supports_credentials=True)
+CORS(app, origins=Config.CORS_ORIGINS, supports_credentials=True)
 
-# Load ML model and vectorizer
-try:
-    model = joblib.load('model/complaint_classifier.joblib')
-    vectorizer = joblib.load('model/vectorizer.joblib')
-    print("ML model and vectorizer loaded successfully!")
-except Exception as e:
-    print(f"Error loading ML model: {e}")
-    model, vectorizer = None, None
+# Load ML model and vectorizer (active registry version, else the legacy pair)
+registry = ModelRegistry()
+model, vectorizer, model_version = None, None, None
+# Shadow-mode candidate, scored off the request path
+candidate_model, candidate_vectorizer, candidate_version = None, None, None
+# Language routing: detector fitted once per process, classifiers per language
+language_detector = LanguageDetector(default=Config.DEFAULT_LANGUAGE)
+language_models = LanguageModels(Config.MODEL_REGISTRY_DIR, Config.MODEL_RELOAD_INTERVAL)
+# Priority/SLA scoring for whole batches (rules table or learned model)
+priority_engine = PriorityEngine.from_config()
+_models_lock = threading.Lock()
+_models_checked_at = 0.0
+_models_state_mtime = None
 
-def predict_complaint_category(text):
-    if not model or not vectorizer:
-        return "uncategorized", 0.0
+def load_models():
+    """(Re)load the active model and the shadow candidate from the registry"""
+    global model, vectorizer, model_version, _models_state_mtime
+    global candidate_model, candidate_vectorizer, candidate_version
+    _models_state_mtime = registry.state_mtime()
+    try:
+        model, vectorizer, model_version = registry.load_active()
+        print(f"ML model and vectorizer loaded successfully! (version: {model_version or 'legacy'})")
+    except Exception as e:
+        print(f"Error loading ML model: {e}")
+        model, vectorizer, model_version = None, None, None
+    candidate_model, candidate_vectorizer = None, None
+    candidate_version = registry.state().get('candidate')
+    if candidate_version:
+        try:
+            candidate_model, candidate_vectorizer = registry.load(candidate_version)
+        except Exception as e:
+            print(f"Error loading candidate model {candidate_version}: {e}")
+            candidate_version = None
+load_models()
+
+def refresh_models():
+    """Pick up promotions/rollbacks made by other workers or the CLI (rate-limited stat)"""
+    global _models_checked_at
+    now = time.monotonic()
+    if now - _models_checked_at < Config.MODEL_RELOAD_INTERVAL:
+        return
+    with _models_lock:
+        _models_checked_at = now
+        if registry.state_mtime() != _models_state_mtime:
+            load_models()
+
+def classify_complaints(texts, language=None):
+    """Batch ML classification: category, confidence, top-k alternatives and model version per text"""
+    if language in (None, Config.DEFAULT_LANGUAGE):
+        refresh_models()
+        lang_model, lang_vectorizer, version = model, vectorizer, model_version
+    else:
+        lang_model, lang_vectorizer, version = language_models.get(language)
+    with stage('ml'):
+        results = predict_batch(lang_model, lang_vectorizer, texts, top_k=Config.TOP_K_CATEGORIES)
+    for result in results:
+        result['model_version'] = version
+    return results
+
+shadow_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='shadow')
+
+def shadow_score(docs):
+    """Queue a sample of new complaints for scoring by the candidate model"""
+    if candidate_model is None or Config.SHADOW_SAMPLE_RATE <= 0:
+        return
+    # The candidate is a default-language model
+    docs = [d for d in docs if d.get('language', Config.DEFAULT_LANGUAGE) == Config.DEFAULT_LANGUAGE]
+    sampled = [(d['_id'], d['text']) for d in docs if random.random() < Config.SHADOW_SAMPLE_RATE]
+    if sampled:
+        shadow_executor.submit(_score_with_candidate, candidate_model, candidate_vectorizer, candidate_version, sampled)
+
+def _score_with_candidate(shadow_model, shadow_vectorizer, version, items):
     try:
-        text_vector = vectorizer.transform([text])
-        category = model.predict(text_vector)[0]
-        confidence = model.predict_proba(text_vector).max()
-        return category, confidence
+        results = predict_batch(shadow_model, shadow_vectorizer, [text for _, text in items])
+        scored_at = datetime.now(timezone.utc)
+        for (cid, _), result in zip(items, results):
+            # Stored next to ml_category so the two can be compared offline
+            complaints_collection.update_one({'_id': ObjectId(cid)}, {'$set': {
+                f'shadow_predictions.{version}': {
+                    'category': result['category'],
+                    'confidence': result['confidence'],
+                    'scored_at': scored_at
+                }
+            }})
     except Exception as e:
-        print(f"Prediction error: {e}")
-        return "uncategorized", 0.0
+        print(f"Shadow scoring error: {e}")
+
+def predict_complaint_category(text):
+    result = classify_complaints([text])[0]
+    return result['category'], result['confidence']
 
-def analyze_sentiment(text):
-    """Analyze sentiment of complaint text"""
+def analyze_sentiment(text, language=None):
+    """Analyze sentiment of complaint text (TextBlob for English, else the language's lexicon)"""
     try:
-        blob = TextBlob(text)
-        polarity = blob.sentiment.polarity  # -1 (negative) to +1 (positive)
+        with stage('sentiment'):
+            lexicon = PROFILES.get(language or Config.DEFAULT_LANGUAGE, {}).get('lexicon')
+            if lexicon is None:
+                blob = TextBlob(text)
+                polarity = blob.sentiment.polarity  # -1 (negative) to +1 (positive)
+            else:
+                polarity = lexicon_sentiment(text, lexicon)
         
         if polarity < -0.3:
             sentiment = "negative"
@@ -63,51 +158,81 @@ def analyze_sentiment(text):
         print(f"Sentiment analysis error: {e}")
         return "neutral", 0.0, "😐"
 
-def calculate_priority(text, sentiment):
-    """Calculate priority based on text keywords and sentiment"""
-    text_lower = text.lower()
-    
-    # Define urgent keywords
-    critical_keywords = ['urgent', 'critical', 'emergency', 'immediately', 'asap']
-    high_keywords = ['broken', 'not working', 'damaged', 'failed', 'error']
-    
-    # Check for critical keywords
-    if any(keyword in text_lower for keyword in critical_keywords):
-        priority = "critical"
-        sla_hours = 4
-    # Check for high priority keywords
-    elif any(keyword in text_lower for keyword in high_keywords):
-        priority = "high"
-        sla_hours = 24
-    # Negative sentiment = high priority
-    elif sentiment == "negative":
-        priority = "high"
-        sla_hours = 24
-    # Positive sentiment = low priority
-    elif sentiment == "positive":
-        priority = "low"
-        sla_hours = 168  # 1 week
-    else:
-        priority = "medium"
-        sla_hours = 72  # 3 days
-    
-    # Calculate SLA deadline
-    from datetime import timedelta
-    sla_deadline = datetime.now(timezone.utc) + timedelta(hours=sla_hours)
-    
-    return priority, sla_hours, sla_deadline
+def calculate_priority(text, sentiment, language=None):
+    """Calculate priority based on text keywords (in the complaint's language) and sentiment"""
+    features = build_features([text], [sentiment], languages=[language or Config.DEFAULT_LANGUAGE])
+    priorities, hours, deadlines = priority_engine.assign(features)
+    return priorities[0], hours[0], deadlines[0]
 
 # MongoDB configuration
 app.config["MONGO_URI"] = os.getenv("MONGO_URI", "mongodb://localhost:27017/complaint_system")
-mongo = PyMongo(app)
+mongo = PyMongo()
 
 # JWT configuration
 app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY", "your-secret-key")
 jwt = JWTManager(app)
 
+# Audit trail: write-behind, flushed in batches off the request path
+if Config.EVENT_LOG_SINK == 'file':
+    _event_sink = FileEventSink(Config.EVENT_LOG_DIR)
+else:
+    _event_sink = MongoEventSink(lambda: audit_collection)
+event_log = EventLog(_event_sink, max_queue=Config.EVENT_LOG_QUEUE_SIZE, batch_size=Config.EVENT_LOG_BATCH_SIZE,
+                     flush_interval=Config.EVENT_LOG_FLUSH_INTERVAL)
+
+# Ingest protection: per-user/tenant token buckets and enrichment load shedding
+limiter = RateLimiter(
+    SQLiteBucketStore(Config.RATE_LIMIT_SQLITE_PATH) if Config.RATE_LIMIT_STORE == 'sqlite' else MemoryBucketStore(),
+    {
+        'create_complaint': Config.RATE_LIMIT_CREATE_COMPLAINT,
+        'create_complaint_tenant': Config.RATE_LIMIT_CREATE_COMPLAINT_TENANT,
+        'login': Config.RATE_LIMIT_LOGIN,
+    })
+shedder = LoadShedder(Config.SHED_MAX_INFLIGHT, Config.SHED_LATENCY_TARGET, Config.SHED_COOLDOWN)
+
+def too_many_requests(retry_after, message='Too many requests'):
+    return {'message': message, 'retry_after': retry_after}, 429, {'Retry-After': str(retry_after)}
+
+# Old resolved complaints moved out by retention.py; reads fall back here
+if Config.ARCHIVE_BACKEND == 'files':
+    archive = FileArchive(Config.ARCHIVE_DIR, lambda: archive_collection)
+else:
+    archive = CollectionArchive(lambda: archive_collection)
+
+# Driver-measured command time feeds the per-request 'mongo' stage; registered
+# globally so it also covers clients created after fork
+monitoring.register(profiling.MongoCommandTimer())
+sampler = SamplingCoordinator(Config.PROFILE_DIR, sample_interval=Config.PROFILE_SAMPLE_INTERVAL)
+
 # Collections
-users_collection = mongo.db.users
-complaints_collection = mongo.db.complaints
+def connect_db():
+    """(Re)create the Mongo client and collection handles.
+
+    MongoClient is not fork-safe, so prefork servers close the master's
+    client before forking (``close_db``) and call this again in each worker
+    (see gunicorn.conf.py).
+    """
+    global users_collection, complaints_collection, audit_collection, archive_collection, rollups_collection
+    global user_stats_collection, retrain_state_collection
+    mongo.init_app(app)
+    users_collection = mongo.db.users
+    complaints_collection = mongo.db.complaints
+    audit_collection = mongo.db.complaint_audit
+    archive_collection = mongo.db.complaints_archive
+    rollups_collection = mongo.db.complaint_rollups
+    user_stats_collection = mongo.db.user_stats
+    retrain_state_collection = mongo.db.retrain_state
+connect_db()
+
+def close_db():
+    """Close the client's pooled sockets and monitor threads (reopened on next use), so a
+    forked worker does not inherit copies of them"""
+    mongo.cx.close()
+# Per-user open/resolved/breached counters, updated with every complaint write
+user_stats = UserStats(lambda: user_stats_collection)
+# Feedback counters, retrain triggers and the cross-worker training lease
+retrain_policy = RetrainPolicy(lambda: retrain_state_collection, Config,
+                               lambda: complaints_collection.count_documents({'feedback_given': True}))
 
 # Ensure default admin user exists
 def setup_admin():
@@ -119,9 +244,62 @@ def setup_admin():
         users_collection.update_one({'username': 'admin'}, {'$set': {'password': hashed}})
 setup_admin()
 
+def ensure_indexes():
+    # Login lookups, user listing pages and username prefix search
+    try:
+        users_collection.create_index('username', unique=True)
+    except OperationFailure as e:
+        if e.code != 11000:
+            raise
+        # Existing duplicate usernames: start without the constraint rather than not at all
+        print(f"Unique username index not created, duplicate usernames exist: {e}")
+    # Review queue: pending low-confidence predictions ordered by confidence
+    complaints_collection.create_index([('needs_review', 1), ('feedback_given', 1), ('confidence', 1)])
+    # Audit trail, paged newest first per complaint
+    audit_collection.create_index([('complaint_id', 1), ('_id', -1)])
+    # "My complaints": one user's complaints, newest first
+    complaints_collection.create_index([('user', 1), ('created_at', -1)])
+    # Retention scan: old complaints by status
+    complaints_collection.create_index([('status', 1), ('created_at', 1)])
+    # Complaints stored raw under load, oldest first
+    complaints_collection.create_index([('enrichment_status', 1), ('created_at', 1)],
+                                       partialFilterExpression={'enrichment_status': {'$exists': True}})
+    # Retraining set: the newest feedback first
+    complaints_collection.create_index([('feedback_given', 1), ('feedback_date', -1)],
+                                       partialFilterExpression={'feedback_given': True})
+    if Config.EVENT_LOG_TTL_DAYS:
+        audit_collection.create_index('created_at', expireAfterSeconds=Config.EVENT_LOG_TTL_DAYS * 86400)
+ensure_indexes()
+
 def is_admin():
     return get_jwt().get('role') == 'admin'
 
+def is_admin_request():
+    """is_admin() outside a @jwt_required view (request hooks)"""
+    try:
+        verify_jwt_in_request()
+    except Exception:
+        return False
+    return is_admin()
+
+profiling.init_app(app, Config, is_admin_request)
+
+@app.before_request
+def _start_profile_watcher():
+    # Cheap pid check; the first request in each worker starts its sampler watcher
+    if Config.PROFILING_ENABLED:
+        sampler.ensure_watcher()
+
+@app.before_request
+def _start_breach_sweeper():
+    if Config.BREACH_SWEEP_INTERVAL:
+        ensure_breach_sweeper()
+
+@app.before_request
+def _start_deferred_enricher():
+    if Config.DEFERRED_ENRICH_INTERVAL:
+        ensure_deferred_enricher()
+
 # Register
 @app.route('/api/auth/register', methods=['POST'])
 def register():
@@ -141,36 +319,54 @@ def register():
 @app.route('/api/auth/login', methods=['POST'])
 def login():
     data = request.get_json(force=True)
+    # No identity yet: limit guesses per client address and username
+    retry_after = limiter.check(('login', f"{request.remote_addr}:{data.get('username')}"))
+    if retry_after:
+        return jsonify({'msg': 'Too many login attempts'}), 429, {'Retry-After': str(retry_after)}
     user = users_collection.find_one({'username': data.get('username')})
     if not user or not check_password_hash(user['password'], data.get('password')):
         return jsonify({'msg': 'Invalid credentials'}), 401
-    token = create_access_token(identity=user['username'], additional_claims={'role': user['role']})
+    claims = {'role': user['role']}
+    if user.get('tenant'):
+        claims['tenant'] = user['tenant']
+    token = create_access_token(identity=user['username'], additional_claims=claims)
     return jsonify({'token': token, 'role': user['role']})
 
 # CRUD: Complaints
+FILTER_FIELDS = ('category', 'status', 'sentiment', 'priority')
+
+def build_filter_query(args):
+    """Equality filter on the complaint list fields (list and bulk update)"""
+    return {field: args.get(field) for field in FILTER_FIELDS if args.get(field)}
+
+def parse_list_args(args, identity=None):
+    """Parse paging, filters and projection for the complaint list (shared with asgi.py)"""
+    page = int(args.get('page', 1))
+    per_page = int(args.get('per_page', 10))
+    query = build_filter_query(args)
+    # One user's complaints, served by the (user, created_at) index
+    if args.get('mine', '').lower() in ('1', 'true', 'yes'):
+        query['user'] = identity
+    elif args.get('user'):
+        query['user'] = args['user']
+    
+    # Optional projection pushed down to Mongo, e.g. fields=text,category,status
+    projection = parse_fields(args.get('fields'))
+    compact = args.get('compact', '').lower() in ('1', 'true', 'yes')
+    return page, per_page, query, projection, compact
+
 @app.route('/api/complaints', methods=['GET'])
 @jwt_required()
 def list_complaints():
-    page = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 10))
+    page, per_page, query, projection, compact = parse_list_args(request.args, get_jwt_identity())
     skip = (page - 1) * per_page
     
-    # Build filter query
-    query = {}
-    if request.args.get('category'):
-        query['category'] = request.args.get('category')
-    if request.args.get('status'):
-        query['status'] = request.args.get('status')
-    if request.args.get('sentiment'):
-        query['sentiment'] = request.args.get('sentiment')
-    if request.args.get('priority'):
-        query['priority'] = request.args.get('priority')
-    
     total = complaints_collection.count_documents(query)
-    complaints = list(complaints_collection.find(query).skip(skip).limit(per_page).sort('created_at', -1))
-    for c in complaints:
-        c['_id'] = str(c['_id'])
-    return jsonify({'complaints': complaints, 'total': total})
+    complaints = list(complaints_collection.find(query, projection).skip(skip).limit(per_page).sort('created_at', -1))
+    if compact:
+        for c in complaints:
+            compact_text(c, Config.COMPACT_TEXT_LENGTH)
+    return json_response({'complaints': complaints, 'total': total})
 
 @app.route('/api/complaints', methods=['POST'])
 @jwt_required()
@@ -179,80 +375,494 @@ def create_complaint():
     if not data or not data.get('text'):
         return jsonify({'message': 'Text required'}), 400
     
-    text = data['text']
-    user_selected_category = data.get('category')  # User's manual selection
-    
-    # ML Classification (for comparison/confidence)
-    ml_category, confidence = predict_complaint_category(text)
-    
-    # Use user-selected category if provided, otherwise use ML prediction
-    if user_selected_category and user_selected_category in ['billing', 'delivery', 'quality', 'service', 'technical']:
-        category = user_selected_category
-        # Mark as manually categorized
-        is_manual = True
-    else:
-        category = ml_category
-        is_manual = False
-    
-    # Sentiment Analysis
-    sentiment, sentiment_score, sentiment_emoji = analyze_sentiment(text)
-    
-    # Priority Calculation
-    priority, sla_hours, sla_deadline = calculate_priority(text, sentiment)
+    payload, status, headers = ingest_complaint(data['text'], get_jwt_identity(), data.get('category'),
+                                                get_jwt().get('tenant'))
+    return jsonify(payload), status, headers
+
+def ingest_complaint(text, user, user_selected_category=None, tenant=None):
+    """Rate-limit, then enrich and store a complaint, or shed it under load.
+
+    Returns ``(payload, status, headers)``; shared by the Flask and ASGI routes.
+    """
+    retry_after = limiter.check(('create_complaint', user), ('create_complaint_tenant', tenant))
+    if retry_after:
+        return too_many_requests(retry_after)
+    if Config.SHED_MODE != 'off' and shedder.overloaded():
+        shedder.shed()
+        if Config.SHED_MODE == 'reject':
+            return too_many_requests(shedder.retry_after(), 'Server busy, retry later')
+        doc = store_raw_complaint(text, user, user_selected_category)
+        return {'message': 'Accepted; classification deferred', 'complaint': doc}, 202, {}
+    with shedder.track():
+        doc = store_complaint(text, user, user_selected_category)
+    return {'message': 'Created', 'complaint': doc}, 201, {}
+
+def route_languages(detections):
+    """The language each ``(language, confidence)`` detection is enriched in.
+
+    Short English text often scores confidently for another language, so a
+    detection only leaves ``DEFAULT_LANGUAGE`` when it is confident, listed in
+    ``SUPPORTED_LANGUAGES`` and has a trained classifier; text in a script the
+    detector does not know stays undetermined.
+    """
+    routed = []
+    for language, confidence in detections:
+        if language not in (Config.DEFAULT_LANGUAGE, UNDETERMINED) and (
+                confidence < Config.LANGUAGE_MIN_CONFIDENCE or language not in Config.SUPPORTED_LANGUAGES
+                or language not in PROFILES or language_models.get(language)[0] is None):
+            language = Config.DEFAULT_LANGUAGE
+        routed.append(language)
+    return routed
+
+def build_complaint_docs(items, user):
+    """Run ML enrichment and build complaint documents (CPU-bound).
+
+    ``items`` is a list of ``(text, user_selected_category)`` pairs. Languages
+    are detected and routed for the whole batch, then each language's
+    classifier runs once on its share; complaints in an unknown script skip
+    the ML, sentiment and keyword stages and go to the review queue.
+    """
+    texts = [text for text, _ in items]
+    with stage('language'):
+        detections = language_detector.detect_batch(texts)
+        languages = route_languages(detections)
+    predictions = [None] * len(items)
+    groups = {}
+    for i, language in enumerate(languages):
+        if language != UNDETERMINED:
+            groups.setdefault(language, []).append(i)
+    for language, indices in groups.items():
+        for i, prediction in zip(indices, classify_complaints([texts[i] for i in indices], language)):
+            predictions[i] = prediction
+    docs = []
+    for (text, user_selected_category), prediction, language, (detected, language_confidence) in zip(
+            items, predictions, languages, detections):
+        supported = prediction is not None
+        if not supported:
+            prediction = {'category': UNCATEGORIZED, 'confidence': 0.0, 'top_categories': [], 'model_version': None}
+        ml_category, confidence = prediction['category'], prediction['confidence']
+        
+        # Use user-selected category if provided, otherwise use ML prediction
+        if user_selected_category and user_selected_category in Config.CATEGORIES:
+            category = user_selected_category
+            # Mark as manually categorized
+            is_manual = True
+        else:
+            category = ml_category
+            is_manual = False
+        
+        if supported:
+            # Sentiment Analysis
+            sentiment, sentiment_score, sentiment_emoji = analyze_sentiment(text, language)
+        else:
+            # No lexicon or keywords to apply: neutral, default SLA
+            sentiment, sentiment_score, sentiment_emoji = 'neutral', 0.0, '😐'
+        
+        doc = {
+            'user': user,
+            'text': text,
+            'category': category,
+            'ml_category': ml_category,  # Store ML prediction for comparison
+            'confidence': float(confidence),
+            'model_version': prediction['model_version'],
+            'top_categories': prediction['top_categories'],
+            'language': language,
+            'language_confidence': language_confidence,
+            'is_manual_category': is_manual,  # Track if user manually selected
+            # Uncertain ML predictions go to the admin review queue
+            'needs_review': not is_manual and needs_review(prediction, Config.LOW_CONFIDENCE_THRESHOLD),
+            'sentiment': sentiment,
+            'sentiment_score': float(sentiment_score),
+            'sentiment_emoji': sentiment_emoji,
+            'status': 'pending',
+            'created_at': datetime.now(timezone.utc),
+            'feedback_given': False  # For ML feedback loop
+        }
+        if detected != language:
+            doc['detected_language'] = detected
+        if not supported:
+            doc['enrichment_skipped'] = 'unsupported_language'
+        docs.append(doc)
     
+    # Priority Calculation, once for the whole batch (no keywords for unsupported languages)
+    with stage('priority'):
+        features = build_features(
+            [d['text'] if 'enrichment_skipped' not in d else '' for d in docs],
+            [d['sentiment'] for d in docs], [d['sentiment_score'] for d in docs],
+            [d['category'] for d in docs], [d['confidence'] for d in docs], [d['language'] for d in docs])
+        for doc, priority, sla_hours, sla_deadline in zip(docs, *priority_engine.assign(features)):
+            doc.update(priority=priority, sla_hours=sla_hours, sla_deadline=sla_deadline)
+    return docs
+
+def build_complaint_doc(text, user, user_selected_category=None):
+    return build_complaint_docs([(text, user_selected_category)], user)[0]
+
+def store_complaint(text, user, user_selected_category=None):
+    """Enrich and insert a complaint; returns the stored document with a string _id"""
+    doc = build_complaint_doc(text, user, user_selected_category)
+    result = complaints_collection.insert_one(doc)
+    user_stats.created([doc])
+    doc['_id'] = str(result.inserted_id)
+    event_log.record('create', result.inserted_id, user, category=doc['category'])
+    shadow_score([doc])
+    return doc
+
+def store_raw_complaint(text, user, user_selected_category=None):
+    """Insert a complaint without ML enrichment; the deferred enricher fills it in later"""
+    manual = user_selected_category in Config.CATEGORIES
     doc = {
-        'user': get_jwt_identity(),
+        'user': user,
         'text': text,
-        'category': category,
-        'ml_category': ml_category,  # Store ML prediction for comparison
-        'confidence': float(confidence),
-        'is_manual_category': is_manual,  # Track if user manually selected
-        'sentiment': sentiment,
-        'sentiment_score': float(sentiment_score),
-        'sentiment_emoji': sentiment_emoji,
-        'priority': priority,
-        'sla_hours': sla_hours,
-        'sla_deadline': sla_deadline,
+        'category': user_selected_category if manual else UNCATEGORIZED,
+        'is_manual_category': manual,
+        'requested_category': user_selected_category,
+        'enrichment_status': 'deferred',
+        'needs_review': False,
         'status': 'pending',
         'created_at': datetime.now(timezone.utc),
-        'feedback_given': False  # For ML feedback loop
+        'feedback_given': False
     }
     result = complaints_collection.insert_one(doc)
+    user_stats.created([doc])
     doc['_id'] = str(result.inserted_id)
-    return jsonify({'message': 'Created', 'complaint': doc}), 201
+    event_log.record('create', result.inserted_id, user, category=doc['category'], deferred=True)
+    if Config.DEFERRED_ENRICH_INTERVAL:
+        ensure_deferred_enricher()
+    return doc
+
+# Fields the enricher may overwrite; workflow fields set since creation are kept
+ENRICHMENT_FIELDS = ('ml_category', 'confidence', 'model_version', 'top_categories',
+                     'needs_review', 'sentiment', 'sentiment_score', 'sentiment_emoji', 'priority', 'sla_hours',
+                     'sla_deadline', 'language', 'language_confidence', 'detected_language', 'enrichment_skipped')
+# Only written while the category is still the one set at creation, so a re-categorisation wins
+CATEGORY_FIELDS = ('category', 'is_manual_category')
+DEFERRED_CLAIM_TIMEOUT = timedelta(minutes=5)
+
+def enrich_deferred(limit=None):
+    """Enrich up to ``limit`` raw complaints in one batch; returns how many were processed"""
+    now = datetime.now(timezone.utc)
+    claimed = []
+    for _ in range(limit or Config.DEFERRED_ENRICH_BATCH):
+        # Claim one at a time so concurrent workers never enrich the same complaint;
+        # claims abandoned by a dead worker are picked up again after a timeout
+        doc = complaints_collection.find_one_and_update(
+            {'$or': [{'enrichment_status': 'deferred'},
+                     {'enrichment_status': 'processing', 'enrichment_claimed_at': {'$lt': now - DEFERRED_CLAIM_TIMEOUT}}]},
+            {'$set': {'enrichment_status': 'processing', 'enrichment_claimed_at': now}},
+            projection={'text': 1, 'user': 1, 'requested_category': 1},
+            sort=[('created_at', 1)])
+        if not doc:
+            break
+        claimed.append(doc)
+    if not claimed:
+        return 0
+    enriched = build_complaint_docs([(d['text'], d.get('requested_category')) for d in claimed], None)
+    updates = []
+    for d, e in zip(claimed, enriched):
+        requested = d.get('requested_category')
+        initial = requested if requested in Config.CATEGORIES else UNCATEGORIZED
+        updates.append(UpdateOne({'_id': d['_id'], 'category': initial},
+                                 {'$set': {field: e[field] for field in CATEGORY_FIELDS}}))
+        updates.append(UpdateOne({'_id': d['_id']}, {
+            '$set': {field: e[field] for field in ENRICHMENT_FIELDS if field in e},
+            '$unset': {'enrichment_status': '', 'enrichment_claimed_at': '', 'requested_category': ''},
+        }))
+    complaints_collection.bulk_write(updates, ordered=False)
+    for d, e in zip(claimed, enriched):
+        event_log.record('enrich', d['_id'], d.get('user'), category=e['category'])
+    shadow_score([{'_id': str(d['_id']), 'text': d['text']} for d in claimed])
+    return len(claimed)
+
+_deferred_enricher_pid = None
+_deferred_enricher_lock = threading.Lock()
+
+def ensure_deferred_enricher():
+    """Start this process's background enricher (once per worker, so complaints deferred by a
+    worker that has since exited are still picked up; claims keep workers from overlapping)"""
+    global _deferred_enricher_pid
+    if _deferred_enricher_pid == os.getpid():
+        return
+    with _deferred_enricher_lock:
+        if _deferred_enricher_pid == os.getpid():
+            return
+        _deferred_enricher_pid = os.getpid()
+        threading.Thread(target=_run_deferred_enricher, name='deferred-enricher', daemon=True).start()
+
+def _run_deferred_enricher():
+    while True:
+        time.sleep(Config.DEFERRED_ENRICH_INTERVAL)
+        if shedder.overloaded():
+            continue
+        try:
+            # Not tracked by the shedder: a large batch is expected to take longer than one request
+            enrich_deferred()
+        except Exception as e:
+            print(f"Deferred enrichment error: {e}")
+
+_breach_sweeper_pid = None
+_breach_sweeper_lock = threading.Lock()
+
+def ensure_breach_sweeper():
+    """Start this process's SLA breach sweeper (once per worker; sweeps in several workers are safe)"""
+    global _breach_sweeper_pid
+    if _breach_sweeper_pid == os.getpid():
+        return
+    with _breach_sweeper_lock:
+        if _breach_sweeper_pid == os.getpid():
+            return
+        _breach_sweeper_pid = os.getpid()
+        threading.Thread(target=_run_breach_sweeper, name='breach-sweeper', daemon=True).start()
+
+def _run_breach_sweeper():
+    while True:
+        time.sleep(Config.BREACH_SWEEP_INTERVAL)
+        try:
+            sweep_breaches(complaints_collection, user_stats)
+        except Exception as e:
+            print(f"Breach sweep error: {e}")
+
+@app.route('/api/complaints/stats', methods=['GET'])
+@jwt_required()
+def complaint_stats():
+    """Open/resolved/breached counters for the caller, or for ``user=`` (admins only)"""
+    user = request.args.get('user') or get_jwt_identity()
+    if user != get_jwt_identity() and not is_admin():
+        return jsonify({'message': 'Unauthorized'}), 403
+    return jsonify(dict(user_stats.get(user), user=user))
 
 @app.route('/api/complaints/<cid>', methods=['GET'])
 @jwt_required()
 def get_complaint(cid):
-    complaint = complaints_collection.find_one({'_id': ObjectId(cid)})
+    projection = parse_fields(request.args.get('fields'))
+    complaint = complaints_collection.find_one({'_id': ObjectId(cid)}, projection)
+    if not complaint:
+        complaint = find_archived(ObjectId(cid), projection)
     if not complaint:
         return jsonify({'message': 'Not found'}), 404
-    complaint['_id'] = str(complaint['_id'])
-    return jsonify(complaint)
+    return json_response(complaint)
+
+def find_archived(cid, projection=None):
+    """An archived complaint, flagged as such, or None (shared with asgi.py)"""
+    complaint = archive.find(cid, projection)
+    if complaint:
+        complaint['archived'] = True
+    return complaint
 
 @app.route('/api/complaints/<cid>', methods=['PUT'])
 @jwt_required()
 def update_complaint(cid):
     data = request.get_json(force=True)
-    if 'category' not in data or 'status' not in data:
-        return jsonify({'message': 'Category and status required'}), 400
-    complaints_collection.update_one({'_id': ObjectId(cid)}, {'$set': {
-        'category': data['category'],
-        'status': data['status'],
-        'updated_at': datetime.now(timezone.utc)
-    }})
-    updated = complaints_collection.find_one({'_id': ObjectId(cid)})
+    changes, error = parse_complaint_changes(data)
+    if error:
+        return jsonify({'message': error}), 400
+    # Single round-trip; the pre-image gives the audit trail its previous values
+    now = datetime.now(timezone.utc)
+    previous = complaints_collection.find_one_and_update(
+        {'_id': ObjectId(cid)}, {'$set': dict(changes, updated_at=now)},
+        return_document=ReturnDocument.BEFORE)
+    if not previous:
+        return jsonify({'message': 'Complaint not found'}), 404
+    updated = dict(previous, **changes)
+    if breached_on_resolve(previous, changes, now):
+        complaints_collection.update_one({'_id': previous['_id']}, {'$set': {'sla_breached': True, 'sla_breached_at': now}})
+        updated.update(sla_breached=True, sla_breached_at=now)
+    user_stats.apply([(previous.get('user'), previous, updated)])
+    event_log.record('update', previous['_id'], get_jwt_identity(),
+                     previous={field: previous.get(field) for field in changes}, changes=changes)
     updated['_id'] = str(updated['_id'])
     return jsonify(updated)
 
+def parse_complaint_changes(data):
+    """Validated category/status changes from a request body; returns (changes, error)"""
+    changes = {field: data[field] for field in ('category', 'status') if data and data.get(field)}
+    if not changes:
+        return None, 'Category or status required'
+    # Also keeps rollup and counter paths (``categories.<value>``) well-formed
+    if 'category' in changes and changes['category'] not in Config.CATEGORIES:
+        return None, f"Category must be one of {', '.join(Config.CATEGORIES)}"
+    if 'status' in changes and changes['status'] not in Config.COMPLAINT_STATUSES:
+        return None, f"Status must be one of {', '.join(Config.COMPLAINT_STATUSES)}"
+    return changes, None
+
+def _batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+# What bulk updates read per complaint: the audit's previous values and the counter deltas
+BULK_PROJECTION = {'category': 1, 'status': 1, 'user': 1, 'sla_deadline': 1, 'sla_breached': 1}
+BULK_UPDATE_ATTEMPTS = 3
+
+def bulk_update(targets, changes, query, user, batch_size=None):
+    """Apply ``changes`` to the complaints in ``targets`` in bounded update_many batches.
+
+    ``targets`` yields ``BULK_PROJECTION`` documents; the previous values go
+    into the audit trail, written synchronously with one batched insert per
+    batch. Each update_many re-applies ``query`` and pins the values that
+    were read, so the audit and the per-user counter deltas always match
+    the pre-image. Complaints changed concurrently are re-read and retried;
+    ones that no longer match ``query`` are left alone (and not audited).
+    """
+    batch_size = batch_size or Config.BULK_UPDATE_BATCH_SIZE
+    now = datetime.now(timezone.utc)
+    update = {'$set': dict(changes, updated_at=now)}
+    pinned = list(changes) + (['sla_breached'] if 'status' in changes else [])
+    bulk_id = ObjectId()
+    counts = {'matched': 0, 'modified': 0, 'batches': 0, 'audited': 0}
+    for batch in _batched(targets, batch_size):
+        counts['batches'] += 1
+        applied = []
+        for _ in range(BULK_UPDATE_ATTEMPTS):
+            missed = []
+            for group in _group_by_pinned(batch, pinned):
+                result = complaints_collection.update_many(
+                    dict(query, _id={'$in': [doc['_id'] for doc in group]}, **_pinned_filter(group[0], pinned)), update)
+                counts['matched'] += result.matched_count
+                counts['modified'] += result.modified_count
+                done = group if result.matched_count == len(group) else _applied(group, now)
+                applied.extend(done)
+                if len(done) < len(group):
+                    done_ids = {doc['_id'] for doc in done}
+                    missed.extend(doc['_id'] for doc in group if doc['_id'] not in done_ids)
+            if not missed:
+                break
+            # Changed since it was read: retry with the current values if it still matches the query
+            batch = list(complaints_collection.find(dict(query, _id={'$in': missed}), BULK_PROJECTION))
+            if not batch:
+                break
+        batch = applied
+        if 'status' in changes:
+            _bulk_update_user_stats(batch, changes, now)
+        audit = []
+        for doc in batch:
+            previous = {field: doc.get(field) for field in changes}
+            if previous != changes:
+                audit.append({
+                    '_id': ObjectId(),
+                    'complaint_id': doc['_id'],
+                    'action': 'bulk_update',
+                    'bulk_id': bulk_id,
+                    'previous': previous,
+                    'changes': changes,
+                    'user': user,
+                    'created_at': now,
+                })
+        # Audited with its own batch, so a failure later on never loses the trail of what was applied
+        if audit:
+            event_log.sink.write(audit)
+        counts['audited'] += len(audit)
+    counts['bulk_id'] = str(bulk_id)
+    return counts
+
+def _group_by_pinned(batch, pinned):
+    groups = {}
+    for doc in batch:
+        key = tuple(bool(doc.get(field)) if field == 'sla_breached' else doc.get(field) for field in pinned)
+        groups.setdefault(key, []).append(doc)
+    return groups.values()
+
+def _pinned_filter(doc, pinned):
+    """Match only complaints still holding the values read from ``doc``"""
+    conditions = {field: doc.get(field) for field in pinned if field != 'sla_breached'}
+    if 'sla_breached' in pinned:
+        conditions['sla_breached'] = True if doc.get('sla_breached') else {'$ne': True}
+    return conditions
+
+def _applied(batch, now):
+    """The complaints of ``batch`` that this bulk update matched; its updated_at identifies them"""
+    applied = {d['_id'] for d in complaints_collection.find(
+        {'_id': {'$in': [doc['_id'] for doc in batch]}, 'updated_at': now}, {'_id': 1})}
+    return [doc for doc in batch if doc['_id'] in applied]
+
+def _bulk_update_user_stats(batch, changes, now):
+    """Per-user counter deltas for a bulk status change of the complaints in ``batch``"""
+    late = [doc['_id'] for doc in batch if breached_on_resolve(doc, changes, now)]
+    if late:
+        complaints_collection.update_many({'_id': {'$in': late}},
+                                          {'$set': {'sla_breached': True, 'sla_breached_at': now}})
+    late = set(late)
+    user_stats.apply([(doc.get('user'), doc, dict(doc, **changes, sla_breached=doc.get('sla_breached') or doc['_id'] in late))
+                      for doc in batch])
+
+@app.route('/api/complaints/bulk', methods=['POST'])
+@jwt_required()
+def bulk_update_complaints():
+    """Set category and/or status on many complaints, selected by ``ids`` or a ``filter``"""
+    if not is_admin():
+        return jsonify({'message': 'Unauthorized'}), 403
+    data = request.get_json(force=True) or {}
+    changes, error = parse_complaint_changes(data)
+    if error:
+        return jsonify({'message': error}), 400
+    if ('ids' in data) == ('filter' in data):
+        return jsonify({'message': 'Provide either ids or filter'}), 400
+
+    if 'ids' in data:
+        try:
+            ids = list(dict.fromkeys(ObjectId(cid) for cid in data['ids']))
+        except (InvalidId, TypeError):
+            return jsonify({'message': 'Invalid complaint id'}), 400
+        query = {}
+        # Look the ids up in bounded chunks too; missing ones simply don't match
+        targets = (doc for chunk in _batched(ids, Config.BULK_UPDATE_BATCH_SIZE)
+                   for doc in complaints_collection.find({'_id': {'$in': chunk}}, BULK_PROJECTION))
+    else:
+        query = build_filter_query(data['filter'] if isinstance(data['filter'], dict) else {})
+        if not query:
+            return jsonify({'message': f"Filter must set one of {', '.join(FILTER_FIELDS)}"}), 400
+        targets = complaints_collection.find(query, BULK_PROJECTION).batch_size(Config.BULK_UPDATE_BATCH_SIZE)
+
+    counts = bulk_update(targets, changes, query, get_jwt_identity())
+    if 'ids' in data:
+        counts['not_found'] = len(ids) - counts['matched']
+    return jsonify(counts)
+
 @app.route('/api/complaints/<cid>', methods=['DELETE'])
 @jwt_required()
 def delete_complaint(cid):
-    result = complaints_collection.delete_one({'_id': ObjectId(cid)})
-    if result.deleted_count == 0:
+    deleted = complaints_collection.find_one_and_delete(
+        {'_id': ObjectId(cid)}, projection={'user': 1, 'status': 1, 'sla_breached': 1})
+    if not deleted:
         return jsonify({'message': 'Not found'}), 404
+    user_stats.deleted([deleted])
+    event_log.record('delete', cid, get_jwt_identity())
     return jsonify({'message': 'Deleted'})
 
+@app.route('/api/complaints/<cid>/history', methods=['GET'])
+@jwt_required()
+def complaint_history(cid):
+    """Audit events for one complaint, newest first; page with ``before=<next>``"""
+    if not is_admin():
+        return jsonify({'message': 'Unauthorized'}), 403
+    limit = min(int(request.args.get('limit', 50)), 200)
+    try:
+        before = ObjectId(request.args['before']) if request.args.get('before') else None
+        complaint_id = ObjectId(cid)
+    except InvalidId:
+        return jsonify({'message': 'Invalid id'}), 400
+    events = event_log.history(complaint_id, before, limit)
+    next_cursor = str(events[-1]['_id']) if len(events) == limit else None
+    return json_response({'events': events, 'next': next_cursor})
+
+# Low-confidence review queue
+@app.route('/api/complaints/review', methods=['GET'])
+@jwt_required()
+def review_queue():
+    """Uncertain ML predictions awaiting admin feedback, least confident first"""
+    if not is_admin():
+        return jsonify({'message': 'Unauthorized'}), 403
+    page = int(request.args.get('page', 1))
+    per_page = int(request.args.get('per_page', 10))
+    query = {'needs_review': True, 'feedback_given': False}
+    total = complaints_collection.count_documents(query)
+    complaints = list(complaints_collection.find(query).sort('confidence', 1).skip((page - 1) * per_page).limit(per_page))
+    return json_response({'complaints': complaints, 'total': total, 'threshold': Config.LOW_CONFIDENCE_THRESHOLD})
+
 # ML Feedback Loop
 @app.route('/api/complaints/<cid>/feedback', methods=['POST'])
 @jwt_required()
@@ -265,14 +875,10 @@ def add_feedback(cid):
     is_correct = data.get('is_correct', True)
     correct_category = data.get('correct_category')
     
-    # Get the complaint
-    complaint = complaints_collection.find_one({'_id': ObjectId(cid)})
-    if not complaint:
-        return jsonify({'message': 'Complaint not found'}), 404
-    
     # Update complaint with feedback
     update_data = {
         'feedback_given': True,
+        'needs_review': False,
         'feedback_is_correct': is_correct,
         'feedback_date': datetime.now(timezone.utc)
     }
@@ -280,90 +886,174 @@ def add_feedback(cid):
     if not is_correct and correct_category:
         update_data['feedback_category'] = correct_category
     
-    complaints_collection.update_one(
+    # The pre-image tells a first feedback from a re-submission
+    complaint = complaints_collection.find_one_and_update(
         {'_id': ObjectId(cid)},
-        {'$set': update_data}
+        {'$set': update_data},
+        projection={'ml_category': 1, 'feedback_given': 1, 'feedback_is_correct': 1},
+        return_document=ReturnDocument.BEFORE
     )
+    if not complaint:
+        return jsonify({'message': 'Complaint not found'}), 404
+    event_log.record('feedback', complaint['_id'], get_jwt_identity(), is_correct=is_correct,
+                     previous={'category': complaint.get('ml_category')}, correct_category=correct_category)
     
-    # Check if we should retrain
-    feedback_count = complaints_collection.count_documents({'feedback_given': True})
-    
-    if feedback_count >= 50 and feedback_count % 10 == 0:  # Retrain every 10 feedbacks after 50
-        try:
-            retrain_model()
-            return jsonify({
-                'message': 'Feedback recorded and model retrained!',
-                'feedback_count': feedback_count
-            }), 200
-        except Exception as e:
-            print(f"Retraining error: {e}")
-            return jsonify({
-                'message': 'Feedback recorded but retraining failed',
-                'error': str(e)
-            }), 200
-    
+    # Incremental counters decide whether to retrain; training runs in the background
+    state = retrain_policy.record_feedback(complaint, is_correct)
+    reason = maybe_retrain(state)
     return jsonify({
-        'message': 'Feedback recorded successfully',
-        'feedback_count': feedback_count
+        'message': 'Feedback recorded; retraining started' if reason else 'Feedback recorded successfully',
+        'feedback_count': state.get('total_feedback', 0),
+        'retrain': reason
     }), 200
 
-def retrain_model():
-    """Retrain ML model with feedback data"""
-    global model, vectorizer
-    
-    # Get all complaints with feedback where prediction was wrong
-    feedback_data = list(complaints_collection.find({
-        'feedback_given': True,
-        'feedback_is_correct': False,
-        'feedback_category': {'$exists': True}
-    }))
+retrain_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='retrain')
+
+def maybe_retrain(state=None, reason=None):
+    """Start a background retrain if the policy fires and no run is in flight anywhere; returns the reason"""
+    reason = reason or retrain_policy.should_retrain(state)
+    if not reason:
+        return None
+    owner = lease_owner()
+    snapshot = retrain_policy.try_acquire(owner, force=reason == 'manual')
+    if snapshot is None:
+        return None  # coalesced into the run already in flight, or backing off after a failure
+    retrain_executor.submit(_run_retrain, owner, snapshot, reason)
+    return reason
+
+def _run_retrain(owner, snapshot, reason):
+    try:
+        version = retrain_model(reason)
+        error = None if version else 'not enough feedback samples'
+    except Exception as e:
+        print(f"Retraining error: {e}")
+        version, error = None, str(e)
+    if version:
+        retrain_policy.complete(owner, snapshot, version, reason)
+    else:
+        retrain_policy.fail(owner, error)
+
+def retrain_model(reason=None):
+    """Retrain ML model on confirmed feedback, recent feedback weighted more; returns the new version"""
+    # Corrected and confirmed-correct predictions, newest first, minus the evaluation holdout
+    feedback_data = list(complaints_collection.find(
+        {'feedback_given': True},
+        {'text': 1, 'ml_category': 1, 'feedback_given': 1, 'feedback_is_correct': 1, 'feedback_category': 1,
+         'feedback_date': 1}
+    ).sort('feedback_date', -1).limit(Config.RETRAIN_MAX_SAMPLES))
+    samples = [(doc['text'], complaint_label(doc), doc.get('feedback_date'))
+               for doc in feedback_data if doc.get('text') and complaint_label(doc)
+               and not in_holdout(doc['_id'], Config.HOLDOUT_EVERY)]
     
-    if len(feedback_data) < 10:
-        print(f"Not enough feedback data for retraining: {len(feedback_data)} samples")
-        return
+    if len(samples) < Config.RETRAIN_MIN_SAMPLES:
+        print(f"Not enough feedback data for retraining: {len(samples)} samples")
+        return None
     
     # Prepare training data
-    texts = []
-    labels = []
-    
-    for doc in feedback_data:
-        texts.append(doc['text'])
-        labels.append(doc['feedback_category'])
+    texts = [text for text, _, _ in samples]
+    labels = [label for _, label, _ in samples]
+    weights = list(recency_weights([date for _, _, date in samples], datetime.now(timezone.utc),
+                                   Config.RETRAIN_HALF_LIFE_DAYS))
     
     # Also include original training data
-    original_training = [
-        ("The product arrived damaged", "delivery"),
-        ("The quality is poor", "quality"),
-        ("I was charged twice", "billing"),
-        ("The website is not working", "technical"),
-        ("The service was excellent", "service")
-    ]
-    
-    for text, label in original_training:
+    for text, label in SEED_TRAINING_DATA:
         texts.append(text)
         labels.append(label)
+        weights.append(1.0)
     
     # Retrain
     from sklearn.feature_extraction.text import TfidfVectorizer
     from sklearn.linear_model import LogisticRegression
     
+    fit_started = time.perf_counter()
     new_vectorizer = TfidfVectorizer()
     X = new_vectorizer.fit_transform(texts)
     
     new_model = LogisticRegression(max_iter=1000)
-    new_model.fit(X, labels)
+    new_model.fit(X, labels, sample_weight=weights)
+    fit_seconds = time.perf_counter() - fit_started
     
-    # Save updated models
-    joblib.dump(new_model, 'model/complaint_classifier.joblib')
-    joblib.dump(new_vectorizer, 'model/vectorizer.joblib')
-    
-    # Update global variables
-    model = new_model
-    vectorizer = new_vectorizer
+    # Register as a new version instead of overwriting the served artifacts
+    version = registry.register(new_model, new_vectorizer, training_size=len(texts), fit_seconds=fit_seconds,
+                                sample_texts=texts, source='feedback-retrain',
+                                extra={'retrain_reason': reason, 'half_life_days': Config.RETRAIN_HALF_LIFE_DAYS,
+                                       'holdout_every': Config.HOLDOUT_EVERY})
+    if Config.AUTO_PROMOTE_RETRAINED:
+        registry.promote(version)
+    else:
+        registry.set_candidate(version)
+    load_models()
+    event_log.record('retrain', version=version, training_size=len(texts),
+                     promoted=Config.AUTO_PROMOTE_RETRAINED, reason=reason)
     
     print(f"✅ Model retrained with {len(texts)} samples!")
+    return version
+
+@app.route('/api/admin/retrain', methods=['GET'])
+@jwt_required()
+def retrain_status():
+    """Retraining counters, last run and whether a run holds the lease"""
+    if not is_admin():
+        return jsonify({'message': 'Unauthorized'}), 403
+    return json_response(retrain_policy.status())
+
+@app.route('/api/admin/retrain', methods=['POST'])
+@jwt_required()
+def trigger_retrain():
+    if not is_admin():
+        return jsonify({'message': 'Unauthorized'}), 403
+    if not maybe_retrain(reason='manual'):
+        return jsonify({'message': 'A retraining run is already in progress'}), 409
+    return jsonify({'message': 'Retraining started'}), 202
+
+# Model registry
+@app.route('/api/admin/models', methods=['GET'])
+@jwt_required()
+def list_models():
+    if not is_admin():
+        return jsonify({'message': 'Unauthorized'}), 403
+    return jsonify({'state': registry.state(), 'versions': registry.versions()})
+
+# Profiling
+@app.route('/api/admin/profile/sample', methods=['POST'])
+@jwt_required()
+def sample_profile():
+    """Sample stacks in every worker for N seconds; returns flamegraph-ready collapsed stacks"""
+    if not is_admin():
+        return jsonify({'message': 'Unauthorized'}), 403
+    if not Config.PROFILING_ENABLED:
+        return jsonify({'message': 'Profiling is disabled'}), 404
+    data = request.get_json(silent=True) or {}
+    seconds = min(max(float(data.get('seconds', request.args.get('seconds', 10))), 0.1), Config.PROFILE_MAX_SECONDS)
+    profile_id, until = sampler.request(seconds)
+    stacks, workers = sampler.collect(profile_id, until)
+    return Response(stacks, mimetype='text/plain', headers={
+        'X-Profile-Workers': str(workers),
+        'Content-Disposition': f'attachment; filename=profile-{profile_id}.collapsed',
+    })
+
+@app.route('/api/admin/profiles/<profile_id>', methods=['GET'])
+@jwt_required()
+def get_request_profile(profile_id):
+    """cProfile stats of an X-Profile request: text summary, or ?format=prof for the raw file"""
+    if not is_admin():
+        return jsonify({'message': 'Unauthorized'}), 403
+    fmt = request.args.get('format', 'text')
+    result = profiling.request_profile(Config.PROFILE_DIR, profile_id, fmt)
+    if result is None:
+        return jsonify({'message': 'Not found'}), 404
+    if fmt == 'prof':
+        return send_file(result, mimetype='application/octet-stream', as_attachment=True,
+                         download_name=f'{profile_id}.prof')
+    return Response(result, mimetype='text/plain')
 
 # Dashboard
+CATEGORY_PIPELINE = [{'$group': {'_id': '$category', 'count': {'$sum': 1}}}]
+STATUS_PIPELINE = [{'$group': {'_id': '$status', 'count': {'$sum': 1}}}]
+
+def recent_complaints_query(days=7):
+    return {'created_at': {'$gte': datetime.now(timezone.utc) - timedelta(days=days)}}
+
 @app.route('/api/dashboard/summary', methods=['GET'])
 @jwt_required()
 def dashboard_summary():
@@ -371,21 +1061,17 @@ def dashboard_summary():
         total_complaints = complaints_collection.count_documents({})
         
         # Categories distribution
-        categories = list(complaints_collection.aggregate([
-            {'$group': {'_id': '$category', 'count': {'$sum': 1}}}
-        ]))
+        categories = list(complaints_collection.aggregate(CATEGORY_PIPELINE))
         
         # Status distribution
-        statuses = list(complaints_collection.aggregate([
-            {'$group': {'_id': '$status', 'count': {'$sum': 1}}}
-        ]))
+        statuses = list(complaints_collection.aggregate(STATUS_PIPELINE))
         
         # Recent complaints (last 7 days)
-        from datetime import timedelta
-        seven_days_ago = datetime.now(timezone.utc) - timedelta(days=7)
-        recent_count = complaints_collection.count_documents({
-            'created_at': {'$gte': seven_days_ago}
-        })
+        recent_count = complaints_collection.count_documents(recent_complaints_query())
+        
+        # Archived complaints are counted from the retention rollup
+        total_complaints, categories, statuses = merge_rollup(
+            total_complaints, categories, statuses, rollups_collection.find_one({'_id': ROLLUP_ID}))
         
         return jsonify({
             'total_complaints': total_complaints,
@@ -398,16 +1084,91 @@ def dashboard_summary():
         return jsonify({'message': 'Error fetching dashboard data'}), 500
 
 # Admin - User Management
+def username_prefix_range(prefix):
+    """Index range on ``username`` matching every name that starts with ``prefix``"""
+    return {'$gte': prefix, '$lt': prefix + '\U0010ffff'}
+
 @app.route('/api/admin/users', methods=['GET'])
 @jwt_required()
 def get_users():
+    """Users ordered by username; ``q`` is a prefix search, page with ``after=<next>``"""
     if not is_admin():
         return jsonify({'message': 'Unauthorized'}), 403
     
-    users = list(users_collection.find({}, {'password': 0}))
-    for user in users:
-        user['_id'] = str(user['_id'])
-    return jsonify(users)
+    limit = max(1, min(int(request.args.get('limit', Config.USER_PAGE_SIZE)), Config.USER_PAGE_MAX))
+    bounds = username_prefix_range(request.args['q']) if request.args.get('q') else {}
+    if request.args.get('after'):
+        bounds['$gt'] = request.args['after']
+    query = {'username': bounds} if bounds else {}
+    if request.args.get('role'):
+        query['role'] = request.args['role']
+    
+    users = list(users_collection.find(query, {'password': 0}).sort('username', 1).limit(limit))
+    next_cursor = users[-1]['username'] if len(users) == limit else None
+    return json_response({'users': users, 'next': next_cursor})
+
+password_hash_executor = ThreadPoolExecutor(max_workers=Config.PASSWORD_HASH_WORKERS, thread_name_prefix='hash')
+
+def provision_users(entries):
+    """Create users in one unordered insert, hashing their passwords in parallel"""
+    invalid, seen, valid = [], set(), []
+    for entry in entries:
+        if not isinstance(entry, dict):
+            invalid.append(None)
+            continue
+        username, password = entry.get('username'), entry.get('password')
+        if (not isinstance(username, str) or not username or not isinstance(password, str) or not password
+                or entry.get('role', 'user') not in ('user', 'admin') or username in seen):
+            invalid.append(username)
+            continue
+        seen.add(username)
+        valid.append(entry)
+    if not valid:
+        return {'created': 0, 'existing': [], 'invalid': invalid}
+    hashes = password_hash_executor.map(generate_password_hash, [e['password'] for e in valid])
+    now = datetime.now(timezone.utc)
+    users = []
+    for entry, password_hash in zip(valid, hashes):
+        user = {'username': entry['username'], 'password': password_hash, 'role': entry.get('role', 'user'),
+                'created_at': now}
+        if entry.get('tenant'):
+            user['tenant'] = entry['tenant']
+        users.append(user)
+    existing = []
+    try:
+        users_collection.insert_many(users, ordered=False)
+    except BulkWriteError as e:
+        # The unique username index rejects accounts that already exist
+        errors = e.details.get('writeErrors', [])
+        if any(err.get('code') != 11000 for err in errors):
+            raise
+        existing = [users[err['index']]['username'] for err in errors]
+    return {'created': len(users) - len(existing), 'existing': existing, 'invalid': invalid}
+
+def deprovision_users(usernames, keep):
+    """Delete users by name in one round trip (never ``keep``, the admin making the call)"""
+    names = [name for name in usernames if isinstance(name, str) and name != keep]
+    if not names:
+        return 0
+    return users_collection.delete_many({'username': {'$in': names}}).deleted_count
+
+@app.route('/api/admin/users/bulk', methods=['POST'])
+@jwt_required()
+def bulk_users():
+    """Provision (``create``: [{username, password, role, tenant}]) and/or deprovision (``delete``: [username])"""
+    if not is_admin():
+        return jsonify({'message': 'Unauthorized'}), 403
+    
+    data = request.get_json(force=True) or {}
+    create, delete = data.get('create') or [], data.get('delete') or []
+    if not isinstance(create, list) or not isinstance(delete, list) or not (create or delete):
+        return jsonify({'message': 'Provide a create and/or delete list'}), 400
+    if len(create) + len(delete) > Config.USER_BULK_MAX:
+        return jsonify({'message': f"At most {Config.USER_BULK_MAX} users per request"}), 400
+    
+    result = provision_users(create) if create else {'created': 0, 'existing': [], 'invalid': []}
+    result['deleted'] = deprovision_users(delete, get_jwt_identity()) if delete else 0
+    return jsonify(result)
 
 @app.route('/api/admin/users', methods=['POST'])
 @jwt_required()
@@ -450,6 +1211,8 @@ def update_user(user_id):
     
     update_data = {}
     if data.get('username'):
+        if users_collection.find_one({'username': data['username'], '_id': {'$ne': user['_id']}}):
+            return jsonify({'message': 'User already exists'}), 400
         update_data['username'] = data['username']
     if data.get('password'):
         update_data['password'] = generate_password_hash(data['password'])
@@ -484,7 +1247,21 @@ def delete_user(user_id):
 @jwt_required()
 def export():
     format_type = request.args.get('format', 'csv')
+    if format_type not in EXPORT_FORMATS:
+        return jsonify({'message': 'Invalid format'}), 400
     data = list(complaints_collection.find())
+    data.extend(archived_complaints({d['_id'] for d in data}))
+    with stage('render'):
+        return render_export(data, format_type)
+
+def archived_complaints(exclude_ids=()):
+    """Archived complaints for export, skipping any that are live again"""
+    return [d for d in archive.iter_all() if d['_id'] not in exclude_ids]
+
+EXPORT_FORMATS = ('csv', 'pdf')
+
+def render_export(data, format_type):
+    """Render complaint documents as a CSV or PDF download (shared with asgi.py)"""
     if format_type == 'csv':
         si = StringIO()
         writer = csv.writer(si)
@@ -492,21 +1269,26 @@ def export():
         for d in data:
             writer.writerow([str(d['_id']), d['text'], d['category'], d['status'], d['user'], d.get('created_at')])
         return Response(si.getvalue(), mimetype='text/csv', headers={'Content-Disposition': 'attachment; filename=complaints.csv'})
-    elif format_type == 'pdf':
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter)
-        table_data = [['ID', 'Text', 'Category', 'Status', 'User', 'Created At']]
-        for d in data:
-            table_data.append([str(d['_id']), d['text'][:50], d['category'], d['status'], d['user'], d.get('created_at')])
-        table = Table(table_data)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        doc.build([table])
-        buffer.seek(0)
-        return Response(buffer, mimetype='application/pdf', headers={'Content-Disposition': 'attachment; filename=complaints.pdf'})
-    return jsonify({'message': 'Invalid format'}), 400
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    table_data = [['ID', 'Text', 'Category', 'Status', 'User', 'Created At']]
+    for d in data:
+        table_data.append([str(d['_id']), d['text'][:50], d['category'], d['status'], d['user'], d.get('created_at')])
+    table = Table(table_data)
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    doc.build([table])
+    buffer.seek(0)
+    return Response(buffer, mimetype='application/pdf', headers={'Content-Disposition': 'attachment; filename=complaints.pdf'})
+
+def warm_up():
+    """Exercise the ML and sentiment paths once so lazily loaded state
+    (TextBlob lexicon, sklearn internals, language model) is built before workers fork"""
+    language_detector.detect_batch(["warm up"])
+    predict_complaint_category("warm up")
+    analyze_sentiment("warm up")
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8888, debug=True)
+    app.run(host=Config.HOST, port=Config.PORT, debug=Config.DEBUG)
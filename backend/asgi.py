@@ -0,0 +1,197 @@
+"""
+ASGI entry point.
+
+Serves the I/O-bound read endpoints (complaint list/detail, dashboard
+summary, export) natively on asyncio with Motor, so a single process can
+hold many concurrent requests while they wait on MongoDB. Complaint
+creation (rate limiting, load shedding and CPU-bound enrichment) runs in a
+thread pool off the event loop. Every other route is handed to the Flask
+app unchanged, so the HTTP contracts in app.py stay the single source of
+truth.
+
+Run with:  uvicorn asgi:application --host 0.0.0.0 --port 8888
+"""
+
+import asyncio
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.wsgi import WsgiToAsgi
+from bson.objectid import ObjectId
+from flask_jwt_extended import decode_token
+from jwt.exceptions import ExpiredSignatureError, PyJWTError
+from motor.motor_asyncio import AsyncIOMotorClient
+from starlette.requests import Request
+from starlette.responses import Response
+
+import app as flask_module
+from config import Config
+from serialization import dumps, compact_text
+
+flask_app = flask_module.app
+wsgi = WsgiToAsgi(flask_app)
+
+executor = ThreadPoolExecutor(max_workers=Config.ASGI_EXECUTOR_WORKERS)
+_motor = None
+
+
+def get_db():
+    """Lazily create the Motor client on the running event loop"""
+    global _motor
+    if _motor is None:
+        _motor = AsyncIOMotorClient(flask_app.config['MONGO_URI'])
+    return _motor.get_default_database()
+
+
+def json_reply(request, payload, status=200, headers=None):
+    response = Response(dumps(payload), status_code=status, media_type='application/json', headers=headers)
+    # Mirror flask-cors for the routes served natively
+    origin = request.headers.get('origin')
+    if origin in Config.CORS_ORIGINS:
+        response.headers['Access-Control-Allow-Origin'] = origin
+        response.headers['Access-Control-Allow-Credentials'] = 'true'
+        response.headers['Vary'] = 'Origin'
+    return response
+
+
+def authenticate(request):
+    """Validate the bearer token the same way @jwt_required() does; returns (claims, error)"""
+    header = request.headers.get('authorization', '')
+    if not header:
+        return None, json_reply(request, {'msg': 'Missing Authorization Header'}, 401)
+    parts = header.split()
+    if len(parts) != 2 or parts[0] != 'Bearer':
+        return None, json_reply(request, {'msg': "Bad Authorization header. Expected 'Authorization: Bearer <JWT>'"}, 422)
+    try:
+        with flask_app.app_context():
+            return decode_token(parts[1]), None
+    except ExpiredSignatureError:
+        return None, json_reply(request, {'msg': 'Token has expired'}, 401)
+    except PyJWTError as e:
+        return None, json_reply(request, {'msg': str(e)}, 422)
+
+
+async def list_complaints(request, claims):
+    page, per_page, query, projection, compact = flask_module.parse_list_args(request.query_params, claims['sub'])
+    complaints = get_db().complaints
+    total, docs = await asyncio.gather(
+        complaints.count_documents(query),
+        complaints.find(query, projection).sort('created_at', -1).skip((page - 1) * per_page).limit(per_page).to_list(per_page),
+    )
+    if compact:
+        for c in docs:
+            compact_text(c, Config.COMPACT_TEXT_LENGTH)
+    return json_reply(request, {'complaints': docs, 'total': total})
+
+
+async def get_complaint(request, cid):
+    projection = flask_module.parse_fields(request.query_params.get('fields'))
+    complaint = await get_db().complaints.find_one({'_id': ObjectId(cid)}, projection)
+    if not complaint:
+        # The file archive backend does blocking reads; keep it off the loop
+        loop = asyncio.get_running_loop()
+        complaint = await loop.run_in_executor(executor, flask_module.find_archived, ObjectId(cid), projection)
+    if not complaint:
+        return json_reply(request, {'message': 'Not found'}, 404)
+    return json_reply(request, complaint)
+
+
+async def create_complaint(request, claims):
+    data = await request.json()
+    if not data or not data.get('text'):
+        return json_reply(request, {'message': 'Text required'}, 400)
+    loop = asyncio.get_running_loop()
+    payload, status, headers = await loop.run_in_executor(
+        executor, flask_module.ingest_complaint, data['text'], claims['sub'], data.get('category'), claims.get('tenant'))
+    return json_reply(request, payload, status, headers)
+
+
+async def dashboard_summary(request):
+    complaints = get_db().complaints
+    try:
+        total_complaints, categories, statuses, recent_count, rollup = await asyncio.gather(
+            complaints.count_documents({}),
+            complaints.aggregate(flask_module.CATEGORY_PIPELINE).to_list(None),
+            complaints.aggregate(flask_module.STATUS_PIPELINE).to_list(None),
+            complaints.count_documents(flask_module.recent_complaints_query()),
+            get_db().complaint_rollups.find_one({'_id': flask_module.ROLLUP_ID}),
+        )
+        total_complaints, categories, statuses = flask_module.merge_rollup(
+            total_complaints, categories, statuses, rollup)
+    except Exception as e:
+        print(f"Dashboard error: {e}")
+        return json_reply(request, {'message': 'Error fetching dashboard data'}, 500)
+    return json_reply(request, {
+        'total_complaints': total_complaints,
+        'categories': categories,
+        'statuses': statuses,
+        'recent_complaints': recent_count
+    })
+
+
+async def export(request):
+    format_type = request.query_params.get('format', 'csv')
+    if format_type not in flask_module.EXPORT_FORMATS:
+        return json_reply(request, {'message': 'Invalid format'}, 400)
+    data = await get_db().complaints.find().to_list(None)
+    # Archive reads and CSV/PDF rendering block; keep them off the event loop
+    loop = asyncio.get_running_loop()
+    data.extend(await loop.run_in_executor(executor, flask_module.archived_complaints, {d['_id'] for d in data}))
+    rendered = await loop.run_in_executor(executor, flask_module.render_export, data, format_type)
+    response = Response(rendered.get_data(), media_type=rendered.mimetype,
+                        headers={'Content-Disposition': rendered.headers['Content-Disposition']})
+    return response
+
+
+# (method, path regex, handler, needs claims) -- anything unmatched falls through to Flask
+ROUTES = [
+    ('GET', re.compile(r'^/api/complaints/export$'), export, False),
+    ('GET', re.compile(r'^/api/complaints$'), list_complaints, True),
+    ('POST', re.compile(r'^/api/complaints$'), create_complaint, True),
+    ('GET', re.compile(r'^/api/complaints/(?P<cid>[0-9a-fA-F]{24})$'), get_complaint, False),
+    ('GET', re.compile(r'^/api/dashboard/summary$'), dashboard_summary, False),
+]
+
+
+def match(method, path):
+    for route_method, pattern, handler, needs_claims in ROUTES:
+        if route_method != method:
+            continue
+        m = pattern.match(path)
+        if m:
+            return handler, m.groupdict(), needs_claims
+    return None, None, False
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if _motor is not None:
+                _motor.close()
+            executor.shutdown(wait=True)
+            flask_module.event_log.close()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] == 'http':
+        handler, params, needs_claims = match(scope['method'], scope['path'])
+        if handler is not None:
+            request = Request(scope, receive)
+            claims, error = authenticate(request)
+            if error is not None:
+                response = error
+            elif needs_claims:
+                response = await handler(request, claims, **params)
+            else:
+                response = await handler(request, **params)
+            await response(scope, receive, send)
+            return
+    await wsgi(scope, receive, send)
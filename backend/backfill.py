@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Re-enrich stored complaints after a model or rule change.
+
+The job scans ``complaints`` in ``_id`` order, one range query per chunk.
+Chunks go to a process pool, where each one is enriched as a single
+vectorized batch through the app's ``build_complaint_docs``. Results come
+back in scan order and are written with one unordered ``bulk_write`` per
+chunk. Only complaints whose enrichment actually changed are rewritten.
+
+Progress is checkpointed in ``backfill_jobs``: the last ``_id`` written, the
+counts so far and the category drift. An interrupted run resumes where it
+stopped. Writes are throttled to ``BACKFILL_MAX_DOCS_PER_SEC``, and the job
+backs off while a ``bulk_write`` takes longer than
+``BACKFILL_WRITE_LATENCY_TARGET``.
+
+Kept as they are:
+
+* categories chosen by the user, re-categorised by an admin or confirmed
+  or corrected through feedback
+* review flags already settled by an admin
+* workflow fields (status, assignee, ...)
+
+SLA deadlines are recomputed from ``created_at``.
+
+Command line:
+
+    python backfill.py run [--dry-run] [--job NAME] [--restart] [--chunk-size N] [--workers N]
+    python backfill.py status [--job NAME]
+    python backfill.py deferred [--batch-size N]   # enrich every deferred complaint now
+
+The scan skips complaints stored raw under load shedding; ``deferred``
+drains them with the app's ``enrich_deferred`` (the workers' background
+enrichers do the same continuously).
+"""
+
+import argparse
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from pymongo import UpdateOne
+
+from config import Config
+
+# Fields recomputed by the backfill (category and needs_review conditionally)
+BACKFILL_FIELDS = ('ml_category', 'confidence', 'model_version', 'top_categories', 'sentiment', 'sentiment_score',
+                   'sentiment_emoji', 'priority', 'sla_hours', 'sla_deadline', 'language', 'language_confidence')
+SCAN_FIELDS = BACKFILL_FIELDS + ('text', 'category', 'is_manual_category', 'feedback_given', 'feedback_category',
+                                 'needs_review', 'enrichment_skipped', 'created_at')
+
+
+def enrich_chunk(texts):
+    """Pool worker: enrich a chunk of texts in one batch with the app's current models and rules"""
+    import app as flask_module
+    docs = flask_module.build_complaint_docs([(text, None) for text in texts], None)
+    return [{field: doc.get(field) for field in BACKFILL_FIELDS + ('category', 'needs_review', 'enrichment_skipped')}
+            for doc in docs]
+
+
+def _as_utc(value):
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def changes_for(doc, enriched):
+    """The ``$set``/``$unset`` that bring a stored complaint up to date, or None if it already is"""
+    new = {field: enriched[field] for field in BACKFILL_FIELDS}
+    if doc.get('created_at'):
+        new['sla_deadline'] = _as_utc(doc['created_at']) + timedelta(hours=enriched['sla_hours'])
+    # A category that is no longer the model's was set by a person (user, feedback or admin edit)
+    decided = (doc.get('is_manual_category') or doc.get('feedback_given') or doc.get('feedback_category')
+               or doc.get('category') != doc.get('ml_category'))
+    if not decided:
+        new['category'] = enriched['category']
+    if not doc.get('feedback_given'):
+        new['needs_review'] = enriched['needs_review'] and not doc.get('is_manual_category')
+    changed = {}
+    for field, value in new.items():
+        old = doc.get(field)
+        if field == 'sla_deadline' and old is not None:
+            old = _as_utc(old)
+        if old != value:
+            changed[field] = value
+    update = {}
+    if changed:
+        update['$set'] = changed
+    if enriched.get('enrichment_skipped'):
+        if doc.get('enrichment_skipped') != enriched['enrichment_skipped']:
+            update.setdefault('$set', {})['enrichment_skipped'] = enriched['enrichment_skipped']
+    elif doc.get('enrichment_skipped'):
+        update['$unset'] = {'enrichment_skipped': ''}
+    return update or None
+
+
+class Throttle:
+    """Caps documents written per second and backs off while writes are slow"""
+
+    def __init__(self, max_docs_per_sec=0, latency_target=0, sleep=time.sleep):
+        self.max_docs_per_sec = max_docs_per_sec
+        self.latency_target = latency_target
+        self.sleep = sleep
+        self._next = time.monotonic()
+
+    def after_write(self, docs, seconds):
+        delay = 0.0
+        if self.max_docs_per_sec:
+            self._next = max(self._next, time.monotonic()) + docs / self.max_docs_per_sec
+            delay = self._next - time.monotonic()
+        if self.latency_target and seconds > self.latency_target:
+            # The database is struggling: give it as long again as the slow write took
+            delay = max(delay, seconds)
+        if delay > 0:
+            self.sleep(delay)
+
+
+def _scan(complaints, after, chunk_size):
+    query = {'enrichment_status': {'$exists': False}}  # raw complaints belong to the deferred enricher
+    while True:
+        chunk_query = dict(query, _id={'$gt': after}) if after is not None else query
+        chunk = list(complaints.find(chunk_query, dict.fromkeys(SCAN_FIELDS, 1)).sort('_id', 1).limit(chunk_size))
+        if not chunk:
+            return
+        yield chunk
+        after = chunk[-1]['_id']
+
+
+def _drift_key(old, new):
+    # Mongo field names cannot contain dots
+    return f"{old}->{new}".replace('.', '_')
+
+
+def backfill(complaints, jobs, job='default', chunk_size=None, workers=None, throttle=None, dry_run=False,
+             restart=False, enrich=enrich_chunk):
+    """Re-enrich every complaint; returns the job document (counts and category drift).
+
+    A dry run computes the same report without writing complaints or the
+    checkpoint.
+    """
+    chunk_size = chunk_size or Config.BACKFILL_CHUNK_SIZE
+    workers = Config.BACKFILL_WORKERS if workers is None else workers
+    throttle = throttle or Throttle(Config.BACKFILL_MAX_DOCS_PER_SEC, Config.BACKFILL_WRITE_LATENCY_TARGET)
+    state = None if dry_run or restart else jobs.find_one({'_id': job})
+    if state and state.get('finished_at'):
+        return state
+    state = state or {'_id': job, 'last_id': None, 'scanned': 0, 'changed': 0, 'category_drift': {},
+                      'priority_changes': 0, 'started_at': datetime.now(timezone.utc)}
+    drift = Counter(state['category_drift'])
+
+    def finish(chunk, enriched):
+        updates = []
+        for doc, new in zip(chunk, enriched):
+            update = changes_for(doc, new)
+            if not update:
+                continue
+            changed = update.get('$set', {})
+            if 'ml_category' in changed:
+                drift[_drift_key(doc.get('ml_category'), changed['ml_category'])] += 1
+            if 'priority' in changed:
+                state['priority_changes'] += 1
+            updates.append(UpdateOne({'_id': doc['_id']}, update))
+        state['scanned'] += len(chunk)
+        state['changed'] += len(updates)
+        state['last_id'] = chunk[-1]['_id']
+        state['category_drift'] = dict(drift)
+        if dry_run:
+            return
+        started = time.monotonic()
+        if updates:
+            complaints.bulk_write(updates, ordered=False)
+        state['updated_at'] = datetime.now(timezone.utc)
+        jobs.replace_one({'_id': job}, state, upsert=True)
+        throttle.after_write(len(updates), time.monotonic() - started)
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        pending = deque()
+        for chunk in _scan(complaints, state['last_id'], chunk_size):
+            texts = [doc.get('text') or '' for doc in chunk]
+            pending.append((chunk, pool.submit(enrich, texts) if pool else None, texts))
+            # Keep the pool busy, but write (and checkpoint) strictly in _id order
+            while len(pending) > (workers * 2 if pool else 0):
+                chunk, future, texts = pending.popleft()
+                finish(chunk, future.result() if future else enrich(texts))
+        while pending:
+            chunk, future, texts = pending.popleft()
+            finish(chunk, future.result() if future else enrich(texts))
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+    state['finished_at'] = datetime.now(timezone.utc)
+    if not dry_run:
+        jobs.replace_one({'_id': job}, state, upsert=True)
+    return state
+
+
+def drain_deferred(enrich, batch_size=None):
+    """Run ``enrich`` (the app's ``enrich_deferred``) until no deferred complaint is left"""
+    total = 0
+    while True:
+        enriched = enrich(batch_size)
+        if not enriched:
+            return total
+        total += enriched
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-enrich stored complaints with the current models and rules')
+    sub = parser.add_subparsers(dest='command', required=True)
+    run = sub.add_parser('run')
+    run.add_argument('--job', default='default', help='Checkpoint name; a finished job must be --restart-ed')
+    run.add_argument('--restart', action='store_true', help='Ignore the checkpoint and start from the first complaint')
+    run.add_argument('--dry-run', action='store_true', help='Report category drift without writing anything')
+    run.add_argument('--chunk-size', type=int)
+    run.add_argument('--workers', type=int, help=f"Enrichment processes (default {Config.BACKFILL_WORKERS})")
+    status = sub.add_parser('status')
+    status.add_argument('--job', default='default')
+    deferred = sub.add_parser('deferred')
+    deferred.add_argument('--batch-size', type=int, help=f"Default {Config.DEFERRED_ENRICH_BATCH}")
+    args = parser.parse_args()
+
+    # Loads the models before the pool forks, so workers share them
+    import app as flask_module
+    if args.command == 'deferred':
+        print({'enriched': drain_deferred(flask_module.enrich_deferred, args.batch_size)})
+        return
+    jobs = flask_module.mongo.db.backfill_jobs
+    if args.command == 'status':
+        print(jobs.find_one({'_id': args.job}))
+        return
+    state = backfill(flask_module.complaints_collection, jobs, args.job, args.chunk_size, args.workers,
+                     dry_run=args.dry_run, restart=args.restart)
+    print({k: v for k, v in state.items() if k not in ('_id', 'last_id')})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+Compact, pickle-free model artifacts with a pure-NumPy scorer.
+
+A trained TF-IDF/hashing vectorizer plus linear classifier is exported as:
+
+    meta.json          tokenizer settings, classes, probability mode
+    vocab.bin          sorted UTF-8 terms, concatenated (TF-IDF only)
+    vocab_offsets.npy  uint64 start offsets into vocab.bin (len = terms + 1)
+    idf.npy            float32 IDF weights, in sorted-term order
+    coef.npy           float32 (or int8 + coef_scale.npy) coefficients
+    intercept.npy      float32 intercepts
+
+Arrays are memory-mapped on load, so load time and worker RSS no longer
+grow with a Python dict vocabulary, and nothing is unpickled. Term lookup
+is a binary search over the mapped string table.
+
+    python compact_model.py export [--version V] [--quantize int8]
+    python compact_model.py bench  [--version V] [--texts complaints.csv]
+"""
+
+import argparse
+import csv
+import json
+import math
+import mmap
+import os
+import re
+import subprocess
+import sys
+import time
+from functools import lru_cache
+
+import numpy as np
+
+FORMAT_VERSION = 1
+COMPACT_DIR = 'compact'
+
+
+# -- export ----------------------------------------------------------------
+
+def _vectorizer_meta(vectorizer):
+    name = type(vectorizer).__name__
+    if name not in ('TfidfVectorizer', 'HashingVectorizer'):
+        raise ValueError(f"Unsupported vectorizer for compact export: {name}")
+    if vectorizer.analyzer != 'word' or vectorizer.tokenizer is not None or vectorizer.preprocessor is not None:
+        raise ValueError('Compact export only supports the default word analyzer')
+    if getattr(vectorizer, 'strip_accents', None):
+        raise ValueError('Compact export does not support strip_accents')
+    stop_words = vectorizer.get_stop_words()
+    meta = {
+        'vectorizer': 'hashing' if name == 'HashingVectorizer' else 'tfidf',
+        'lowercase': bool(vectorizer.lowercase),
+        'token_pattern': vectorizer.token_pattern,
+        'ngram_range': list(vectorizer.ngram_range),
+        'stop_words': sorted(stop_words) if stop_words else [],
+        'binary': bool(vectorizer.binary),
+        'norm': vectorizer.norm,
+    }
+    if meta['vectorizer'] == 'hashing':
+        meta.update(n_features=int(vectorizer.n_features), alternate_sign=bool(vectorizer.alternate_sign))
+    else:
+        meta.update(sublinear_tf=bool(vectorizer.sublinear_tf), use_idf=bool(vectorizer.use_idf))
+    return meta
+
+
+def _proba_mode(model):
+    n_classes = len(model.classes_)
+    if n_classes == 2:
+        return 'binary'
+    if type(model).__name__ == 'LogisticRegression':
+        multi_class = getattr(model, 'multi_class', 'auto')
+        if multi_class != 'ovr' and model.solver != 'liblinear':
+            return 'softmax'
+        return 'ovr'
+    if type(model).__name__ == 'SGDClassifier' and model.loss in ('log_loss', 'log'):
+        return 'ovr'
+    raise ValueError(f"Unsupported classifier for compact export: {type(model).__name__}")
+
+
+def export_compact(model, vectorizer, out_dir, quantize=None):
+    """Write a compact artifact for a fitted vectorizer/linear classifier pair"""
+    meta = _vectorizer_meta(vectorizer)
+    meta.update(format_version=FORMAT_VERSION, classes=[str(c) for c in model.classes_],
+                proba=_proba_mode(model), quantize=quantize)
+    coef = np.asarray(model.coef_, dtype=np.float64)
+    os.makedirs(out_dir, exist_ok=True)
+
+    if meta['vectorizer'] == 'tfidf':
+        # Re-order columns by sorted term so a term's rank in the string table is its column
+        terms = sorted(vectorizer.vocabulary_)
+        columns = np.array([vectorizer.vocabulary_[t] for t in terms], dtype=np.int64)
+        coef = coef[:, columns]
+        encoded = [t.encode('utf-8') for t in terms]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        with open(os.path.join(out_dir, 'vocab.bin'), 'wb') as f:
+            f.write(b''.join(encoded))
+        np.save(os.path.join(out_dir, 'vocab_offsets.npy'), offsets)
+        if meta['use_idf']:
+            np.save(os.path.join(out_dir, 'idf.npy'), vectorizer.idf_[columns].astype(np.float32))
+
+    if quantize == 'int8':
+        # Symmetric per-class scale; 127 levels keeps drift well below confidence noise
+        scale = np.abs(coef).max(axis=1) / 127.0
+        scale[scale == 0] = 1.0
+        np.save(os.path.join(out_dir, 'coef.npy'), np.round(coef / scale[:, None]).astype(np.int8))
+        np.save(os.path.join(out_dir, 'coef_scale.npy'), scale.astype(np.float32))
+    elif quantize is None:
+        np.save(os.path.join(out_dir, 'coef.npy'), coef.astype(np.float32))
+    else:
+        raise ValueError(f"Unknown quantization: {quantize}")
+    np.save(os.path.join(out_dir, 'intercept.npy'), np.asarray(model.intercept_, dtype=np.float32))
+    with open(os.path.join(out_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+    return out_dir
+
+
+# -- scoring ---------------------------------------------------------------
+
+def murmurhash3_32(data, seed=0):
+    """Signed 32-bit MurmurHash3 (x86), bit-identical to sklearn's HashingVectorizer"""
+    c1, c2, mask = 0xcc9e2d51, 0x1b873593, 0xffffffff
+    length = len(data)
+    h = seed
+    rounded = length & ~3
+    for i in range(0, rounded, 4):
+        k = int.from_bytes(data[i:i + 4], 'little')
+        k = (k * c1) & mask
+        k = ((k << 15) | (k >> 17)) & mask
+        h ^= (k * c2) & mask
+        h = ((h << 13) | (h >> 19)) & mask
+        h = (h * 5 + 0xe6546b64) & mask
+    tail = length & 3
+    if tail:
+        k = int.from_bytes(data[rounded:], 'little')
+        k = (k * c1) & mask
+        k = ((k << 15) | (k >> 17)) & mask
+        h ^= (k * c2) & mask
+    h ^= length
+    h ^= h >> 16
+    h = (h * 0x85ebca6b) & mask
+    h ^= h >> 13
+    h = (h * 0xc2b2ae35) & mask
+    h ^= h >> 16
+    return h - 0x100000000 if h & 0x80000000 else h
+
+
+class StringTable:
+    """Sorted, memory-mapped UTF-8 string table with binary-search lookup"""
+
+    def __init__(self, blob_path, offsets_path):
+        self.offsets = np.load(offsets_path, mmap_mode='r')
+        self.size = len(self.offsets) - 1
+        self._file = open(blob_path, 'rb')
+        self.blob = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(blob_path) else b''
+
+    def index(self, term):
+        key = term.encode('utf-8')
+        lo, hi = 0, self.size
+        offsets, blob = self.offsets, self.blob
+        while lo < hi:
+            mid = (lo + hi) // 2
+            value = blob[int(offsets[mid]):int(offsets[mid + 1])]
+            if value < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.size and blob[int(offsets[lo]):int(offsets[lo + 1])] == key:
+            return lo
+        return -1
+
+
+class CompactVectorizer:
+    """Reproduces TfidfVectorizer/HashingVectorizer.transform as (columns, values) rows"""
+
+    def __init__(self, path, meta):
+        self.meta = meta
+        self.token_re = re.compile(meta['token_pattern'])
+        self.stop_words = frozenset(meta['stop_words'])
+        self.ngram_min, self.ngram_max = meta['ngram_range']
+        self.vocab = None
+        self.idf = None
+        if meta['vectorizer'] == 'tfidf':
+            self.vocab = StringTable(os.path.join(path, 'vocab.bin'), os.path.join(path, 'vocab_offsets.npy'))
+            if meta['use_idf']:
+                self.idf = np.load(os.path.join(path, 'idf.npy'), mmap_mode='r')
+        else:
+            # Complaint vocabulary repeats heavily, so cache token hashes
+            self._hash = lru_cache(maxsize=1 << 16)(lambda feature: murmurhash3_32(feature.encode('utf-8')))
+
+    def _features(self, text):
+        if self.meta['lowercase']:
+            text = text.lower()
+        tokens = [t for t in self.token_re.findall(text) if t not in self.stop_words]
+        for n in range(self.ngram_min, self.ngram_max + 1):
+            for i in range(len(tokens) - n + 1):
+                yield tokens[i] if n == 1 else ' '.join(tokens[i:i + n])
+
+    def _row(self, text):
+        counts = {}
+        if self.vocab is not None:
+            for feature in self._features(text):
+                column = self.vocab.index(feature)
+                if column >= 0:
+                    counts[column] = counts.get(column, 0.0) + 1.0
+        else:
+            n_features, alternate = self.meta['n_features'], self.meta['alternate_sign']
+            for feature in self._features(text):
+                h = self._hash(feature)
+                column = abs(h) % n_features
+                counts[column] = counts.get(column, 0.0) + (-1.0 if alternate and h < 0 else 1.0)
+        columns = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        if self.meta['binary']:
+            values = np.ones_like(values)
+        if self.meta.get('sublinear_tf'):
+            values = np.log(values) + 1.0
+        if self.idf is not None and len(columns):
+            values = values * self.idf[columns]
+        norm = self.meta['norm']
+        if norm == 'l2' and len(values):
+            total = math.sqrt(float(values @ values))
+            values = values / total if total else values
+        elif norm == 'l1' and len(values):
+            total = float(np.abs(values).sum())
+            values = values / total if total else values
+        return columns, values
+
+    def transform(self, texts):
+        return [self._row(text) for text in texts]
+
+
+class CompactClassifier:
+    """Linear scorer over CompactVectorizer rows, matching sklearn's predict_proba"""
+
+    def __init__(self, path, meta):
+        self.meta = meta
+        self.classes_ = np.array(meta['classes'])
+        self.coef = np.load(os.path.join(path, 'coef.npy'), mmap_mode='r')
+        self.scale = None
+        if meta.get('quantize') == 'int8':
+            self.scale = np.load(os.path.join(path, 'coef_scale.npy')).astype(np.float64)
+        self.intercept = np.load(os.path.join(path, 'intercept.npy')).astype(np.float64)
+
+    def decision_function(self, X):
+        # One gather over all non-zeros in the batch, then per-row sums via bincount
+        n_rows = len(X)
+        lengths = [len(columns) for columns, _ in X]
+        columns = np.concatenate([c for c, _ in X]) if n_rows else np.empty(0, dtype=np.int64)
+        values = np.concatenate([v for _, v in X]) if n_rows else np.empty(0)
+        rows = np.repeat(np.arange(n_rows), lengths)
+        weights = np.asarray(self.coef[:, columns], dtype=np.float64)
+        if self.scale is not None:
+            weights *= self.scale[:, None]
+        weights *= values
+        scores = np.empty((n_rows, len(self.intercept)), dtype=np.float64)
+        for k in range(len(self.intercept)):
+            scores[:, k] = np.bincount(rows, weights=weights[k], minlength=n_rows) + self.intercept[k]
+        return scores
+
+    def predict_proba(self, X):
+        scores = self.decision_function(X)
+        mode = self.meta['proba']
+        if mode == 'softmax':
+            scores -= scores.max(axis=1, keepdims=True)
+            np.exp(scores, out=scores)
+            return scores / scores.sum(axis=1, keepdims=True)
+        positive = 1.0 / (1.0 + np.exp(-scores))
+        if mode == 'binary':
+            return np.hstack([1.0 - positive, positive])
+        # One-vs-rest: normalise the per-class sigmoids, as sklearn does
+        totals = positive.sum(axis=1, keepdims=True)
+        totals[totals == 0] = 1.0
+        return positive / totals
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def load_compact(path):
+    """(classifier, vectorizer) pair usable anywhere the joblib pair is"""
+    with open(os.path.join(path, 'meta.json')) as f:
+        meta = json.load(f)
+    if meta.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported compact model format: {meta.get('format_version')}")
+    return CompactClassifier(path, meta), CompactVectorizer(path, meta)
+
+
+# -- benchmark -------------------------------------------------------------
+
+_LOAD_PROBE = """
+import json, sys, time
+sys.path.insert(0, {cwd!r})
+def rss_kb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * {page_kb}
+before = rss_kb()
+start = time.perf_counter()
+if {fmt!r} == 'joblib':
+    import joblib
+    model, vectorizer = joblib.load({model_path!r}), joblib.load({vectorizer_path!r})
+else:
+    from compact_model import load_compact
+    model, vectorizer = load_compact({compact_path!r})
+elapsed = time.perf_counter() - start
+model.predict_proba(vectorizer.transform(['warm up']))
+print(json.dumps({{'load_ms': elapsed * 1000, 'rss_delta_kb': rss_kb() - before}}))
+"""
+
+
+def probe_load(fmt, model_path, vectorizer_path, compact_path):
+    # Separate interpreter per measurement so imports and caches don't leak between runs
+    code = _LOAD_PROBE.format(cwd=os.getcwd(), page_kb=os.sysconf('SC_PAGE_SIZE') // 1024, fmt=fmt,
+                              model_path=model_path, vectorizer_path=vectorizer_path, compact_path=compact_path)
+    out = subprocess.run([sys.executable, '-W', 'ignore', '-c', code], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def benchmark(model_path, vectorizer_path, compact_path, texts):
+    import joblib
+    model, vectorizer = joblib.load(model_path), joblib.load(vectorizer_path)
+    compact_model, compact_vectorizer = load_compact(compact_path)
+    start = time.perf_counter()
+    reference = model.predict_proba(vectorizer.transform(texts))
+    joblib_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    compact = compact_model.predict_proba(compact_vectorizer.transform(texts))
+    compact_ms = (time.perf_counter() - start) * 1000
+    return {
+        'texts': len(texts),
+        'joblib': dict(probe_load('joblib', model_path, vectorizer_path, compact_path), batch_ms=joblib_ms,
+                       artifact_bytes=os.path.getsize(model_path) + os.path.getsize(vectorizer_path)),
+        'compact': dict(probe_load('compact', model_path, vectorizer_path, compact_path), batch_ms=compact_ms,
+                        artifact_bytes=sum(os.path.getsize(os.path.join(compact_path, n)) for n in os.listdir(compact_path))),
+        'label_agreement': float(np.mean(reference.argmax(axis=1) == compact.argmax(axis=1))),
+        'max_probability_drift': float(np.abs(reference - compact).max()),
+    }
+
+
+def artifact_paths(version):
+    from model_registry import ModelRegistry, LEGACY_MODEL_PATH, LEGACY_VECTORIZER_PATH
+    registry = ModelRegistry()
+    version = version or registry.state().get('active')
+    if version:
+        base = os.path.join(registry.root, version)
+        return os.path.join(base, 'classifier.joblib'), os.path.join(base, 'vectorizer.joblib'), os.path.join(base, COMPACT_DIR)
+    return LEGACY_MODEL_PATH, LEGACY_VECTORIZER_PATH, os.path.join('model', COMPACT_DIR)
+
+
+def _sample_texts(path, limit):
+    if not path:
+        from train_model import SEED_TRAINING_DATA
+        return [text for text, _ in SEED_TRAINING_DATA] + [
+            "The package never arrived and tracking shows it's lost",
+            "I was charged three times for the same order",
+            "The app keeps crashing whenever I try to checkout",
+        ]
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        column = 'text' if 'text' in reader.fieldnames else 'Text'
+        return [row[column] for _, row in zip(range(limit), reader) if row.get(column)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export and benchmark compact model artifacts')
+    parser.add_argument('command', choices=['export', 'bench'])
+    parser.add_argument('--version', help='Registry version (default: active, else the legacy pair)')
+    parser.add_argument('--quantize', choices=['int8'], help='Store coefficients as int8 with per-class scales')
+    parser.add_argument('--texts', help='CSV with a text column to measure drift on')
+    parser.add_argument('--limit', type=int, default=5000)
+    args = parser.parse_args()
+
+    model_path, vectorizer_path, compact_path = artifact_paths(args.version)
+    if args.command == 'export' or not os.path.exists(os.path.join(compact_path, 'meta.json')):
+        import joblib
+        export_compact(joblib.load(model_path), joblib.load(vectorizer_path), compact_path, args.quantize)
+        print(f"✅ Compact model written to {compact_path}")
+    if args.command == 'bench':
+        print(json.dumps(benchmark(model_path, vectorizer_path, compact_path, _sample_texts(args.texts, args.limit)), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -18,4 +18,137 @@ class Config:
     # Other configuration settings
     DEBUG = os.getenv('FLASK_DEBUG', 'true').lower() == 'true'
     HOST = '0.0.0.0'
-    PORT = 8888 
\ No newline at end of file
+    PORT = 8888
+
+    # Complaint list responses
+    COMPACT_TEXT_LENGTH = int(os.getenv('COMPACT_TEXT_LENGTH', '120'))
+
+    # CORS origins allowed to call the API (Flask and ASGI paths)
+    CORS_ORIGINS = os.getenv('CORS_ORIGINS', 'http://localhost:3000').split(',')
+
+    # ASGI serving path (asgi.py): threads for CPU-bound enrichment/rendering
+    ASGI_EXECUTOR_WORKERS = int(os.getenv('ASGI_EXECUTOR_WORKERS', str(min(32, (os.cpu_count() or 1) + 4))))
+
+    # Complaint workflow
+    COMPLAINT_STATUSES = ['pending', 'in_progress', 'resolved', 'closed']
+    # Complaints per update_many round-trip in bulk admin updates
+    BULK_UPDATE_BATCH_SIZE = int(os.getenv('BULK_UPDATE_BATCH_SIZE', '500'))
+
+    # Admin user listing (keyset pages ordered by username) and bulk provisioning
+    USER_PAGE_SIZE = int(os.getenv('USER_PAGE_SIZE', '50'))
+    USER_PAGE_MAX = int(os.getenv('USER_PAGE_MAX', '500'))
+    # Each password hash costs ~0.2 s of CPU inside the request: keep a full
+    # batch well within the gunicorn worker timeout
+    USER_BULK_MAX = int(os.getenv('USER_BULK_MAX', '200'))
+    # Threads hashing passwords for bulk provisioning (hashlib releases the GIL)
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', '0')) or os.cpu_count() or 1
+
+    # Write-behind audit/event log (event_log.py): 'mongo' (complaint_audit) or 'file'
+    EVENT_LOG_SINK = os.getenv('EVENT_LOG_SINK', 'mongo')
+    EVENT_LOG_DIR = os.getenv('EVENT_LOG_DIR', 'logs/events')
+    EVENT_LOG_QUEUE_SIZE = int(os.getenv('EVENT_LOG_QUEUE_SIZE', '10000'))
+    EVENT_LOG_BATCH_SIZE = int(os.getenv('EVENT_LOG_BATCH_SIZE', '500'))
+    EVENT_LOG_FLUSH_INTERVAL = float(os.getenv('EVENT_LOG_FLUSH_INTERVAL', '1.0'))
+    # Events older than this are expired by a TTL index; 0 keeps them forever
+    EVENT_LOG_TTL_DAYS = int(os.getenv('EVENT_LOG_TTL_DAYS', '365'))
+
+    # Token-bucket rate limits (rate_limit.py) as 'count/seconds'; empty disables a rule
+    # 'memory' (per process) or 'sqlite' (shared by all workers on the host)
+    RATE_LIMIT_STORE = os.getenv('RATE_LIMIT_STORE', 'memory')
+    RATE_LIMIT_SQLITE_PATH = os.getenv('RATE_LIMIT_SQLITE_PATH', '/tmp/accs-rate-limits.sqlite3')
+    RATE_LIMIT_CREATE_COMPLAINT = os.getenv('RATE_LIMIT_CREATE_COMPLAINT', '30/60')  # per user
+    RATE_LIMIT_CREATE_COMPLAINT_TENANT = os.getenv('RATE_LIMIT_CREATE_COMPLAINT_TENANT', '600/60')  # per tenant
+    RATE_LIMIT_LOGIN = os.getenv('RATE_LIMIT_LOGIN', '10/60')  # per client address and username
+
+    # Load shedding on complaint creation: 'defer' stores complaints raw and
+    # enriches them later, 'reject' answers 429, 'off' always enriches inline
+    SHED_MODE = os.getenv('SHED_MODE', 'defer')
+    SHED_MAX_INFLIGHT = int(os.getenv('SHED_MAX_INFLIGHT', '8'))
+    # An enrichment slower than this (seconds) sheds new work for SHED_COOLDOWN seconds
+    SHED_LATENCY_TARGET = float(os.getenv('SHED_LATENCY_TARGET', '2.0'))
+    SHED_COOLDOWN = float(os.getenv('SHED_COOLDOWN', '10'))
+    # Seconds between each worker's deferred enrichment batches (0 disables the
+    # background enricher; `python backfill.py deferred` drains them from cron)
+    DEFERRED_ENRICH_INTERVAL = float(os.getenv('DEFERRED_ENRICH_INTERVAL', '5'))
+    DEFERRED_ENRICH_BATCH = int(os.getenv('DEFERRED_ENRICH_BATCH', '100'))
+
+    # Seconds between sweeps flagging open complaints past their SLA deadline (0 disables)
+    BREACH_SWEEP_INTERVAL = float(os.getenv('BREACH_SWEEP_INTERVAL', '60'))
+
+    # Re-enrichment backfill (backfill.py); 0 workers = one per CPU
+    BACKFILL_CHUNK_SIZE = int(os.getenv('BACKFILL_CHUNK_SIZE', '500'))
+    BACKFILL_WORKERS = int(os.getenv('BACKFILL_WORKERS', '0')) or os.cpu_count() or 1
+    # 0 disables the cap; writes slower than the latency target pause the job
+    BACKFILL_MAX_DOCS_PER_SEC = float(os.getenv('BACKFILL_MAX_DOCS_PER_SEC', '0'))
+    BACKFILL_WRITE_LATENCY_TARGET = float(os.getenv('BACKFILL_WRITE_LATENCY_TARGET', '0.5'))
+
+    # Retention (retention.py): resolved complaints older than RETENTION_DAYS
+    # leave the hot collection. Keep it above the dashboard's 7-day window.
+    RETENTION_DAYS = int(os.getenv('RETENTION_DAYS', '180'))
+    RETENTION_STATUSES = os.getenv('RETENTION_STATUSES', 'resolved,closed').split(',')
+    RETENTION_BATCH_SIZE = int(os.getenv('RETENTION_BATCH_SIZE', '1000'))
+    # 'collection' (complaints_archive) or 'files' (monthly .jsonl.gz under ARCHIVE_DIR)
+    ARCHIVE_BACKEND = os.getenv('ARCHIVE_BACKEND', 'collection')
+    ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', 'archive')
+
+    # Profiling (profiling.py). Requests slower than SLOW_REQUEST_MS are logged
+    # with per-stage timings; 0 disables request timing entirely
+    SLOW_REQUEST_MS = float(os.getenv('SLOW_REQUEST_MS', '1000'))
+    # Admin-only X-Profile header and sampling endpoint
+    PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'true').lower() == 'true'
+    # Shared by all workers on the host: sampling triggers, results, saved profiles
+    PROFILE_DIR = os.getenv('PROFILE_DIR', '/tmp/accs-profiles')
+    # Keep below the gunicorn worker timeout
+    PROFILE_MAX_SECONDS = float(os.getenv('PROFILE_MAX_SECONDS', '30'))
+    PROFILE_SAMPLE_INTERVAL = float(os.getenv('PROFILE_SAMPLE_INTERVAL', '0.01'))
+
+    # Language routing (languages.py): a detected language is only used when it
+    # is in this list, has a trained classifier and is detected with at least
+    # LANGUAGE_MIN_CONFIDENCE; anything else is enriched as DEFAULT_LANGUAGE.
+    # Add a language here once `train_model.py --language <code>` has run
+    DEFAULT_LANGUAGE = os.getenv('DEFAULT_LANGUAGE', 'en')
+    SUPPORTED_LANGUAGES = os.getenv('SUPPORTED_LANGUAGES', 'en').split(',')
+    LANGUAGE_MIN_CONFIDENCE = float(os.getenv('LANGUAGE_MIN_CONFIDENCE', '0.9'))
+
+    # Priority/SLA engine (priority.py): 'rules' or 'learned' (falls back to rules)
+    PRIORITY_ENGINE = os.getenv('PRIORITY_ENGINE', 'rules')
+    # Optional JSON file with 'rules' and/or 'sla_hours' replacing the defaults
+    PRIORITY_RULES_PATH = os.getenv('PRIORITY_RULES_PATH', '')
+    PRIORITY_MODEL_PATH = os.getenv('PRIORITY_MODEL_PATH', 'model/priority_model.npz')
+
+    # ML classification
+    CATEGORIES = ['billing', 'delivery', 'quality', 'service', 'technical']
+    TOP_K_CATEGORIES = int(os.getenv('TOP_K_CATEGORIES', '3'))
+    # Predictions below this confidence are queued for admin review
+    LOW_CONFIDENCE_THRESHOLD = float(os.getenv('LOW_CONFIDENCE_THRESHOLD', '0.4'))
+
+    # Model registry (model_registry.py)
+    MODEL_REGISTRY_DIR = os.getenv('MODEL_REGISTRY_DIR', 'model/registry')
+    # 'joblib' (pickled sklearn objects) or 'compact' (memory-mapped, see compact_model.py)
+    MODEL_FORMAT = os.getenv('MODEL_FORMAT', 'joblib')
+    # Seconds between checks for a promotion/rollback made elsewhere
+    MODEL_RELOAD_INTERVAL = float(os.getenv('MODEL_RELOAD_INTERVAL', '30'))
+    # Every complaint whose id hashes into 1/N is never trained on and is kept for evaluation (0 = none)
+    HOLDOUT_EVERY = int(os.getenv('HOLDOUT_EVERY', '20'))
+    # Fraction of new complaints scored by the candidate model in shadow mode
+    SHADOW_SAMPLE_RATE = float(os.getenv('SHADOW_SAMPLE_RATE', '0.1'))
+    # Serve a feedback-retrained model immediately, or only shadow it
+    AUTO_PROMOTE_RETRAINED = os.getenv('AUTO_PROMOTE_RETRAINED', 'true').lower() == 'true'
+
+    # Feedback-driven retraining (retrain_policy.py)
+    RETRAIN_MIN_FEEDBACK = int(os.getenv('RETRAIN_MIN_FEEDBACK', '50'))
+    RETRAIN_FEEDBACK_THRESHOLD = int(os.getenv('RETRAIN_FEEDBACK_THRESHOLD', '10'))
+    # Retrain at least this often while feedback keeps coming (0 disables)
+    RETRAIN_MAX_AGE_HOURS = float(os.getenv('RETRAIN_MAX_AGE_HOURS', '168'))
+    # Retrain early when this share of recent feedback corrects the model; the minimum
+    # must stay below RETRAIN_FEEDBACK_THRESHOLD or the count trigger always fires first
+    RETRAIN_DRIFT_MIN_SAMPLES = int(os.getenv('RETRAIN_DRIFT_MIN_SAMPLES', '5'))
+    RETRAIN_DRIFT_ERROR_RATE = float(os.getenv('RETRAIN_DRIFT_ERROR_RATE', '0.4'))
+    # Feedback weight halves every N days (0 = all feedback weighs the same)
+    RETRAIN_HALF_LIFE_DAYS = float(os.getenv('RETRAIN_HALF_LIFE_DAYS', '30'))
+    RETRAIN_MIN_SAMPLES = int(os.getenv('RETRAIN_MIN_SAMPLES', '10'))
+    RETRAIN_MAX_SAMPLES = int(os.getenv('RETRAIN_MAX_SAMPLES', '100000'))
+    # A run that dies without releasing its lease blocks others this long
+    RETRAIN_LEASE_SECONDS = int(os.getenv('RETRAIN_LEASE_SECONDS', '3600'))
+    # Wait after a failed (or too small) run, doubling per consecutive failure up to a day
+    RETRAIN_RETRY_SECONDS = int(os.getenv('RETRAIN_RETRY_SECONDS', '900'))
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Offline evaluation of a complaint classifier: quality and speed in one report.
+
+Samples are complaints whose category was confirmed (admin feedback or a
+user-selected category). Training (``train_model.py --mongo`` and feedback
+retraining) never sees the complaints ``in_holdout`` picks by id, a fixed
+1/``HOLDOUT_EVERY`` of them, so only those are scored:
+
+* ``--mongo``: held-out complaints, using the ``holdout_every`` the version
+  was trained with (versions trained on every complaint are refused)
+* ``--jsonl``: one complaint document per line, e.g. ``mongoexport``; labels
+  are taken the same way as for training, and rows are held out by ``_id``
+  the same way
+* ``--csv``: a CSV with text and label columns, scored as given; it is up
+  to the caller that the rows were not trained on
+
+Reported:
+
+* accuracy, macro-F1 and per-category precision/recall/F1
+* a confusion matrix
+* calibration: expected calibration error, a reliability table and the Brier score
+* single-item and batched inference latency percentiles
+* model memory: artifact size, plus load time and RSS growth measured in a
+  fresh interpreter
+
+The report is JSON, so runs can be diffed between versions:
+
+    python evaluate.py --mongo --output reports/v20240101.json
+    python evaluate.py --version 20240201-120000 --mongo --compare reports/v20240101.json
+    python evaluate.py --jsonl complaints.jsonl --limit 5000
+"""
+
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+from bson import json_util
+from dotenv import load_dotenv
+
+from compact_model import artifact_paths, probe_load
+from config import Config
+from inference import predict_batch
+from model_registry import ModelRegistry, complaint_label, in_holdout
+from train_model import csv_source, mongo_source
+
+# Headline numbers shown by --compare (higher is better unless listed in LOWER_IS_BETTER)
+HEADLINE = ('accuracy', 'macro_f1', 'ece', 'brier', 'single_p50_ms', 'single_p99_ms', 'batch_per_item_ms',
+            'load_rss_kb')
+LOWER_IS_BETTER = {'ece', 'brier', 'single_p50_ms', 'single_p99_ms', 'batch_per_item_ms', 'load_rss_kb'}
+
+
+def jsonl_source(path, chunk_size, holdout_every=0):
+    """Labelled complaints from a JSON lines export; with ``holdout_every``, only held-out ones"""
+    def stream():
+        texts, labels = [], []
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                doc = json_util.loads(line)
+                label = complaint_label(doc)
+                if holdout_every and '_id' in doc and not in_holdout(doc['_id'], holdout_every):
+                    continue
+                if doc.get('text') and label:
+                    texts.append(doc['text'])
+                    labels.append(label)
+                if len(texts) == chunk_size:
+                    yield texts, labels
+                    texts, labels = [], []
+        if texts:
+            yield texts, labels
+    return stream
+
+
+def load_samples(source, limit=None):
+    texts, labels = [], []
+    for chunk_texts, chunk_labels in source():
+        texts.extend(chunk_texts)
+        labels.extend(chunk_labels)
+        if limit and len(texts) >= limit:
+            break
+    return texts[:limit] if limit else texts, labels[:limit] if limit else labels
+
+
+# -- quality ---------------------------------------------------------------
+
+def classification_report(y_true, y_pred, labels):
+    """Accuracy, macro-F1, per-category scores and the confusion matrix (rows: truth)"""
+    index = {label: i for i, label in enumerate(labels)}
+    matrix = np.zeros((len(labels), len(labels)), dtype=np.int64)
+    np.add.at(matrix, ([index[t] for t in y_true], [index[p] for p in y_pred]), 1)
+    true_positives = np.diag(matrix).astype(float)
+    predicted, support = matrix.sum(axis=0), matrix.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precision = np.where(predicted > 0, true_positives / predicted, 0.0)
+        recall = np.where(support > 0, true_positives / support, 0.0)
+        f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+    # Macro average over the categories that occur in the truth or the predictions
+    present = (support > 0) | (predicted > 0)
+    return {
+        'accuracy': float(true_positives.sum() / max(len(y_true), 1)),
+        'macro_f1': float(f1[present].mean()) if present.any() else 0.0,
+        'per_category': {label: {'precision': float(precision[i]), 'recall': float(recall[i]), 'f1': float(f1[i]),
+                                 'support': int(support[i])} for i, label in enumerate(labels) if present[i]},
+        'confusion_matrix': {'labels': list(labels), 'matrix': matrix.tolist()},
+    }
+
+
+def calibration_report(proba, classes, y_true, bins=10):
+    """Expected calibration error and reliability table of the top-class confidence, plus Brier score"""
+    classes = [str(c) for c in classes]
+    confidence = proba.max(axis=1)
+    correct = np.array([classes[i] == t for i, t in zip(proba.argmax(axis=1), y_true)], dtype=float)
+    edges = np.linspace(0.0, 1.0, bins + 1)
+    bucket = np.clip(np.digitize(confidence, edges[1:-1]), 0, bins - 1)
+    table, ece = [], 0.0
+    for b in range(bins):
+        mask = bucket == b
+        if not mask.any():
+            continue
+        gap = abs(confidence[mask].mean() - correct[mask].mean())
+        ece += mask.mean() * gap
+        table.append({'range': [float(edges[b]), float(edges[b + 1])], 'count': int(mask.sum()),
+                      'confidence': float(confidence[mask].mean()), 'accuracy': float(correct[mask].mean())})
+    index = {c: i for i, c in enumerate(classes)}
+    onehot = np.zeros_like(proba)
+    for row, label in enumerate(y_true):
+        if label in index:
+            onehot[row, index[label]] = 1.0
+    return {
+        'ece': float(ece),
+        'brier': float(((proba - onehot) ** 2).sum(axis=1).mean()),
+        'mean_confidence': float(confidence.mean()),
+        'reliability': table,
+    }
+
+
+# -- speed and memory ------------------------------------------------------
+
+def _percentiles(values):
+    values = np.asarray(values)
+    return {f"p{q}": float(np.percentile(values, q)) for q in (50, 90, 95, 99)}
+
+
+def latency_report(model, vectorizer, texts, single_samples=200, batch_sizes=(32, 256), repeats=5):
+    """Milliseconds per call for single complaints and per item for batches"""
+    texts = list(texts) or ['warm up']
+    predict_batch(model, vectorizer, texts[:1])  # lazy state (e.g. scipy imports) outside the timing
+    single = []
+    for i in range(single_samples):
+        text = texts[i % len(texts)]
+        start = time.perf_counter()
+        predict_batch(model, vectorizer, [text])
+        single.append((time.perf_counter() - start) * 1000)
+    report = {'single_ms': _percentiles(single), 'batch_per_item_ms': {}}
+    for size in batch_sizes:
+        batch = [texts[i % len(texts)] for i in range(size)]
+        per_item = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            predict_batch(model, vectorizer, batch)
+            per_item.append((time.perf_counter() - start) * 1000 / size)
+        report['batch_per_item_ms'][str(size)] = _percentiles(per_item)
+    return report
+
+
+def memory_report(version, fmt):
+    model_path, vectorizer_path, compact_path = artifact_paths(version)
+    if fmt == 'compact':
+        artifact = sum(os.path.getsize(os.path.join(compact_path, n)) for n in os.listdir(compact_path))
+    else:
+        artifact = os.path.getsize(model_path) + os.path.getsize(vectorizer_path)
+    # Load in a fresh interpreter so nothing already imported here is counted
+    probe = probe_load(fmt, model_path, vectorizer_path, compact_path)
+    return {'format': fmt, 'artifact_bytes': artifact, 'load_ms': probe['load_ms'], 'load_rss_kb': probe['rss_delta_kb']}
+
+
+# -- report ----------------------------------------------------------------
+
+def evaluate(model, vectorizer, texts, labels, bins=10):
+    """Quality and calibration of a loaded pair on (texts, labels)"""
+    if not texts:
+        raise ValueError('No labelled complaints to evaluate against')
+    proba = model.predict_proba(vectorizer.transform(texts))
+    classes = [str(c) for c in model.classes_]
+    predictions = [classes[i] for i in proba.argmax(axis=1)]
+    labels_seen = list(classes) + sorted(set(labels) - set(classes))
+    report = classification_report(labels, predictions, labels_seen)
+    report['calibration'] = calibration_report(proba, classes, labels, bins)
+    report['samples'] = len(texts)
+    return report
+
+
+def headline(report):
+    latency = report.get('latency', {})
+    batch = latency.get('batch_per_item_ms', {})
+    return {
+        'accuracy': report.get('accuracy'),
+        'macro_f1': report.get('macro_f1'),
+        'ece': report.get('calibration', {}).get('ece'),
+        'brier': report.get('calibration', {}).get('brier'),
+        'single_p50_ms': latency.get('single_ms', {}).get('p50'),
+        'single_p99_ms': latency.get('single_ms', {}).get('p99'),
+        'batch_per_item_ms': batch[max(batch, key=int)]['p50'] if batch else None,
+        'load_rss_kb': report.get('memory', {}).get('load_rss_kb'),
+    }
+
+
+def compare(report, baseline):
+    """Per-metric (baseline, current, change, better?) for two reports"""
+    current, previous = headline(report), headline(baseline)
+    rows = {}
+    for name in HEADLINE:
+        a, b = previous.get(name), current.get(name)
+        if a is None or b is None:
+            continue
+        rows[name] = {'baseline': a, 'current': b, 'change': b - a,
+                      'better': (b < a) if name in LOWER_IS_BETTER else (b > a)}
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Evaluate a classifier version on confirmed complaints')
+    parser.add_argument('--version', help='Registry version (default: active, else the legacy pair)')
+    source_group = parser.add_mutually_exclusive_group(required=True)
+    source_group.add_argument('--mongo', action='store_true',
+                              help='Held-out complaints with feedback or a manual category')
+    source_group.add_argument('--csv', help='CSV with text and label/category columns')
+    source_group.add_argument('--jsonl', help='Complaint documents, one JSON object per line (mongoexport)')
+    parser.add_argument('--text-column')
+    parser.add_argument('--label-column')
+    parser.add_argument('--language', help='Only complaints in this language (--mongo)')
+    parser.add_argument('--limit', type=int, help='Evaluate on at most N complaints')
+    parser.add_argument('--bins', type=int, default=10, help='Calibration bins')
+    parser.add_argument('--format', choices=['joblib', 'compact'], default=Config.MODEL_FORMAT,
+                        help='Artifact to load and measure (default MODEL_FORMAT)')
+    parser.add_argument('--no-memory', action='store_true', help='Skip the fresh-interpreter load measurement')
+    parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+    parser.add_argument('--compare', help='Earlier report to compare the headline metrics with')
+    parser.add_argument('--record', action='store_true', help="Append the headline to the version's metadata")
+    args = parser.parse_args()
+    load_dotenv()
+
+    registry = ModelRegistry()
+    version = args.version or registry.state().get('active')
+    # The holdout the version was trained without (seed and legacy models saw no complaints)
+    holdout_every = (registry.metadata(version) if version else {}).get('holdout_every', Config.HOLDOUT_EVERY)
+    if args.mongo:
+        if not holdout_every:
+            raise SystemExit(f"{version} was trained on every labelled complaint; there is nothing held out to score")
+        uri = os.getenv('MONGO_URI', 'mongodb://localhost:27017/complaint_system')
+        source, source_name = mongo_source(uri, 10000, args.language, holdout_every, held_out=True), 'mongo'
+    elif args.csv:
+        source, source_name = csv_source(args.csv, 10000, args.text_column, args.label_column), f"csv:{args.csv}"
+    else:
+        source, source_name = jsonl_source(args.jsonl, 10000, holdout_every), f"jsonl:{args.jsonl}"
+    texts, labels = load_samples(source, args.limit)
+
+    model_path, vectorizer_path, compact_path = artifact_paths(version)
+    fmt = args.format if os.path.exists(os.path.join(compact_path, 'meta.json')) else 'joblib'
+    if fmt == 'compact':
+        from compact_model import load_compact
+        model, vectorizer = load_compact(compact_path)
+    else:
+        import joblib
+        model, vectorizer = joblib.load(model_path), joblib.load(vectorizer_path)
+
+    report = {'version': version or 'legacy', 'source': source_name,
+              'holdout_every': None if args.csv else holdout_every,
+              'evaluated_at': datetime.now(timezone.utc).isoformat()}
+    report.update(evaluate(model, vectorizer, texts, labels, args.bins))
+    report['latency'] = latency_report(model, vectorizer, texts)
+    if not args.no_memory:
+        report['memory'] = memory_report(version, fmt)
+    if args.compare:
+        with open(args.compare) as f:
+            report['comparison'] = compare(report, json.load(f))
+    if args.record and version:
+        metadata = registry.metadata(version)
+        entry = dict(headline(report), evaluated_at=report['evaluated_at'], samples=report['samples'], source=source_name)
+        registry.update_metadata(version, evaluations=metadata.get('evaluations', []) + [entry])
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        summary = headline(report)
+        print(f"📊 {report['version']}: accuracy={summary['accuracy']:.3f} macro_f1={summary['macro_f1']:.3f} "
+              f"ece={summary['ece']:.3f} p50={summary['single_p50_ms']:.2f}ms -> {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,254 @@
+"""
+Write-behind event log.
+
+Request handlers call ``EventLog.record()``, which only puts the event on a
+bounded in-process queue. A background thread drains the queue and writes
+batches with one ``insert_many`` (``MongoEventSink``) or one appended block of
+JSON lines (``FileEventSink``), so auditing adds no database round-trip to
+the write path.
+
+Backpressure: when the queue is full ``record()`` blocks for at most
+``put_timeout`` seconds, then drops the event and counts it. While the sink
+is failing the writer keeps retrying its current batch instead of draining
+further, so the queue fills and producers slow down rather than memory
+growing without bound.
+
+Shutdown: ``close()`` (registered with atexit, and called from the gunicorn
+``worker_exit`` hook and the ASGI lifespan shutdown) drains everything still
+queued. A batch the sink still refuses at that point is spilled to a local
+JSON lines file so nothing is silently lost. Events recorded after
+``close()`` are written (or spilled) on the caller's thread.
+"""
+
+import atexit
+import glob
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+from bson.objectid import ObjectId
+from pymongo import DESCENDING
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+class MongoEventSink:
+    """Batched inserts into a collection, newest-first history per complaint.
+
+    ``get_collection`` is called for every batch so the sink follows
+    ``connect_db()`` re-creating the client after fork.
+    """
+
+    def __init__(self, get_collection):
+        self.get_collection = get_collection
+
+    def write(self, events):
+        self.get_collection().insert_many(events, ordered=False)
+
+    def history(self, complaint_id, before=None, limit=50):
+        query = {'complaint_id': complaint_id}
+        if before is not None:
+            query['_id'] = {'$lt': before}
+        return list(self.get_collection().find(query).sort('_id', DESCENDING).limit(limit))
+
+
+class FileEventSink:
+    """JSON lines files under ``directory``, one per process, rotated by size"""
+
+    def __init__(self, directory, max_bytes=10 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _path(self):
+        # Per-process files: prefork workers never interleave or race on rotation
+        return os.path.join(self.directory, f"events-{os.getpid()}.jsonl")
+
+    def write(self, events):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path()
+        block = ''.join(json.dumps(e, default=_json_default) + '\n' for e in events)
+        with open(path, 'a') as f:
+            f.write(block)
+            size = f.tell()
+        if size >= self.max_bytes:
+            stamp = datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S%f')
+            os.replace(path, os.path.join(self.directory, f"events-{os.getpid()}-{stamp}.jsonl"))
+
+    def history(self, complaint_id, before=None, limit=50):
+        # Full scan; fine for local development, use the Mongo sink in production
+        key, cutoff = str(complaint_id), str(before) if before is not None else None
+        found = []
+        for path in glob.glob(os.path.join(self.directory, '*.jsonl')):
+            with open(path) as f:
+                for line in f:
+                    event = json.loads(line)
+                    if event.get('complaint_id') == key and (cutoff is None or event['_id'] < cutoff):
+                        found.append(event)
+        found.sort(key=lambda e: e['_id'], reverse=True)
+        return found[:limit]
+
+
+class EventLog:
+    def __init__(self, sink, max_queue=10000, batch_size=500, flush_interval=1.0, put_timeout=0.05,
+                 spill_dir='logs'):
+        self.sink = sink
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.spill_dir = spill_dir
+        self.dropped = 0
+        self.written = 0
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._closed = False
+        self._wake = threading.Event()
+        self._start_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        atexit.register(self.close)
+
+    def _ensure_started(self):
+        # Started lazily and re-created after fork: a thread and queue
+        # inherited from the gunicorn master do not exist in the worker
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.max_queue)
+            self._closed = False
+            self._wake = threading.Event()
+            self._thread = threading.Thread(target=self._run, name='event-log-writer', daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def record(self, action, complaint_id=None, user=None, **details):
+        """Queue one event; returns False if it had to be dropped"""
+        self._ensure_started()
+        event = {
+            '_id': ObjectId(),
+            'complaint_id': ObjectId(complaint_id) if isinstance(complaint_id, str) else complaint_id,
+            'action': action,
+            'user': user,
+            'created_at': datetime.now(timezone.utc),
+        }
+        event.update(details)
+        if self._closed:
+            # The writer has stopped (atexit, late requests during worker exit)
+            self._write_or_spill([event])
+            return True
+        try:
+            self._queue.put(event, timeout=self.put_timeout)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                print(f"⚠️  Event log queue full, {self.dropped} events dropped")
+            return False
+
+    def _take_batch(self, timeout):
+        batch = []
+        try:
+            batch.append(self._queue.get(timeout=timeout))
+            while len(batch) < self.batch_size:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _write(self, batch):
+        with self._write_lock:
+            self.sink.write(batch)
+            self.written += len(batch)
+        self._done(batch)
+
+    def _done(self, batch):
+        for _ in batch:
+            self._queue.task_done()
+
+    def _run(self):
+        batch, backoff, failing = [], self.flush_interval, False
+        while not (self._closed and self._queue.empty() and not batch):
+            if not batch:
+                batch = self._take_batch(self.flush_interval)
+                if not batch:
+                    continue
+            if self._closed and failing:
+                # Shutting down with the sink down: don't spend the join timeout on more attempts
+                self._spill(batch)
+                self._done(batch)
+                batch = []
+                continue
+            try:
+                self._write(batch)
+                batch, backoff, failing = [], self.flush_interval, False
+            except Exception as e:
+                failing = True
+                if self._closed:
+                    continue
+                # Keep the batch and stop draining; the full queue pushes back on producers.
+                # close() cuts the wait short so the batch is spilled in time
+                print(f"Event log write failed, retrying in {backoff:.1f}s: {e}")
+                self._wake.wait(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+    def _spill(self, batch):
+        os.makedirs(self.spill_dir, exist_ok=True)
+        path = os.path.join(self.spill_dir, f"event-log-spill-{os.getpid()}.jsonl")
+        with open(path, 'a') as f:
+            for event in batch:
+                f.write(json.dumps(event, default=_json_default) + '\n')
+        print(f"⚠️  Spilled {len(batch)} unwritten events to {path}")
+
+    def _write_or_spill(self, batch):
+        """Write on the caller's thread once the writer has stopped"""
+        try:
+            with self._write_lock:
+                self.sink.write(batch)
+                self.written += len(batch)
+        except Exception as e:
+            print(f"Event log write failed after close: {e}")
+            self._spill(batch)
+
+    def flush(self, timeout=5.0):
+        """Write everything queued so far before returning (tests, admin tooling)"""
+        if self._pid != os.getpid():
+            return
+        while True:
+            batch = self._take_batch(0)
+            if not batch:
+                break
+            self._write(batch)
+        # Wait for a batch the writer thread picked up before we got here
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def close(self, timeout=10.0):
+        """Stop the writer after it has drained the queue"""
+        if self._pid != os.getpid() or self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            print('⚠️  Event log writer did not finish in time')
+            return
+        # Events queued after the writer's last look at the queue
+        while True:
+            batch = self._take_batch(0)
+            if not batch:
+                break
+            self._write_or_spill(batch)
+            self._done(batch)
+
+    def history(self, complaint_id, before=None, limit=50):
+        return self.sink.history(complaint_id, before, limit)
@@ -0,0 +1,57 @@
+"""
+Gunicorn configuration for the prefork WSGI deployment (see wsgi.py).
+
+Every setting can be overridden from the environment.
+"""
+
+import gc
+import os
+
+
+def _cpu_count():
+    # Respect container CPU affinity where the platform exposes it
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8888')
+workers = int(os.getenv('WEB_CONCURRENCY', _cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', '1'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+
+# Load the app (model, vectorizer, TextBlob corpora) once in the master
+preload_app = True
+
+# Recycle workers to bound slow memory growth
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '1000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '100'))
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+
+
+def pre_fork(server, worker):
+    # Loading the app connected to Mongo (admin user, indexes); close that
+    # client so the worker starts without the master's sockets and monitors
+    from app import close_db
+    close_db()
+    # Move everything loaded so far out of the GC's tracked generations so
+    # collections in the workers don't touch (and copy) the shared pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Each worker needs its own MongoClient; the master's isn't fork-safe
+    from app import connect_db, sampler, Config
+    connect_db()
+    # Join on-demand sampling even before this worker serves a request
+    if Config.PROFILING_ENABLED:
+        sampler.ensure_watcher()
+
+
+def worker_exit(server, worker):
+    # Drain the write-behind audit log before the worker goes away
+    from app import event_log
+    event_log.close()
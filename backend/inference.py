@@ -0,0 +1,57 @@
+"""
+Batched complaint classification.
+
+One ``predict_proba`` call per batch gives the predicted category, its
+confidence and the runner-up categories, so single complaints and bulk
+jobs go through the same code path.
+"""
+
+import numpy as np
+
+UNCATEGORIZED = 'uncategorized'
+
+
+def _fallback():
+    return {'category': UNCATEGORIZED, 'confidence': 0.0, 'top_categories': []}
+
+
+def predict_batch(model, vectorizer, texts, top_k=3):
+    """Classify a list of texts; returns one result dict per text.
+
+    Each result has ``category``, ``confidence`` and ``top_categories`` (up
+    to ``top_k`` ``{'category', 'probability'}`` entries, best first).
+    """
+    if not texts:
+        return []
+    if model is None or vectorizer is None:
+        return [_fallback() for _ in texts]
+    try:
+        proba = model.predict_proba(vectorizer.transform(texts))
+    except Exception as e:
+        print(f"Prediction error: {e}")
+        return [_fallback() for _ in texts]
+
+    classes = model.classes_
+    k = max(1, min(top_k, len(classes)))
+    if k < len(classes):
+        # Partial sort: only the k best columns need ordering
+        top = np.argpartition(-proba, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(proba, top, axis=1), axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+    else:
+        top = np.argsort(-proba, axis=1)
+
+    results = []
+    for row, indices in zip(proba, top):
+        best = indices[0]
+        results.append({
+            'category': str(classes[best]),
+            'confidence': float(row[best]),
+            'top_categories': [{'category': str(classes[i]), 'probability': float(row[i])} for i in indices],
+        })
+    return results
+
+
+def needs_review(result, threshold):
+    """True when a prediction is too uncertain to trust without an admin"""
+    return result['confidence'] < threshold
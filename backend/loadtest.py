@@ -0,0 +1,545 @@
+#!/usr/bin/env python3
+"""
+Concurrent-connection load test for the complaint API.
+
+Opens N keep-alive connections per step and hammers the read endpoints
+for a fixed duration, then reports throughput, latency percentiles and
+error counts. Pass several --url values to compare serving paths side by
+side, e.g. the WSGI server against the ASGI one:
+
+    gunicorn -c gunicorn.conf.py wsgi:app              # :8888
+    uvicorn asgi:application --port 8000 --workers 1
+    python loadtest.py --url http://localhost:8888 --url http://localhost:8000 \\
+        --concurrency 10,50,200,500 --duration 15
+
+With --rps it instead replays a traffic mix at a fixed arrival rate (open
+loop): creates with complaint text drawn from the category vocabulary,
+list/detail reads, status updates, feedback, dashboard and export. Latency
+is measured from each request's scheduled start, so time spent queueing
+behind a saturated server is counted rather than hidden. A generated
+schedule can be saved and replayed exactly against another deployment:
+
+    python loadtest.py --url http://localhost:8888 --rps 200 --mix default --duration 60 \\
+        --save-schedule peak.jsonl
+    python loadtest.py --url http://localhost:8000 --replay peak.jsonl
+
+--local starts the app on this machine first (in a subprocess, against
+MONGO_URI or, with --mongomock, an in-memory database):
+
+    python loadtest.py --local --mongomock --rps 50 --mix intake --duration 20
+
+Creates are rate limited per user, so a mix is spread over enough
+``loadtest-<n>`` users that each stays within --create-limit: 50 rps of
+the intake mix (80% creates) at 30 creates/60s per user needs
+50 × 0.8 × 60 / 30 = 80 users. Unless --users or --user is given they are
+provisioned automatically; too few is refused rather than reported as
+429s.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter, deque
+from itertools import cycle
+from urllib.parse import urlsplit
+
+from rate_limit import parse_rate
+
+
+class HTTPConnection:
+    """Minimal asyncio HTTP/1.1 client with keep-alive (stdlib only)"""
+
+    def __init__(self, url, timeout=30):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.ssl = parts.scheme == 'https'
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+
+    async def _connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port, ssl=self.ssl or None)
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=None, headers=None):
+        """Send a request; returns (status, body bytes)"""
+        if self.writer is None:
+            await self._connect()
+        payload = b''
+        lines = [f'{method} {path} HTTP/1.1', f'Host: {self.host}:{self.port}', 'Connection: keep-alive']
+        if body is not None:
+            payload = json.dumps(body).encode('utf-8')
+            lines += ['Content-Type: application/json', f'Content-Length: {len(payload)}']
+        for name, value in (headers or {}).items():
+            lines.append(f'{name}: {value}')
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + payload)
+        try:
+            return await asyncio.wait_for(self._read_response(), self.timeout)
+        except BaseException:
+            await self.close()
+            raise
+
+    async def _read_response(self):
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError('connection closed by server')
+        version, status = status_line.split(b' ', 2)[:2]
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if 'content-length' in headers:
+            data = await self.reader.readexactly(int(headers['content-length']))
+        elif headers.get('transfer-encoding', '').lower() == 'chunked':
+            data = b''
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    await self.reader.readline()
+                    break
+                data += await self.reader.readexactly(size)
+                await self.reader.readline()
+        else:
+            data = await self.reader.read()
+        connection = headers.get('connection', '').lower()
+        if connection == 'close' or (version == b'HTTP/1.0' and connection != 'keep-alive'):
+            await self.close()
+        return int(status), data
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def login(url, username, password):
+    conn = HTTPConnection(url)
+    try:
+        status, body = await conn.request('POST', '/api/auth/login', {'username': username, 'password': password})
+    finally:
+        await conn.close()
+    if status != 200:
+        raise SystemExit(f'Login against {url} failed with HTTP {status}: {body[:200]!r}')
+    return json.loads(body)['token']
+
+
+async def run_step(url, token, paths, concurrency, duration):
+    """Drive `concurrency` connections for `duration` seconds"""
+    headers = {'Authorization': f'Bearer {token}'}
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(offset):
+        nonlocal errors
+        conn = HTTPConnection(url)
+        i = offset
+        while time.perf_counter() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            start = time.perf_counter()
+            try:
+                status, _ = await conn.request('GET', path, headers=headers)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+                errors += 1
+                continue
+            if status >= 400:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - start)
+        await conn.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'url': url,
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+    }
+
+
+# Subjects and problems per category (Config.CATEGORIES); the phrases overlap
+# the classifier's seed data and the priority keywords, so generated traffic
+# exercises every category, sentiment and priority
+CATEGORY_VOCABULARY = {
+    'billing': (['invoice', 'refund', 'card payment', 'subscription', 'bill'],
+                ['was charged twice', 'shows the wrong amount', 'was never refunded', 'has a fee I never agreed to']),
+    'delivery': (['package', 'parcel', 'order', 'shipment', 'courier'],
+                 ['arrived damaged', 'never arrived', 'was left at the wrong address', 'is two weeks late']),
+    'quality': (['product', 'fabric', 'screen', 'material', 'item'],
+                ['feels cheap', 'broke after a week', 'is poor quality', 'does not match the description']),
+    'service': (['support agent', 'staff', 'call centre', 'manager', 'service'],
+                ['was rude to me', 'never called back', 'was excellent', 'kept me on hold for an hour']),
+    'technical': (['website', 'app', 'login page', 'checkout', 'password reset'],
+                  ['is not working', 'shows an error', 'keeps crashing', 'fails to load']),
+}
+OPENERS = ('The ', 'My ', 'URGENT: the ', 'Hello, my ')
+CLOSERS = ('', ' Please fix this.', ' Thanks for the help!', ' This is unacceptable.', ' I need this sorted asap.')
+STATUSES = ('in_progress', 'resolved', 'closed')
+
+# name -> (method, path, needs an existing complaint)
+OPERATIONS = {
+    'create': ('POST', '/api/complaints', False),
+    'list': ('GET', '/api/complaints?per_page=20', False),
+    'get': ('GET', '/api/complaints/{cid}', True),
+    'update': ('PUT', '/api/complaints/{cid}', True),
+    'feedback': ('POST', '/api/complaints/{cid}/feedback', True),
+    'dashboard': ('GET', '/api/dashboard/summary', False),
+    'export': ('GET', '/api/complaints/export?format=csv', False),
+}
+# Relative weights of each operation
+MIXES = {
+    'default': {'create': 25, 'list': 30, 'get': 20, 'update': 10, 'feedback': 5, 'dashboard': 9, 'export': 1},
+    'browse': {'list': 50, 'get': 30, 'dashboard': 20},
+    'intake': {'create': 80, 'list': 10, 'get': 10},
+    'triage': {'list': 30, 'get': 20, 'update': 30, 'feedback': 20},
+}
+# Operations sent with the admin token; the rest go out as regular users
+ADMIN_OPERATIONS = ('update', 'feedback', 'export')
+LOADTEST_PASSWORD = 'loadtest-pass'
+# Users per bulk provisioning request (the server's default USER_BULK_MAX)
+PROVISION_BATCH = 200
+# The server's per-user create limit (RATE_LIMIT_CREATE_COMPLAINT), unless --create-limit says otherwise
+CREATE_LIMIT = os.getenv('RATE_LIMIT_CREATE_COMPLAINT', '30/60')
+
+
+def complaint_text(rng, category=None):
+    category = category or rng.choice(sorted(CATEGORY_VOCABULARY))
+    subjects, problems = CATEGORY_VOCABULARY[category]
+    return f"{rng.choice(OPENERS)}{rng.choice(subjects)} {rng.choice(problems)}.{rng.choice(CLOSERS)}"
+
+
+def parse_mix(value):
+    """A named mix, or ``op=weight,...``"""
+    if value in MIXES:
+        return MIXES[value]
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation {name!r} (expected one of {', '.join(OPERATIONS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def request_body(op, rng):
+    if op == 'create':
+        return {'text': complaint_text(rng)}
+    if op == 'update':
+        return {'status': rng.choice(STATUSES)}
+    if op == 'feedback':
+        if rng.random() < 0.8:
+            return {'is_correct': True}
+        return {'is_correct': False, 'correct_category': rng.choice(sorted(CATEGORY_VOCABULARY))}
+    return None
+
+
+def build_schedule(mix, rps, duration, seed=0):
+    """Poisson arrivals at ``rps`` for ``duration`` seconds: ``[{'at', 'op', 'body'}]``"""
+    rng = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    schedule, at = [], rng.expovariate(rps)
+    while at < duration:
+        op = rng.choices(names, weights)[0]
+        schedule.append({'at': round(at, 6), 'op': op, 'body': request_body(op, rng)})
+        at += rng.expovariate(rps)
+    return schedule
+
+
+def save_schedule(schedule, path):
+    with open(path, 'w') as f:
+        for item in schedule:
+            f.write(json.dumps(item) + '\n')
+
+
+def load_schedule(path, speed=1.0):
+    with open(path) as f:
+        schedule = [json.loads(line) for line in f if line.strip()]
+    for item in schedule:
+        item['at'] /= speed
+    return schedule
+
+
+def users_needed(create_rate, create_limit=CREATE_LIMIT):
+    """Fewest users whose per-user create limits (``'count/seconds'``) together sustain `create_rate` per second"""
+    rate = parse_rate(create_limit)
+    if rate is None or create_rate <= 0:
+        return 1
+    return math.ceil(round(create_rate / rate[0], 6))
+
+
+async def complaint_ids(url, token, needed):
+    """Recent complaint ids to read, update and give feedback on; creates a few if there are none"""
+    conn = HTTPConnection(url)
+    headers = {'Authorization': f'Bearer {token}'}
+    try:
+        status, body = await conn.request('GET', '/api/complaints?per_page=100&fields=_id', headers=headers)
+        ids = [c['_id'] for c in json.loads(body)['complaints']] if status == 200 else []
+        rng = random.Random(0)
+        while len(ids) < needed:
+            status, body = await conn.request('POST', '/api/complaints', {'text': complaint_text(rng)}, headers)
+            if status not in (200, 201, 202):
+                raise SystemExit(f'Could not create seed complaints: HTTP {status}: {body[:200]!r}')
+            ids.append(json.loads(body)['complaint']['_id'])
+    finally:
+        await conn.close()
+    return ids
+
+
+def summarize(latencies, errors):
+    latencies = sorted(latencies)
+    requests = len(latencies) + sum(errors.values())
+    return {
+        'requests': requests,
+        'errors': dict(errors),
+        'error_rate': sum(errors.values()) / requests if requests else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p90_ms': percentile(latencies, 90) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'max_ms': (latencies[-1] if latencies else 0.0) * 1000,
+    }
+
+
+async def run_schedule(url, tokens, schedule, connections, seed=0):
+    """Send each scheduled request at its time over at most `connections` keep-alive connections"""
+    rng = random.Random(seed)
+    needs_ids = any(OPERATIONS[item['op']][2] for item in schedule)
+    ids = deque(await complaint_ids(url, tokens['admin'], 20) if needs_ids else (), maxlen=10000)
+    pool = asyncio.Queue()
+    for _ in range(connections):
+        pool.put_nowait(HTTPConnection(url))
+    latencies = {op: [] for op in OPERATIONS}
+    errors = {op: Counter() for op in OPERATIONS}
+    # Round-robin each operation over the users so no one exceeds their share of the rate limit
+    turns = {op: cycle(tokens['users']) for op in OPERATIONS}
+
+    async def fire(item, scheduled):
+        op = item['op']
+        method, path, needs_id = OPERATIONS[op]
+        if needs_id:
+            path = path.format(cid=rng.choice(ids))
+        token = tokens['admin'] if op in ADMIN_OPERATIONS else next(turns[op])
+        conn = await pool.get()
+        try:
+            status, body = await conn.request(method, path, item.get('body'), {'Authorization': f'Bearer {token}'})
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as e:
+            errors[op][type(e).__name__] += 1
+            return
+        finally:
+            pool.put_nowait(conn)
+        if status >= 400:
+            errors[op][str(status)] += 1
+            return
+        latencies[op].append(time.perf_counter() - scheduled)
+        if op == 'create':
+            ids.append(json.loads(body)['complaint']['_id'])
+
+    started = time.perf_counter()
+    tasks = []
+    for item in schedule:
+        scheduled = started + item['at']
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(fire(item, scheduled)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    while not pool.empty():
+        await pool.get_nowait().close()
+
+    ops = {op: summarize(latencies[op], errors[op]) for op in OPERATIONS if latencies[op] or errors[op]}
+    total = summarize([x for op in OPERATIONS for x in latencies[op]],
+                      sum((errors[op] for op in OPERATIONS), Counter()))
+    scheduled_for = schedule[-1]['at'] if schedule else 0.0
+    total.update(url=url, target_rps=len(schedule) / scheduled_for if scheduled_for else 0.0,
+                 rps=total['requests'] / elapsed if elapsed else 0.0, operations=ops)
+    return total
+
+
+def print_mix_result(result):
+    print(f"{result['url']}  target={result['target_rps']:.1f} rps  achieved={result['rps']:.1f} rps")
+    rows = list(result['operations'].items()) + [('total', result)]
+    print(f"  {'operation':<10} {'requests':>8} {'errors':>7} {'p50':>9} {'p90':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    for name, row in rows:
+        print(f"  {name:<10} {row['requests']:>8} {row['error_rate']:>7.1%} {row['p50_ms']:>7.1f}ms "
+              f"{row['p90_ms']:>7.1f}ms {row['p95_ms']:>7.1f}ms {row['p99_ms']:>7.1f}ms {row['max_ms']:>7.1f}ms"
+              + (f"  {row['errors']}" if row['errors'] else ''))
+
+
+async def provision_users(url, admin_token, count):
+    """Create ``loadtest-<n>`` users through the bulk admin endpoint (existing ones are kept) and log them in"""
+    usernames = [f'loadtest-{n}' for n in range(count)]
+    conn = HTTPConnection(url)
+    try:
+        for start in range(0, count, PROVISION_BATCH):
+            status, body = await conn.request('POST', '/api/admin/users/bulk', {'create': [
+                {'username': name, 'password': LOADTEST_PASSWORD, 'role': 'user'}
+                for name in usernames[start:start + PROVISION_BATCH]]}, {'Authorization': f'Bearer {admin_token}'})
+            if status != 200:
+                raise SystemExit(f'Provisioning {count} users failed with HTTP {status}: {body[:200]!r}')
+    finally:
+        await conn.close()
+    return await asyncio.gather(*(login(url, name, LOADTEST_PASSWORD) for name in usernames))
+
+
+def serve(port, use_mongomock=False):
+    """Run the app on this process (threaded dev server), optionally on an in-memory mongomock database"""
+    if use_mongomock:
+        import flask_pymongo
+        import mongomock
+        flask_pymongo.MongoClient = mongomock.MongoClient
+    import logging
+    from werkzeug.serving import run_simple
+    import app as flask_module
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    run_simple('127.0.0.1', port, flask_module.app, threaded=True)
+
+
+def start_local(use_mongomock=False, timeout=60):
+    """Start `serve` in a subprocess on a free port; returns (process, url)"""
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    command = [sys.executable, os.path.abspath(__file__), '--serve', str(port)] + (['--mongomock'] if use_mongomock else [])
+    process = subprocess.Popen(command, cwd=os.path.dirname(os.path.abspath(__file__)))
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f'Local app exited with code {process.returncode}')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process, f'http://127.0.0.1:{port}'
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise SystemExit(f'Local app did not start listening within {timeout}s')
+
+
+async def run_mix(args, urls):
+    if args.replay:
+        schedule = load_schedule(args.replay, args.speed)
+        creates = sum(item['op'] == 'create' for item in schedule)
+        create_rate = creates / schedule[-1]['at'] if creates and schedule[-1]['at'] else 0.0
+    else:
+        mix = parse_mix(args.mix)
+        schedule = build_schedule(mix, args.rps, args.duration, args.seed)
+        create_rate = args.rps * mix.get('create', 0) / sum(mix.values())
+    if args.save_schedule:
+        save_schedule(schedule, args.save_schedule)
+    needed = users_needed(create_rate, args.create_limit)
+    if (args.users and args.users < needed) or (args.user and needed > 1):
+        raise SystemExit(f"{create_rate:.1f} creates/s at {args.create_limit} per user needs --users {needed} "
+                         f"or more (or --create-limit matching the server)")
+    results = []
+    for url in urls:
+        tokens = {'admin': await login(url, args.username, args.password)}
+        if args.user:
+            username, _, password = args.user.partition(':')
+            tokens['users'] = [await login(url, username, password)]
+        elif args.users or needed > 1:
+            users = args.users or needed
+            if not args.users:
+                print(f'Provisioning {users} users to stay within {args.create_limit} creates per user')
+            tokens['users'] = await provision_users(url, tokens['admin'], users)
+        else:
+            tokens['users'] = [tokens['admin']]
+        result = await run_schedule(url, tokens, schedule, args.connections, args.seed)
+        results.append(result)
+        print_mix_result(result)
+    return results
+
+
+async def main(args, urls):
+    if args.rps or args.replay:
+        results = await run_mix(args, urls)
+    else:
+        results = await run_sweep(args, urls)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+async def run_sweep(args, urls):
+    paths = args.path or ['/api/complaints?per_page=20', '/api/dashboard/summary']
+    levels = [int(c) for c in args.concurrency.split(',')]
+    results = []
+    for url in urls:
+        token = await login(url, args.username, args.password)
+        for level in levels:
+            result = await run_step(url, token, paths, level, args.duration)
+            results.append(result)
+            print(f"{url:<28} c={level:<5} rps={result['rps']:>8.1f} "
+                  f"p50={result['p50_ms']:>7.1f}ms p95={result['p95_ms']:>7.1f}ms "
+                  f"p99={result['p99_ms']:>7.1f}ms errors={result['errors']}")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Concurrent-connection load test for the complaint API')
+    parser.add_argument('--url', action='append', help='Base URL; repeat to compare servers')
+    parser.add_argument('--local', action='store_true', help='Start the app locally and test it')
+    parser.add_argument('--mongomock', action='store_true', help='With --local: use an in-memory database')
+    parser.add_argument('--serve', type=int, metavar='PORT', help=argparse.SUPPRESS)
+    parser.add_argument('--path', action='append', help='GET path to request (default: list + dashboard)')
+    parser.add_argument('--concurrency', default='10,50,100,200', help='Comma-separated connection counts')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per concurrency step (or of the mix)')
+    parser.add_argument('--rps', type=float, help='Run a traffic mix at this arrival rate instead')
+    parser.add_argument('--mix', default='default',
+                        help=f"Traffic mix: {', '.join(MIXES)}, or op=weight,... over {', '.join(OPERATIONS)}")
+    parser.add_argument('--connections', type=int, default=100, help='Connection pool size for --rps')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save-schedule', help='Write the generated requests as JSON lines')
+    parser.add_argument('--replay', help='Send the requests from a saved schedule')
+    parser.add_argument('--speed', type=float, default=1.0, help='Replay this many times faster')
+    parser.add_argument('--username', default='admin')
+    parser.add_argument('--password', default='admin123')
+    parser.add_argument('--user', help='username:password for non-admin requests (default: the admin, or provisioned users)')
+    parser.add_argument('--users', type=int, default=0,
+                        help='Create N loadtest users and spread requests over them (default: as many as the '
+                             'create rate needs)')
+    parser.add_argument('--create-limit', default=CREATE_LIMIT,
+                        help="The server's per-user create limit, count/seconds ('' if it has none)")
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.serve, args.mongomock)
+        sys.exit()
+    if not args.url and not args.local:
+        parser.error('--url or --local is required')
+    local = start_local(args.mongomock) if args.local else None
+    try:
+        asyncio.run(main(args, (args.url or []) + ([local[1]] if local else [])))
+    finally:
+        if local:
+            local[0].terminate()
+            local[0].wait()
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Versioned model registry.
+
+Each trained classifier/vectorizer pair is stored under
+``model/registry/<version>/`` together with a ``metadata.json`` recording
+training size, fit time, artifact size and measured inference latency.
+``state.json`` points at the ``active`` version (served), the ``previous``
+one (rollback target) and an optional ``candidate`` scored in shadow mode.
+
+Command line:
+
+    python model_registry.py list
+    python model_registry.py promote <version>
+    python model_registry.py rollback
+    python model_registry.py candidate <version>      # start shadow scoring
+    python model_registry.py clear-candidate
+    python model_registry.py evaluate <version> [--limit N]
+    python model_registry.py import-legacy            # register model/*.joblib
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+import zlib
+from datetime import datetime, timezone
+
+import joblib
+from dotenv import load_dotenv
+
+from compact_model import COMPACT_DIR, export_compact, load_compact
+from config import Config
+from inference import predict_batch
+
+LEGACY_MODEL_PATH = 'model/complaint_classifier.joblib'
+LEGACY_VECTORIZER_PATH = 'model/vectorizer.joblib'
+
+
+def _write_json(path, data):
+    # Write-then-rename so readers in other workers never see a partial file
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, 'w') as f:
+        json.dump(data, f, indent=2, default=str)
+    os.replace(tmp, path)
+
+
+def _load_pair(model_path, vectorizer_path, compact_path):
+    # MODEL_FORMAT=compact memory-maps the pickle-free artifact when one exists
+    if Config.MODEL_FORMAT == 'compact' and os.path.exists(os.path.join(compact_path, 'meta.json')):
+        return load_compact(compact_path)
+    return joblib.load(model_path), joblib.load(vectorizer_path)
+
+
+def measure_latency(model, vectorizer, texts, repeats=3):
+    """Median single-item and per-item batched inference latency in milliseconds"""
+    texts = list(texts)[:200]
+    if not texts:
+        return {}
+    single = []
+    for text in texts[:50]:
+        start = time.perf_counter()
+        predict_batch(model, vectorizer, [text])
+        single.append((time.perf_counter() - start) * 1000)
+    batch = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        predict_batch(model, vectorizer, texts)
+        batch.append((time.perf_counter() - start) * 1000 / len(texts))
+    return {
+        'single_p50_ms': statistics.median(single),
+        'single_max_ms': max(single),
+        'batch_per_item_ms': statistics.median(batch),
+        'sample_size': len(texts),
+    }
+
+
+def complaint_label(doc):
+    """Ground-truth category for a complaint, or None if it has never been confirmed"""
+    if doc.get('feedback_given'):
+        if doc.get('feedback_is_correct') is False:
+            return doc.get('feedback_category')
+        return doc.get('ml_category')
+    if doc.get('is_manual_category'):
+        return doc.get('category')
+    return None
+
+
+def in_holdout(complaint_id, every):
+    """True for the fixed 1/``every`` of complaints (by id) that training leaves out for evaluation"""
+    return bool(every) and zlib.crc32(str(complaint_id).encode()) % every == 0
+
+
+def labelled_complaints(collection, limit=None, holdout_every=0):
+    """(text, label) pairs from complaints an admin has given feedback on (only held-out ones if ``holdout_every``)"""
+    cursor = collection.find(
+        {'feedback_given': True},
+        {'text': 1, 'ml_category': 1, 'feedback_given': 1, 'feedback_is_correct': 1, 'feedback_category': 1},
+    ).sort('_id', 1)
+    count = 0
+    for doc in cursor:
+        label = complaint_label(doc)
+        if doc.get('text') and label and (not holdout_every or in_holdout(doc['_id'], holdout_every)):
+            yield doc['text'], label
+            count += 1
+            if limit and count >= limit:
+                return
+
+
+class ModelRegistry:
+    def __init__(self, root=None):
+        self.root = root or Config.MODEL_REGISTRY_DIR
+        self.state_path = os.path.join(self.root, 'state.json')
+
+    def _version_dir(self, version):
+        return os.path.join(self.root, version)
+
+    def _new_version(self):
+        os.makedirs(self.root, exist_ok=True)
+        base = 'v' + datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')
+        version, n = base, 1
+        while os.path.exists(self._version_dir(version)):
+            n += 1
+            version = f"{base}-{n}"
+        return version
+
+    # -- state ---------------------------------------------------------
+    def state(self):
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {'active': None, 'previous': None, 'candidate': None}
+
+    def state_mtime(self):
+        try:
+            return os.stat(self.state_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _save_state(self, state):
+        os.makedirs(self.root, exist_ok=True)
+        state['updated_at'] = datetime.now(timezone.utc).isoformat()
+        _write_json(self.state_path, state)
+
+    # -- versions ------------------------------------------------------
+    def register(self, model, vectorizer, training_size, fit_seconds, sample_texts=(), source=None, extra=None):
+        """Save a trained pair as a new version; returns the version id"""
+        version = self._new_version()
+        path = self._version_dir(version)
+        os.makedirs(path)
+        joblib.dump(model, os.path.join(path, 'classifier.joblib'))
+        joblib.dump(vectorizer, os.path.join(path, 'vectorizer.joblib'))
+        try:
+            # Pickle-free copy for MODEL_FORMAT=compact
+            export_compact(model, vectorizer, os.path.join(path, COMPACT_DIR))
+        except ValueError as e:
+            print(f"Compact export skipped for {version}: {e}")
+        metadata = {
+            'version': version,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'source': source,
+            'model_type': type(model).__name__,
+            'vectorizer_type': type(vectorizer).__name__,
+            'classes': [str(c) for c in getattr(model, 'classes_', [])],
+            'training_size': training_size,
+            'fit_seconds': fit_seconds,
+            'artifact_bytes': sum(os.path.getsize(os.path.join(path, name))
+                                  for name in ('classifier.joblib', 'vectorizer.joblib')),
+            'inference_latency': measure_latency(model, vectorizer, sample_texts),
+            'evaluations': [],
+        }
+        if extra:
+            metadata.update(extra)
+        _write_json(os.path.join(path, 'metadata.json'), metadata)
+        print(f"📦 Registered model {version} ({training_size} samples, {fit_seconds:.2f}s fit)")
+        return version
+
+    def metadata(self, version):
+        with open(os.path.join(self._version_dir(version), 'metadata.json')) as f:
+            return json.load(f)
+
+    def update_metadata(self, version, **fields):
+        metadata = self.metadata(version)
+        metadata.update(fields)
+        _write_json(os.path.join(self._version_dir(version), 'metadata.json'), metadata)
+
+    def versions(self):
+        if not os.path.isdir(self.root):
+            return []
+        found = []
+        for name in sorted(os.listdir(self.root)):
+            if os.path.exists(os.path.join(self._version_dir(name), 'metadata.json')):
+                found.append(self.metadata(name))
+        return found
+
+    def load(self, version):
+        path = self._version_dir(version)
+        return _load_pair(os.path.join(path, 'classifier.joblib'), os.path.join(path, 'vectorizer.joblib'),
+                          os.path.join(path, COMPACT_DIR))
+
+    def load_active(self):
+        """(model, vectorizer, version) for the active version, else the legacy pair"""
+        version = self.state().get('active')
+        if version:
+            model, vectorizer = self.load(version)
+            return model, vectorizer, version
+        model, vectorizer = _load_pair(LEGACY_MODEL_PATH, LEGACY_VECTORIZER_PATH,
+                                       os.path.join(os.path.dirname(LEGACY_MODEL_PATH), COMPACT_DIR))
+        return model, vectorizer, None
+
+    # -- lifecycle -----------------------------------------------------
+    def promote(self, version):
+        self.metadata(version)  # raises if the version does not exist
+        state = self.state()
+        if state.get('active') != version:
+            state['previous'] = state.get('active')
+            state['active'] = version
+        if state.get('candidate') == version:
+            state['candidate'] = None
+        self._save_state(state)
+        print(f"✅ Promoted {version} (previous: {state['previous']})")
+
+    def rollback(self):
+        state = self.state()
+        if not state.get('previous'):
+            raise ValueError('No previous version to roll back to')
+        state['active'], state['previous'] = state['previous'], state.get('active')
+        self._save_state(state)
+        print(f"↩️  Rolled back to {state['active']}")
+
+    def set_candidate(self, version):
+        if version is not None:
+            self.metadata(version)
+        state = self.state()
+        state['candidate'] = version
+        self._save_state(state)
+
+    def evaluate(self, version, samples):
+        """Accuracy of a version on (text, label) pairs; stored in its metadata"""
+        samples = list(samples)
+        if not samples:
+            raise ValueError('No labelled samples to evaluate against')
+        model, vectorizer = self.load(version)
+        texts = [text for text, _ in samples]
+        start = time.perf_counter()
+        predictions = predict_batch(model, vectorizer, texts)
+        elapsed = time.perf_counter() - start
+        correct = sum(p['category'] == label for p, (_, label) in zip(predictions, samples))
+        result = {
+            'evaluated_at': datetime.now(timezone.utc).isoformat(),
+            'samples': len(samples),
+            'accuracy': correct / len(samples),
+            'batch_per_item_ms': elapsed * 1000 / len(samples),
+        }
+        metadata = self.metadata(version)
+        self.update_metadata(version, evaluations=metadata.get('evaluations', []) + [result])
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage versioned complaint classifiers')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('list')
+    sub.add_parser('rollback')
+    sub.add_parser('clear-candidate')
+    sub.add_parser('import-legacy')
+    for name in ('promote', 'candidate'):
+        sub.add_parser(name).add_argument('version')
+    evaluate = sub.add_parser('evaluate')
+    evaluate.add_argument('version')
+    evaluate.add_argument('--limit', type=int, help='Evaluate on at most N labelled complaints')
+    args = parser.parse_args()
+
+    load_dotenv()
+    registry = ModelRegistry()
+    if args.command == 'list':
+        state = registry.state()
+        for meta in registry.versions():
+            marks = [role for role in ('active', 'previous', 'candidate') if state.get(role) == meta['version']]
+            latency = meta.get('inference_latency', {}).get('single_p50_ms')
+            latest = (meta.get('evaluations') or [{}])[-1].get('accuracy')
+            print(f"{meta['version']:<20} {','.join(marks):<18} samples={str(meta['training_size']):<8} "
+                  f"fit={meta['fit_seconds']:.2f}s size={meta['artifact_bytes'] / 1024:.0f}KB "
+                  f"p50={latency if latency is None else round(latency, 3)}ms accuracy={latest}")
+    elif args.command == 'promote':
+        registry.promote(args.version)
+    elif args.command == 'rollback':
+        registry.rollback()
+    elif args.command == 'candidate':
+        registry.set_candidate(args.version)
+        print(f"🌓 {args.version} will shadow-score {Config.SHADOW_SAMPLE_RATE:.0%} of new complaints")
+    elif args.command == 'clear-candidate':
+        registry.set_candidate(None)
+    elif args.command == 'import-legacy':
+        model, vectorizer = joblib.load(LEGACY_MODEL_PATH), joblib.load(LEGACY_VECTORIZER_PATH)
+        version = registry.register(model, vectorizer, training_size=None, fit_seconds=0.0, source='legacy')
+        registry.promote(version)
+    elif args.command == 'evaluate':
+        from pymongo import MongoClient
+        client = MongoClient(os.getenv('MONGO_URI', 'mongodb://localhost:27017/complaint_system'))
+        collection = client.get_default_database().complaints
+        samples = labelled_complaints(collection, args.limit, Config.HOLDOUT_EVERY)
+        print(json.dumps(registry.evaluate(args.version, samples), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Batch priority/SLA engine.
+
+Features for a whole batch of complaints are built as NumPy arrays
+(keyword hits per language, sentiment, category, classifier confidence)
+and scored in one pass, either by an ordered rules table (first matching
+rule wins, evaluated with ``np.select``) or by a learned linear model.
+The default rules reproduce the original cascade exactly:
+
+    critical keyword -> critical (4h)    high keyword -> high (24h)
+    negative         -> high (24h)       positive     -> low (168h)
+    otherwise        -> medium (72h)
+
+``PRIORITY_RULES_PATH`` may point at a JSON file with ``rules`` and/or
+``sla_hours`` to override them. The learned model is trained from
+resolved complaints (a complaint flagged ``sla_breached`` is labelled one
+level more urgent than it was given), is stored as plain NumPy arrays and
+is used when ``PRIORITY_ENGINE=learned``; anything wrong with it falls
+back to the rules.
+
+Command line:
+
+    python priority.py train [--output PATH]          # fit the learned model
+    python priority.py reprioritize [--dry-run]       # rescore open complaints
+"""
+
+import argparse
+import json
+import os
+import re
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from dotenv import load_dotenv
+from pymongo import UpdateOne
+
+from config import Config
+from languages import PROFILES
+
+LEVELS = ['low', 'medium', 'high', 'critical']
+DEFAULT_SLA_HOURS = {'critical': 4, 'high': 24, 'medium': 72, 'low': 168}
+DEFAULT_RULES = [
+    {'when': {'critical_keyword': True}, 'priority': 'critical'},
+    {'when': {'high_keyword': True}, 'priority': 'high'},
+    {'when': {'sentiment': 'negative'}, 'priority': 'high'},
+    {'when': {'sentiment': 'positive'}, 'priority': 'low'},
+    {'priority': 'medium'},
+]
+SENTIMENTS = ['negative', 'neutral', 'positive']
+
+
+def _keyword_pattern(keywords):
+    return re.compile('|'.join(re.escape(k) for k in keywords)) if keywords else None
+
+
+_PATTERNS = {}
+
+
+def _patterns(language):
+    if language not in _PATTERNS:
+        profile = PROFILES.get(language, PROFILES['en'])
+        _PATTERNS[language] = (_keyword_pattern(profile['critical_keywords']),
+                               _keyword_pattern(profile['high_keywords']))
+    return _PATTERNS[language]
+
+
+def build_features(texts, sentiments, sentiment_scores=None, categories=None, confidences=None, languages=None):
+    """Column arrays for a batch; keyword matching is one compiled regex per language"""
+    n = len(texts)
+    languages = languages if languages is not None else [Config.DEFAULT_LANGUAGE] * n
+    critical = np.zeros(n, dtype=bool)
+    high = np.zeros(n, dtype=bool)
+    for i, (text, language) in enumerate(zip(texts, languages)):
+        critical_pattern, high_pattern = _patterns(language)
+        lowered = (text or '').lower()
+        critical[i] = bool(critical_pattern and critical_pattern.search(lowered))
+        if not critical[i]:
+            high[i] = bool(high_pattern and high_pattern.search(lowered))
+    return {
+        'critical_keyword': critical,
+        'high_keyword': high,
+        'sentiment': np.asarray(sentiments, dtype=object),
+        'sentiment_score': np.asarray(sentiment_scores if sentiment_scores is not None else np.zeros(n), dtype=float),
+        'category': np.asarray(categories if categories is not None else [None] * n, dtype=object),
+        'confidence': np.asarray(confidences if confidences is not None else np.zeros(n), dtype=float),
+    }
+
+
+def _condition_mask(features, when, n):
+    mask = np.ones(n, dtype=bool)
+    for name, expected in when.items():
+        if name in ('critical_keyword', 'high_keyword'):
+            mask &= features[name] == bool(expected)
+        elif name in ('sentiment', 'category'):
+            values = expected if isinstance(expected, list) else [expected]
+            mask &= np.isin(features[name], values)
+        elif name == 'min_confidence':
+            mask &= features['confidence'] >= expected
+        elif name == 'max_confidence':
+            mask &= features['confidence'] < expected
+        elif name == 'max_sentiment_score':
+            mask &= features['sentiment_score'] < expected
+        else:
+            raise ValueError(f"Unknown priority rule condition: {name}")
+    return mask
+
+
+def matrix(features):
+    """Dense design matrix for the learned model (same column order at fit and predict time)"""
+    columns = [features['critical_keyword'], features['high_keyword'], features['sentiment_score'],
+               features['confidence']]
+    columns += [features['sentiment'] == s for s in SENTIMENTS]
+    columns += [features['category'] == c for c in Config.CATEGORIES]
+    return np.column_stack(columns).astype(float)
+
+
+class LearnedPriorityModel:
+    """Linear model over ``matrix(features)`` stored as .npz (no pickle, no sklearn at serve time)"""
+
+    def __init__(self, coef, intercept, classes, n_features):
+        self.coef = coef
+        self.intercept = intercept
+        self.classes = np.asarray(classes)
+        self.n_features = n_features
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path, allow_pickle=False)
+        return cls(data['coef'], data['intercept'], data['classes'], int(data['n_features']))
+
+    def save(self, path):
+        np.savez(path, coef=self.coef, intercept=self.intercept, classes=self.classes, n_features=self.n_features)
+
+    def predict(self, features):
+        X = matrix(features)
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"Priority model expects {self.n_features} features, got {X.shape[1]}")
+        scores = X @ self.coef.T + self.intercept
+        if scores.shape[1] == 1:  # binary problem
+            return np.where(scores[:, 0] > 0, self.classes[1], self.classes[0])
+        return self.classes[scores.argmax(axis=1)]
+
+
+class PriorityEngine:
+    def __init__(self, rules=None, sla_hours=None, model=None):
+        self.rules = rules or DEFAULT_RULES
+        self.sla_hours = dict(DEFAULT_SLA_HOURS, **(sla_hours or {}))
+        self.model = model
+        for rule in self.rules:
+            if rule['priority'] not in self.sla_hours:
+                raise ValueError(f"No SLA hours for priority {rule['priority']!r}")
+
+    @classmethod
+    def from_config(cls):
+        rules, sla_hours, model = None, None, None
+        if Config.PRIORITY_RULES_PATH:
+            with open(Config.PRIORITY_RULES_PATH) as f:
+                table = json.load(f)
+            rules, sla_hours = table.get('rules'), table.get('sla_hours')
+        if Config.PRIORITY_ENGINE == 'learned':
+            try:
+                model = LearnedPriorityModel.load(Config.PRIORITY_MODEL_PATH)
+            except Exception as e:
+                print(f"Priority model unavailable, using rules: {e}")
+        return cls(rules, sla_hours, model)
+
+    def score_rules(self, features):
+        n = len(features['sentiment'])
+        masks = [_condition_mask(features, rule.get('when', {}), n) for rule in self.rules]
+        return np.select(masks, [rule['priority'] for rule in self.rules], default='medium').astype(object)
+
+    def score(self, features):
+        if self.model is not None:
+            try:
+                return self.model.predict(features).astype(object)
+            except Exception as e:
+                print(f"Priority model error, using rules: {e}")
+        return self.score_rules(features)
+
+    def assign(self, features, start_times=None):
+        """(priorities, sla_hours, sla_deadlines) for a batch.
+
+        Deadlines count from ``start_times`` (e.g. each complaint's
+        ``created_at`` when re-prioritizing) or from now.
+        """
+        priorities = self.score(features)
+        hours = [self.sla_hours[p] for p in priorities]
+        if start_times is None:
+            now = datetime.now(timezone.utc)
+            deadline_for = {h: now + timedelta(hours=h) for h in set(hours)}
+            deadlines = [deadline_for[h] for h in hours]
+        else:
+            deadlines = [start + timedelta(hours=h) for start, h in zip(start_times, hours)]
+        return list(priorities), hours, deadlines
+
+
+def _as_utc(value):
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def outcome_label(doc, now=None):
+    """The priority a complaint should have had: one level up if it breached its SLA.
+
+    Uses the ``sla_breached`` flag kept by the app (set when a complaint is
+    resolved late or swept while overdue); a still-open complaint past its
+    deadline counts as breached even before the sweeper has flagged it.
+    """
+    priority, deadline = doc.get('priority'), doc.get('sla_deadline')
+    if priority not in LEVELS or deadline is None:
+        return None
+    breached = doc.get('sla_breached') or (
+        doc.get('status') not in ('resolved', 'closed') and (now or datetime.now(timezone.utc)) > _as_utc(deadline))
+    if breached:
+        return LEVELS[min(LEVELS.index(priority) + 1, len(LEVELS) - 1)]
+    return priority
+
+
+TRAINING_FIELDS = {'text': 1, 'sentiment': 1, 'sentiment_score': 1, 'category': 1, 'confidence': 1, 'language': 1,
+                   'enrichment_skipped': 1, 'priority': 1, 'sla_deadline': 1, 'sla_breached': 1, 'status': 1}
+
+
+def docs_features(docs):
+    # Complaints stored without enrichment (unsupported language) had no keyword scoring at ingest either
+    return build_features([d.get('text') if not d.get('enrichment_skipped') else '' for d in docs], [d.get('sentiment', 'neutral') for d in docs],
+                          [d.get('sentiment_score', 0.0) for d in docs], [d.get('category') for d in docs],
+                          [d.get('confidence', 0.0) for d in docs],
+                          [d.get('language', Config.DEFAULT_LANGUAGE) for d in docs])
+
+
+def train(docs):
+    """Fit the learned model on complaints with an SLA outcome"""
+    from sklearn.linear_model import LogisticRegression
+    docs = [d for d in docs if outcome_label(d)]
+    labels = [outcome_label(d) for d in docs]
+    if len(set(labels)) < 2:
+        raise ValueError('Need complaints with at least two different outcome priorities to train')
+    X = matrix(docs_features(docs))
+    clf = LogisticRegression(max_iter=1000, class_weight='balanced').fit(X, labels)
+    return LearnedPriorityModel(clf.coef_, clf.intercept_, [str(c) for c in clf.classes_], X.shape[1])
+
+
+def reprioritize(collection, engine, statuses=('pending', 'in_progress'), batch_size=5000, dry_run=False):
+    """Rescore open complaints batch by batch; counts changed complaints per new priority.
+
+    Deadlines count from each complaint's ``created_at``, so only the
+    complaints whose priority actually changes are rewritten, with one
+    unordered bulk_write per batch.
+    """
+    changed = Counter()
+
+    def flush(batch):
+        priorities, hours, deadlines = engine.assign(docs_features(batch), [_as_utc(d['created_at']) for d in batch])
+        updates = []
+        for doc, priority, sla, deadline in zip(batch, priorities, hours, deadlines):
+            if doc.get('priority') == priority:
+                continue
+            changed[priority] += 1
+            updates.append(UpdateOne({'_id': doc['_id']}, {'$set': {
+                'priority': priority, 'sla_hours': sla, 'sla_deadline': deadline}}))
+        if updates and not dry_run:
+            collection.bulk_write(updates, ordered=False)
+
+    batch = []
+    cursor = collection.find({'status': {'$in': list(statuses)}}, dict(TRAINING_FIELDS, created_at=1))
+    for doc in cursor.batch_size(batch_size):
+        batch.append(doc)
+        if len(batch) == batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+    return dict(changed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Train or apply the priority engine')
+    sub = parser.add_subparsers(dest='command', required=True)
+    train_parser = sub.add_parser('train')
+    train_parser.add_argument('--output', default=Config.PRIORITY_MODEL_PATH)
+    rescore = sub.add_parser('reprioritize')
+    rescore.add_argument('--dry-run', action='store_true', help='Only count the priorities that would change')
+    rescore.add_argument('--batch-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    load_dotenv()
+    from pymongo import MongoClient
+    client = MongoClient(os.getenv('MONGO_URI', 'mongodb://localhost:27017/complaint_system'))
+    complaints = client.get_default_database().complaints
+    if args.command == 'train':
+        docs = list(complaints.find({'sla_deadline': {'$exists': True}}, TRAINING_FIELDS))
+        model = train(docs)
+        model.save(args.output)
+        print(f"✅ Priority model trained on {len(docs)} complaints, saved to {args.output}")
+    else:
+        print(reprioritize(complaints, PriorityEngine.from_config(), batch_size=args.batch_size, dry_run=args.dry_run))
+
+
+if __name__ == '__main__':
+    main()
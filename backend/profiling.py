@@ -0,0 +1,237 @@
+"""
+Profiling hooks for the Flask app.
+
+* Stage timings: hot paths wrap themselves in ``stage('ml')`` etc. and
+  MongoDB command time is added by a driver ``CommandListener``. Requests
+  slower than ``SLOW_REQUEST_MS`` are logged with their per-stage breakdown.
+  With ``SLOW_REQUEST_MS=0`` no request is timed and ``stage()`` returns a
+  shared no-op context manager.
+* ``X-Profile: 1`` from an admin runs that one request under cProfile. The
+  response carries ``X-Profile-Id`` (fetch the stats from
+  ``/api/admin/profiles/<id>``) and a ``Server-Timing`` header.
+* Sampling across workers: ``SamplingCoordinator.request()`` drops a trigger
+  file in ``PROFILE_DIR``. A watcher thread in every worker process notices
+  it, samples all of its threads' stacks for the requested window and
+  writes collapsed stacks (``frame;frame;frame count``, the input format of
+  flamegraph.pl and speedscope), which ``collect()`` merges.
+"""
+
+import contextlib
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from pymongo import monitoring
+
+_local = threading.local()
+_NOOP = contextlib.nullcontext()
+PROFILE_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+class _Stage:
+    __slots__ = ('name', 'timings', 'started')
+
+    def __init__(self, name, timings):
+        self.name = name
+        self.timings = timings
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.timings[self.name] = self.timings.get(self.name, 0.0) + time.perf_counter() - self.started
+
+
+def stage(name):
+    """Time a block as part of the current request (no-op when it is not being timed)"""
+    timings = getattr(_local, 'timings', None)
+    if timings is None:
+        return _NOOP
+    return _Stage(name, timings)
+
+
+def add_stage_time(name, seconds):
+    timings = getattr(_local, 'timings', None)
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+class MongoCommandTimer(monitoring.CommandListener):
+    """Adds driver-measured command durations to the current request's ``mongo`` stage"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        add_stage_time('mongo', event.duration_micros / 1e6)
+
+    def failed(self, event):
+        add_stage_time('mongo', event.duration_micros / 1e6)
+
+
+def server_timing(timings, total):
+    parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items()]
+    return ', '.join(parts + [f"total;dur={total * 1000:.1f}"])
+
+
+def init_app(app, config, is_admin_request):
+    """Register the per-request hooks; ``is_admin_request()`` checks the caller's JWT"""
+    from flask import g, request
+
+    @app.before_request
+    def _start_timing():
+        profile = (config.PROFILING_ENABLED and request.headers.get('X-Profile')
+                   and is_admin_request())
+        if not (config.SLOW_REQUEST_MS or profile):
+            return
+        g.request_started = time.perf_counter()
+        _local.timings = {}
+        if profile:
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+    @app.after_request
+    def _finish_timing(response):
+        started = g.pop('request_started', None)
+        if started is None:
+            return response
+        total = time.perf_counter() - started
+        timings, _local.timings = _local.timings, None
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            profile_id = uuid.uuid4().hex
+            os.makedirs(config.PROFILE_DIR, exist_ok=True)
+            profiler.dump_stats(os.path.join(config.PROFILE_DIR, f"request-{profile_id}.prof"))
+            response.headers['X-Profile-Id'] = profile_id
+            response.headers['Server-Timing'] = server_timing(timings, total)
+        if config.SLOW_REQUEST_MS and total * 1000 >= config.SLOW_REQUEST_MS:
+            stages = {name: round(seconds * 1000, 1) for name, seconds in timings.items()}
+            print(f"🐢 Slow request {request.method} {request.path} {response.status_code} "
+                  f"{total * 1000:.0f}ms stages={json.dumps(stages)}")
+        return response
+
+    @app.teardown_request
+    def _clear_timing(exc):
+        # An unhandled exception skips after_request; don't leak state to the next request
+        _local.timings = None
+
+
+def request_profile(directory, profile_id, fmt='text', limit=50):
+    """A saved X-Profile run: pstats text (top ``limit`` by cumulative time) or the raw .prof path"""
+    if not PROFILE_ID.match(profile_id or ''):
+        return None
+    path = os.path.join(directory, f"request-{profile_id}.prof")
+    if not os.path.exists(path):
+        return None
+    if fmt == 'prof':
+        return path
+    out = io.StringIO()
+    pstats.Stats(path, stream=out).sort_stats('cumulative').print_stats(limit)
+    return out.getvalue()
+
+
+def _collapse(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+def sample_stacks(seconds, interval, skip_threads=()):
+    """Count collapsed stacks of every thread in this process over ``seconds``"""
+    counts = Counter()
+    names = {}
+    skip = set(skip_threads) | {threading.get_ident()}
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for ident, frame in sys._current_frames().items():
+            if ident in skip:
+                continue
+            if ident not in names:
+                thread = threading._active.get(ident)
+                names[ident] = thread.name if thread else str(ident)
+            counts[f"{names[ident]};{_collapse(frame)}"] += 1
+        time.sleep(interval)
+    return counts
+
+
+class SamplingCoordinator:
+    """Runs a sampling window in every worker process that shares ``directory``"""
+
+    def __init__(self, directory, poll_interval=1.0, sample_interval=0.01):
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self.sample_interval = sample_interval
+        self.trigger_path = os.path.join(directory, 'sample-trigger.json')
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def ensure_watcher(self):
+        """Start this process's watcher thread (once per process, so again after fork)"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._watch, name='profile-watcher', daemon=True).start()
+
+    def request(self, seconds):
+        os.makedirs(self.directory, exist_ok=True)
+        profile_id = uuid.uuid4().hex
+        trigger = {'id': profile_id, 'until': time.time() + seconds}
+        tmp = f"{self.trigger_path}.tmp{os.getpid()}"
+        with open(tmp, 'w') as f:
+            json.dump(trigger, f)
+        os.replace(tmp, self.trigger_path)
+        return profile_id, trigger['until']
+
+    def _watch(self):
+        seen_mtime, handled = None, set()
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                mtime = os.stat(self.trigger_path).st_mtime_ns
+                if mtime == seen_mtime:
+                    continue
+                seen_mtime = mtime
+                with open(self.trigger_path) as f:
+                    trigger = json.load(f)
+            except (OSError, ValueError):
+                continue
+            remaining = trigger['until'] - time.time()
+            if trigger['id'] in handled or remaining <= 0:
+                continue
+            handled.add(trigger['id'])
+            counts = sample_stacks(remaining, self.sample_interval)
+            out = os.path.join(self.directory, f"{trigger['id']}-{os.getpid()}.collapsed")
+            with open(out + '.tmp', 'w') as f:
+                f.writelines(f"{stack} {count}\n" for stack, count in counts.items())
+            os.replace(out + '.tmp', out)
+
+    def collect(self, profile_id, until):
+        """Wait for the window (plus a poll period for stragglers) and merge every worker's stacks"""
+        time.sleep(max(0.0, until - time.time()) + self.poll_interval * 2)
+        merged, workers = Counter(), 0
+        for name in os.listdir(self.directory):
+            if not (name.startswith(profile_id + '-') and name.endswith('.collapsed')):
+                continue
+            path = os.path.join(self.directory, name)
+            workers += 1
+            with open(path) as f:
+                for line in f:
+                    stack, _, count = line.rstrip('\n').rpartition(' ')
+                    merged[stack] += int(count)
+            os.remove(path)
+        return ''.join(f"{stack} {count}\n" for stack, count in merged.most_common()), workers
@@ -0,0 +1,167 @@
+"""
+Token-bucket rate limiting and adaptive load shedding for the ingest path.
+
+A rule such as ``'30/60'`` allows bursts of 30 requests and refills at 30
+per 60 seconds. Buckets live in a ``MemoryBucketStore`` (per process) or a
+``SQLiteBucketStore``, a file shared by every gunicorn worker on the host
+so a client cannot multiply its allowance by the number of workers.
+
+``LoadShedder`` watches complaint enrichment itself: while too many
+enrichments are in flight, or shortly after one ran slower than the
+latency target, new complaints are stored raw for deferred enrichment (or
+refused) instead of queueing more CPU work in front of interactive
+requests.
+"""
+
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+def parse_rate(rule):
+    """``'count/seconds'`` -> (refill per second, burst capacity); None/'' disables"""
+    if not rule:
+        return None
+    count, _, seconds = rule.partition('/')
+    count, seconds = float(count), float(seconds or 1)
+    if count <= 0 or seconds <= 0:
+        raise ValueError(f"Invalid rate limit rule: {rule!r}")
+    return count / seconds, count
+
+
+def _refill(tokens, updated, now, rate, burst):
+    return min(burst, tokens + (now - updated) * rate)
+
+
+def _take(tokens, rate, cost):
+    """(allowed, tokens after, seconds until ``cost`` tokens are available)"""
+    if tokens >= cost:
+        return True, tokens - cost, 0.0
+    return False, tokens, (cost - tokens) / rate
+
+
+class MemoryBucketStore:
+    """Per-process buckets; the least recently used are evicted past ``max_keys``"""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst, cost=1, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            allowed, tokens, retry_after = _take(_refill(tokens, updated, now, rate, burst), rate, cost)
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, retry_after
+
+
+class SQLiteBucketStore:
+    """Buckets in a local SQLite file shared by all worker processes on the host"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        # One connection per thread and per process (never reused across fork)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            conn.execute('CREATE TABLE IF NOT EXISTS buckets '
+                         '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)')
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def take(self, key, rate, burst, cost=1, now=None):
+        now = time.time() if now is None else now
+        conn = self._connection()
+        # BEGIN IMMEDIATE takes the write lock up front, so read-modify-write is atomic across processes
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+            tokens, updated = row if row else (burst, now)
+            allowed, tokens, retry_after = _take(_refill(tokens, updated, now, rate, burst), rate, cost)
+            conn.execute('INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)', (key, tokens, now))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return allowed, retry_after
+
+    def purge(self, older_than):
+        """Drop buckets untouched for ``older_than`` seconds (they would be full anyway)"""
+        self._connection().execute('DELETE FROM buckets WHERE updated < ?', (time.time() - older_than,))
+
+
+class RateLimiter:
+    def __init__(self, store, rules):
+        # rules: name -> 'count/seconds' (or None to disable)
+        self.store = store
+        self.rules = {name: parse_rate(rule) for name, rule in rules.items()}
+
+    def check(self, *keyed_rules):
+        """Take one token from each ``(rule name, key)`` bucket.
+
+        Returns 0 when the request is allowed, otherwise the whole seconds
+        to wait (for ``Retry-After``). Keys of None skip that rule, so e.g. a
+        tenant bucket only applies to users that belong to a tenant.
+        """
+        wait = 0.0
+        for name, key in keyed_rules:
+            rate = self.rules.get(name)
+            if rate is None or key is None:
+                continue
+            allowed, retry_after = self.store.take(f"{name}:{key}", *rate)
+            if not allowed:
+                wait = max(wait, retry_after)
+        return math.ceil(wait) if wait else 0
+
+
+class LoadShedder:
+    def __init__(self, max_inflight, latency_target, cooldown):
+        self.max_inflight = max_inflight
+        self.latency_target = latency_target
+        self.cooldown = cooldown
+        self.inflight = 0
+        self.shed_until = 0.0
+        self.shed_count = 0
+        self._lock = threading.Lock()
+
+    def overloaded(self):
+        return self.inflight >= self.max_inflight or time.monotonic() < self.shed_until
+
+    def retry_after(self):
+        return max(1, math.ceil(self.shed_until - time.monotonic()))
+
+    def shed(self):
+        with self._lock:
+            self.shed_count += 1
+
+    @contextmanager
+    def track(self):
+        """Count an enrichment in flight and learn from how long it took"""
+        with self._lock:
+            self.inflight += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self.inflight -= 1
+                if elapsed > self.latency_target:
+                    # Back off for a while instead of piling more work on a slow box
+                    self.shed_until = max(self.shed_until, time.monotonic() + self.cooldown)
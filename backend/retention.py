@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Retention: move old resolved complaints out of the hot collection.
+
+Complaints whose status is in ``RETENTION_STATUSES`` and that were created
+more than ``RETENTION_DAYS`` ago are copied to the archive and deleted from
+``complaints`` in batches. Two archive backends are available:
+
+* ``collection``: full documents in ``complaints_archive``.
+* ``files``: gzip JSON lines under ``ARCHIVE_DIR``, one file per month of
+  ``created_at`` (``complaints-YYYY-MM.jsonl.gz``). ``complaints_archive``
+  then holds only ``{_id, archive_month}`` stubs so single lookups know
+  which file to read.
+
+Per-category/status counts of everything archived are kept in
+``complaint_rollups`` so the dashboard totals stay correct. The app's
+``get_complaint`` and export fall back to the archive.
+
+Command line (cron it nightly):
+
+    python retention.py run [--days N] [--batch-size N] [--dry-run]
+    python retention.py rebuild-rollups     # recount after an interrupted run
+"""
+
+import argparse
+import glob
+import gzip
+import os
+from datetime import datetime, timedelta, timezone
+
+from bson import json_util
+from dotenv import load_dotenv
+from pymongo.errors import BulkWriteError
+
+from config import Config
+
+ROLLUP_ID = 'archived'
+# Rollup counts are keyed by field value; this stands in for a missing one
+_NONE_KEY = '__none__'
+
+
+def archive_month(doc):
+    created = doc.get('created_at') or doc.get('archived_at')
+    return created.strftime('%Y-%m') if created else 'unknown'
+
+
+def _insert_ignoring_duplicates(collection, docs):
+    # A re-run after an interrupted batch re-archives the same _ids
+    try:
+        collection.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        if any(err.get('code') != 11000 for err in e.details.get('writeErrors', [])):
+            raise
+
+
+def _project(doc, projection):
+    if not projection:
+        return doc
+    return {k: v for k, v in doc.items() if k == '_id' or k in projection}
+
+
+class CollectionArchive:
+    """Archived complaints as full documents in a Mongo collection"""
+
+    def __init__(self, get_collection):
+        self.get_collection = get_collection
+
+    def store(self, docs):
+        _insert_ignoring_duplicates(self.get_collection(), docs)
+
+    def discard(self, ids):
+        self.get_collection().delete_many({'_id': {'$in': list(ids)}})
+
+    def find(self, cid, projection=None):
+        return self.get_collection().find_one({'_id': cid}, projection)
+
+    def iter_all(self):
+        return self.get_collection().find().batch_size(1000)
+
+
+class FileArchive:
+    """Archived complaints in monthly gzip JSON lines files, located through stubs"""
+
+    def __init__(self, directory, get_collection):
+        self.directory = directory
+        self.get_collection = get_collection
+
+    def _path(self, month):
+        return os.path.join(self.directory, f"complaints-{month}.jsonl.gz")
+
+    def store(self, docs):
+        os.makedirs(self.directory, exist_ok=True)
+        by_month = {}
+        for doc in docs:
+            by_month.setdefault(archive_month(doc), []).append(doc)
+        for month, group in by_month.items():
+            # Each append is a separate gzip member; readers see one concatenated stream
+            with gzip.open(self._path(month), 'at', encoding='utf-8') as f:
+                f.writelines(json_util.dumps(doc) + '\n' for doc in group)
+        _insert_ignoring_duplicates(self.get_collection(),
+                                    [{'_id': doc['_id'], 'archive_month': archive_month(doc)} for doc in docs])
+
+    def discard(self, ids):
+        # File lines stay behind but are no longer reachable by id; readers
+        # prefer the live collection, so export skips them too
+        self.get_collection().delete_many({'_id': {'$in': list(ids)}})
+
+    def _read(self, path):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                yield json_util.loads(line)
+
+    def find(self, cid, projection=None):
+        stub = self.get_collection().find_one({'_id': cid})
+        if not stub or not os.path.exists(self._path(stub['archive_month'])):
+            return None
+        found = None
+        for doc in self._read(self._path(stub['archive_month'])):
+            if doc['_id'] == cid:
+                found = doc  # the last copy wins if a batch was archived twice
+        return _project(found, projection) if found else None
+
+    def iter_all(self):
+        """Each archived complaint once, as its last copy (like ``find``); lines ``discard`` left
+        behind for complaints that are live again have no stub and are skipped"""
+        for path in sorted(glob.glob(os.path.join(self.directory, 'complaints-*.jsonl.gz'))):
+            month = os.path.basename(path)[len('complaints-'):-len('.jsonl.gz')]
+            stubs = {stub['_id'] for stub in self.get_collection().find({'archive_month': month}, {'_id': 1})}
+            last = {}
+            for line, doc in enumerate(self._read(path)):
+                if doc['_id'] in stubs:
+                    last[doc['_id']] = line
+            for line, doc in enumerate(self._read(path)):
+                if last.get(doc['_id']) == line:
+                    yield doc
+
+
+def _key(value):
+    return _NONE_KEY if value is None else str(value)
+
+
+def rollup_increments(docs):
+    inc = {'total': 0}
+    for doc in docs:
+        inc['total'] += 1
+        for field, bucket in (('category', 'categories'), ('status', 'statuses')):
+            path = f"{bucket}.{_key(doc.get(field))}"
+            inc[path] = inc.get(path, 0) + 1
+        path = f"months.{archive_month(doc)}"
+        inc[path] = inc.get(path, 0) + 1
+    return inc
+
+
+def merge_counts(hot, archived):
+    """Add archived ``{value: count}`` to a ``[{'_id', 'count'}]`` $group result"""
+    merged = {row['_id']: row['count'] for row in hot}
+    for key, count in (archived or {}).items():
+        value = None if key == _NONE_KEY else key
+        merged[value] = merged.get(value, 0) + count
+    return [{'_id': value, 'count': count} for value, count in merged.items()]
+
+
+def merge_rollup(total, categories, statuses, rollup):
+    """Dashboard figures for hot + archived complaints"""
+    rollup = rollup or {}
+    return (total + rollup.get('total', 0),
+            merge_counts(categories, rollup.get('categories')),
+            merge_counts(statuses, rollup.get('statuses')))
+
+
+def retention_query(days=None, statuses=None, now=None):
+    now = now or datetime.now(timezone.utc)
+    days = Config.RETENTION_DAYS if days is None else days
+    return {
+        'status': {'$in': list(statuses or Config.RETENTION_STATUSES)},
+        'created_at': {'$lt': now - timedelta(days=days)},
+    }
+
+
+def archive_resolved(complaints, archive, rollups, days=None, batch_size=None, dry_run=False):
+    """Move matching complaints to ``archive`` batch by batch; returns counts.
+
+    Each batch is written to the archive, then deleted from ``complaints``
+    (re-checking the retention filter, so a complaint reopened meanwhile
+    stays hot), then counted into the rollup. A crash between the delete
+    and the rollup update undercounts; ``rebuild-rollups`` repairs it.
+    """
+    query = retention_query(days)
+    if dry_run:
+        return {'candidates': complaints.count_documents(query)}
+    batch_size = batch_size or Config.RETENTION_BATCH_SIZE
+    stats = {'archived': 0, 'kept': 0, 'batches': 0}
+    while True:
+        batch = list(complaints.find(query).sort('_id', 1).limit(batch_size))
+        if not batch:
+            break
+        archived_at = datetime.now(timezone.utc)
+        for doc in batch:
+            doc['archived_at'] = archived_at
+        archive.store(batch)
+        ids = [doc['_id'] for doc in batch]
+        deleted = complaints.delete_many(dict(query, _id={'$in': ids})).deleted_count
+        moved = batch
+        if deleted < len(batch):
+            still_hot = {d['_id'] for d in complaints.find({'_id': {'$in': ids}}, {'_id': 1})}
+            archive.discard(still_hot)
+            moved = [doc for doc in batch if doc['_id'] not in still_hot]
+            stats['kept'] += len(still_hot)
+        if moved:
+            rollups.update_one({'_id': ROLLUP_ID}, {'$inc': rollup_increments(moved)}, upsert=True)
+        stats['archived'] += len(moved)
+        stats['batches'] += 1
+        if not moved:
+            break  # everything in the batch changed under us; try again on the next run
+    return stats
+
+
+def rebuild_rollups(archive, rollups):
+    """Recount the archived rollup from the archive itself"""
+    counts = {}
+    batch = []
+    for doc in archive.iter_all():
+        batch.append(doc)
+        if len(batch) == 1000:
+            _add(counts, rollup_increments(batch))
+            batch = []
+    _add(counts, rollup_increments(batch))
+    rollup = {'_id': ROLLUP_ID, 'total': counts.pop('total', 0)}
+    for path, count in counts.items():
+        bucket, _, key = path.partition('.')
+        rollup.setdefault(bucket, {})[key] = count
+    rollups.replace_one({'_id': ROLLUP_ID}, rollup, upsert=True)
+    return rollup
+
+
+def _add(counts, inc):
+    for path, count in inc.items():
+        counts[path] = counts.get(path, 0) + count
+
+
+def make_archive(db):
+    if Config.ARCHIVE_BACKEND == 'files':
+        return FileArchive(Config.ARCHIVE_DIR, lambda: db.complaints_archive)
+    return CollectionArchive(lambda: db.complaints_archive)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Archive old resolved complaints')
+    sub = parser.add_subparsers(dest='command', required=True)
+    run = sub.add_parser('run')
+    run.add_argument('--days', type=int, help=f"Archive complaints older than this (default {Config.RETENTION_DAYS})")
+    run.add_argument('--batch-size', type=int)
+    run.add_argument('--dry-run', action='store_true', help='Only count what would be archived')
+    sub.add_parser('rebuild-rollups')
+    args = parser.parse_args()
+
+    load_dotenv()
+    from pymongo import MongoClient
+    client = MongoClient(os.getenv('MONGO_URI', 'mongodb://localhost:27017/complaint_system'))
+    db = client.get_default_database()
+    archive = make_archive(db)
+    if args.command == 'run':
+        print(archive_resolved(db.complaints, archive, db.complaint_rollups, args.days, args.batch_size, args.dry_run))
+    else:
+        print(rebuild_rollups(archive, db.complaint_rollups))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""
+When to retrain the classifier from admin feedback.
+
+One ``retrain_state`` document holds the policy counters. Each feedback
+applies a single ``$inc`` and reads the counters back, so deciding whether
+to retrain never counts documents (except once, to seed the total on an
+existing deployment). The counters are:
+
+* complaints given feedback, and corrections (feedback that marked the
+  prediction wrong), since the last training run
+* complaints given feedback in total
+* when the last run finished and which version it produced
+
+Feedback on a complaint that already has some is not counted again; if it
+flips the verdict, only the corrections counter moves.
+
+A retrain is triggered by whichever threshold is crossed first:
+
+* ``drift``: at least ``RETRAIN_DRIFT_MIN_SAMPLES`` new feedback, with a
+  correction rate of ``RETRAIN_DRIFT_ERROR_RATE`` or more. It is meant to
+  fire early, so the minimum is below the count threshold, and it applies
+  before ``RETRAIN_MIN_FEEDBACK`` is reached.
+* ``count``: ``RETRAIN_FEEDBACK_THRESHOLD`` new feedback since the last run,
+  once at least ``RETRAIN_MIN_FEEDBACK`` has been given in total
+* ``time``: the last run is older than ``RETRAIN_MAX_AGE_HOURS`` and there is
+  new feedback
+
+Triggers from all workers coalesce through a lease on the same document.
+Only the worker whose ``find_one_and_update`` takes an expired lease
+trains. On success it subtracts the counters it saw when it took the
+lease, so feedback that arrives during training counts towards the next
+run. A run that fails, or finds too few samples, sets ``retry_after``.
+That starts at ``RETRAIN_RETRY_SECONDS`` and doubles with each consecutive
+failure. Triggers are ignored until it passes, unless a run is started
+manually.
+"""
+
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+STATE_ID = 'policy'
+MAX_RETRY_SECONDS = 86400
+
+
+def _as_utc(value):
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def recency_weights(dates, now, half_life_days):
+    """Sample weights halving every ``half_life_days`` of age (undated samples count fully)"""
+    ages = np.array([(now - _as_utc(d)).total_seconds() / 86400 if d else 0.0 for d in dates])
+    if not half_life_days:
+        return np.ones(len(ages))
+    return np.power(0.5, np.maximum(ages, 0.0) / half_life_days)
+
+
+class RetrainPolicy:
+    def __init__(self, get_collection, config, count_feedback=None):
+        self.get_collection = get_collection
+        self.config = config
+        # Complaints with feedback already, counted once when the state document is first created
+        self.count_feedback = count_feedback
+        self._seeded = False
+
+    def _seed(self, exclude):
+        if self._seeded or self.count_feedback is None:
+            return
+        if self.get_collection().find_one({'_id': STATE_ID}, {'_id': 1}) is None:
+            try:
+                self.get_collection().insert_one({'_id': STATE_ID, 'feedback_since_train': 0,
+                                                  'corrections_since_train': 0,
+                                                  'total_feedback': max(self.count_feedback() - exclude, 0)})
+            except DuplicateKeyError:
+                pass  # another worker seeded it first
+        self._seeded = True
+
+    def record_feedback(self, previous, is_correct):
+        """Count feedback on a complaint whose pre-image is ``previous``; returns the updated counters"""
+        collection = self.get_collection()
+        first = not previous.get('feedback_given')
+        self._seed(exclude=1 if first else 0)
+        if first:
+            return collection.find_one_and_update(
+                {'_id': STATE_ID},
+                {'$inc': {'feedback_since_train': 1, 'corrections_since_train': 0 if is_correct else 1,
+                          'total_feedback': 1}},
+                upsert=True, return_document=ReturnDocument.AFTER)
+        was_correct = previous.get('feedback_is_correct') is not False
+        if was_correct and not is_correct:
+            return collection.find_one_and_update({'_id': STATE_ID}, {'$inc': {'corrections_since_train': 1}},
+                                                  upsert=True, return_document=ReturnDocument.AFTER)
+        if is_correct and not was_correct:
+            # Never below zero: the correction may already have been used by a training run
+            state = collection.find_one_and_update({'_id': STATE_ID, 'corrections_since_train': {'$gt': 0}},
+                                                   {'$inc': {'corrections_since_train': -1}},
+                                                   return_document=ReturnDocument.AFTER)
+            if state:
+                return state
+        return collection.find_one({'_id': STATE_ID}) or {}
+
+    def should_retrain(self, state, now=None):
+        """The trigger that fires for ``state`` ('count', 'time', 'drift') or None"""
+        if not state:
+            return None
+        config = self.config
+        now = now or datetime.now(timezone.utc)
+        new = state.get('feedback_since_train', 0)
+        if not new:
+            return None
+        if state.get('retry_after') and now < _as_utc(state['retry_after']):
+            return None
+        if (new >= config.RETRAIN_DRIFT_MIN_SAMPLES
+                and state.get('corrections_since_train', 0) / new >= config.RETRAIN_DRIFT_ERROR_RATE):
+            return 'drift'
+        if new >= config.RETRAIN_FEEDBACK_THRESHOLD and state.get('total_feedback', 0) >= config.RETRAIN_MIN_FEEDBACK:
+            return 'count'
+        last = state.get('last_trained_at')
+        if config.RETRAIN_MAX_AGE_HOURS and last and now - _as_utc(last) >= timedelta(hours=config.RETRAIN_MAX_AGE_HOURS):
+            return 'time'
+        return None
+
+    def try_acquire(self, owner, now=None, force=False):
+        """Take the training lease; returns the counters at that moment, or None if a run is in flight
+        (or, unless ``force``, a failed run's ``retry_after`` has not passed)"""
+        now = now or datetime.now(timezone.utc)
+        conditions = [{'$or': [{'lease_until': None}, {'lease_until': {'$lt': now}}]}]
+        if not force:
+            conditions.append({'$or': [{'retry_after': None}, {'retry_after': {'$lte': now}}]})
+        # _id stays top-level so a lost upsert fails on the key instead of inserting a second document
+        query = {'_id': STATE_ID, '$and': conditions}
+        try:
+            return self.get_collection().find_one_and_update(
+                query,
+                {'$set': {'lease_owner': owner,
+                          'lease_until': now + timedelta(seconds=self.config.RETRAIN_LEASE_SECONDS)}},
+                upsert=True, return_document=ReturnDocument.AFTER)
+        except DuplicateKeyError:
+            # The upsert lost to an existing document that is still leased (or backing off)
+            return None
+
+    def complete(self, owner, snapshot, version, reason=None, now=None):
+        """Record a finished run and release the lease (if still ours)"""
+        now = now or datetime.now(timezone.utc)
+        self.get_collection().update_one(
+            {'_id': STATE_ID, 'lease_owner': owner},
+            {'$inc': {'feedback_since_train': -snapshot.get('feedback_since_train', 0),
+                      'corrections_since_train': -snapshot.get('corrections_since_train', 0)},
+             '$set': {'last_trained_at': now, 'last_version': version, 'last_reason': reason,
+                      'lease_owner': None, 'lease_until': None, 'failures': 0, 'retry_after': None}})
+
+    def fail(self, owner, error=None, now=None):
+        """Release the lease after a run that produced no model and back off before the next attempt"""
+        now = now or datetime.now(timezone.utc)
+        collection = self.get_collection()
+        state = collection.find_one({'_id': STATE_ID, 'lease_owner': owner}, {'failures': 1})
+        if state is None:
+            return
+        failures = state.get('failures', 0) + 1
+        delay = min(self.config.RETRAIN_RETRY_SECONDS * 2 ** (failures - 1), MAX_RETRY_SECONDS)
+        collection.update_one({'_id': STATE_ID, 'lease_owner': owner}, {'$set': {
+            'lease_owner': None, 'lease_until': None, 'failures': failures, 'last_failed_at': now,
+            'last_error': error, 'retry_after': now + timedelta(seconds=delay)}})
+
+    def status(self):
+        state = self.get_collection().find_one({'_id': STATE_ID}) or {}
+        state.pop('_id', None)
+        return state
+
+
+def lease_owner():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
@@ -0,0 +1,72 @@
+"""
+JSON serialization helpers for Mongo documents.
+
+Encodes ``ObjectId`` and ``datetime`` values at dump time so route handlers
+can return documents straight from the driver without a per-document
+``str(c['_id'])`` pass. Uses orjson when it is installed and falls back to
+the standard library encoder otherwise.
+"""
+
+import json
+from datetime import datetime, date
+
+from bson.objectid import ObjectId
+from flask import Response
+from werkzeug.http import http_date
+
+from profiling import stage
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+def json_default(obj):
+    """Encode the BSON/datetime values that jsonify would otherwise reject"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, (datetime, date)):
+        # Same HTTP-date format Flask's jsonify produces
+        return http_date(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(payload):
+    """Serialize a payload to UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(
+            payload,
+            default=json_default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+        )
+    return json.dumps(payload, default=json_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def json_response(payload, status=200):
+    """Build a JSON Response without going through jsonify"""
+    with stage('serialize'):
+        body = dumps(payload)
+    return Response(body, status=status, mimetype='application/json')
+
+
+def parse_fields(raw):
+    """Turn a ``fields=a,b,c`` query value into a Mongo projection (or None)"""
+    if not raw:
+        return None
+    projection = {}
+    for name in raw.split(','):
+        name = name.strip()
+        # Never let a client smuggle operators into the projection
+        if not name or name.startswith('$'):
+            continue
+        projection[name] = 1
+    return projection or None
+
+
+def compact_text(doc, length):
+    """Truncate a document's text to a snippet in place"""
+    text = doc.get('text')
+    if isinstance(text, str) and len(text) > length:
+        doc['text'] = text[:length].rstrip() + '…'
+    return doc
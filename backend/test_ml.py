@@ -5,6 +5,7 @@ Tests the complaint classifier without running the full Flask app
 """
 
 import joblib
+from inference import predict_batch
 
 def get_category_emoji(category):
     emojis = {
@@ -39,16 +40,18 @@ test_complaints = [
 print("🧪 Testing ML Classification\n")
 print("=" * 80)
 
-for i, complaint in enumerate(test_complaints, 1):
-    # Vectorize and predict
-    text_vector = vectorizer.transform([complaint])
-    category = model.predict(text_vector)[0]
-    confidence = model.predict_proba(text_vector).max()
+# Vectorize and predict the whole batch at once
+results = predict_batch(model, vectorizer, test_complaints)
+
+for i, (complaint, result) in enumerate(zip(test_complaints, results), 1):
+    category = result['category']
+    runners_up = ", ".join(f"{t['category']} {t['probability']:.0%}" for t in result['top_categories'][1:])
     
     # Display results
     print(f"\n{i}. Complaint: {complaint}")
     print(f"   Category: {category.upper()}")
-    print(f"   Confidence: {confidence:.2%}")
+    print(f"   Confidence: {result['confidence']:.2%}")
+    print(f"   Runners-up: {runners_up}")
     print(f"   Emoji: {get_category_emoji(category)}")
 
 print("\n" + "=" * 80)
@@ -77,4 +77,74 @@ def admin_headers(client):
         'password': 'adminpass'
     })
     token = response.get_json()['token']
-    return {'Authorization': f'Bearer {token}'} 
\ No newline at end of file
+    return {'Authorization': f'Bearer {token}'} 
+
+@pytest.fixture(autouse=True)
+def fresh_rate_limits(monkeypatch):
+    """Every test starts with full token buckets and no load shedding"""
+    import app as app_module
+    from rate_limit import MemoryBucketStore, LoadShedder
+    monkeypatch.setattr(app_module.limiter, 'store', MemoryBucketStore())
+    monkeypatch.setattr(app_module, 'shedder', LoadShedder(8, 60.0, 1.0))
+
+
+@pytest.fixture(autouse=True)
+def no_deferred_enricher(monkeypatch):
+    """Tests call enrich_deferred themselves; a background enricher would race them"""
+    import app as app_module
+    monkeypatch.setattr(app_module.Config, 'DEFERRED_ENRICH_INTERVAL', 0)
+
+
+@pytest.fixture(scope='session')
+def training_corpus():
+    """A small labelled corpus covering every category, for the model tests"""
+    texts = [
+        "The product arrived damaged", "The quality is poor", "I was charged twice",
+        "The website is not working", "The service was excellent", "Refund the double charge",
+        "Courier left the box in the rain", "Login page shows an error",
+    ]
+    labels = ['delivery', 'quality', 'billing', 'technical', 'service', 'billing', 'delivery', 'technical']
+    return texts, labels
+
+
+@pytest.fixture
+def small_model(training_corpus):
+    """(model, vectorizer): TF-IDF + logistic regression fitted on training_corpus"""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+
+    texts, labels = training_corpus
+    vectorizer = TfidfVectorizer()
+    model = LogisticRegression(max_iter=1000).fit(vectorizer.fit_transform(texts), labels)
+    return model, vectorizer
+
+
+@pytest.fixture
+def mock_db(monkeypatch):
+    """Point the app's module-level collections at a fresh mongomock database"""
+    import app as app_module
+    from werkzeug.security import generate_password_hash
+
+    db = mongomock.MongoClient()['test_db']
+    monkeypatch.setattr(app_module, 'users_collection', db['users'])
+    monkeypatch.setattr(app_module, 'complaints_collection', db['complaints'])
+    monkeypatch.setattr(app_module, 'audit_collection', db['complaint_audit'])
+    monkeypatch.setattr(app_module, 'archive_collection', db['complaints_archive'])
+    monkeypatch.setattr(app_module, 'rollups_collection', db['complaint_rollups'])
+    monkeypatch.setattr(app_module, 'user_stats_collection', db['user_stats'])
+    monkeypatch.setattr(app_module, 'retrain_state_collection', db['retrain_state'])
+    db['users'].insert_many([
+        {'username': 'admin', 'password': generate_password_hash('admin123'), 'role': 'admin'},
+        {'username': 'testuser', 'password': generate_password_hash('testpass'), 'role': 'user'},
+    ])
+    return db
+
+
+@pytest.fixture
+def auth_headers(client, mock_db):
+    """Tokens for the users seeded by mock_db, keyed by username"""
+    headers = {}
+    for username, password in (('admin', 'admin123'), ('testuser', 'testpass')):
+        response = client.post('/api/auth/login', json={'username': username, 'password': password})
+        headers[username] = {'Authorization': f"Bearer {response.get_json()['token']}"}
+    return headers
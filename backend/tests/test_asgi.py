@@ -0,0 +1,20 @@
+from asgi import match, export, get_complaint, list_complaints, create_complaint
+
+
+def test_native_routes_are_matched():
+    """Read endpoints and complaint creation are served natively"""
+    assert match('GET', '/api/complaints')[0] is list_complaints
+    assert match('POST', '/api/complaints')[0] is create_complaint
+    assert match('GET', '/api/complaints/export')[0] is export
+    handler, params, _ = match('GET', '/api/complaints/000000000000000000000001')
+    assert handler is get_complaint
+    assert params == {'cid': '000000000000000000000001'}
+
+
+def test_other_routes_fall_through_to_flask():
+    """Writes and admin routes keep going through the Flask app"""
+    assert match('PUT', '/api/complaints/000000000000000000000001')[0] is None
+    assert match('DELETE', '/api/complaints/000000000000000000000001')[0] is None
+    assert match('POST', '/api/auth/login')[0] is None
+    assert match('OPTIONS', '/api/complaints')[0] is None
+    assert match('GET', '/api/complaints/review')[0] is None
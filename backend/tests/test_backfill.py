@@ -0,0 +1,84 @@
+from datetime import datetime, timezone
+
+import mongomock
+
+from backfill import Throttle, backfill, changes_for, enrich_chunk
+
+
+def fake_enrich(texts):
+    """Module-level so the process pool can pickle it"""
+    return [{'ml_category': 'billing' if 'refund' in t else 'delivery', 'category': 'billing' if 'refund' in t else 'delivery',
+             'confidence': 0.9, 'model_version': 'v2', 'top_categories': [], 'sentiment': 'neutral',
+             'sentiment_score': 0.0, 'sentiment_emoji': '😐', 'priority': 'medium', 'sla_hours': 72,
+             'sla_deadline': None, 'language': 'en', 'language_confidence': 1.0, 'needs_review': False,
+             'enrichment_skipped': None} for t in texts]
+
+
+def seeded(n=10):
+    db = mongomock.MongoClient().db
+    created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    db.complaints.insert_many([{'text': f"refund please {i}" if i % 2 else f"late parcel {i}", 'ml_category': 'delivery',
+                                'category': 'delivery', 'created_at': created} for i in range(n)])
+    db.complaints.insert_one({'text': 'raw', 'enrichment_status': 'deferred'})
+    return db
+
+
+def test_dry_run_reports_drift_without_writing():
+    db = seeded()
+    report = backfill(db.complaints, db.backfill_jobs, chunk_size=3, workers=0, dry_run=True, enrich=fake_enrich)
+    assert report['scanned'] == 10 and report['changed'] == 10
+    assert report['category_drift'] == {'delivery->billing': 5}
+    assert db.complaints.count_documents({'ml_category': 'billing'}) == 0
+    assert db.backfill_jobs.count_documents({}) == 0
+
+
+def test_resumes_from_checkpoint_and_uses_the_pool():
+    db = seeded()
+    first_three = [d['_id'] for d in db.complaints.find().sort('_id', 1).limit(3)]
+    db.backfill_jobs.insert_one({'_id': 'default', 'last_id': first_three[-1], 'scanned': 3, 'changed': 0,
+                                 'category_drift': {}, 'priority_changes': 0})
+    state = backfill(db.complaints, db.backfill_jobs, chunk_size=2, workers=2, enrich=fake_enrich)
+    assert state['scanned'] == 10 and state['finished_at']
+    assert db.complaints.count_documents({'_id': {'$in': first_three}, 'model_version': 'v2'}) == 0
+    assert db.complaints.count_documents({'model_version': 'v2'}) == 7
+    assert db.complaints.find_one({'text': 'raw'}).get('model_version') is None
+    # A finished job is not re-run without --restart
+    assert backfill(db.complaints, db.backfill_jobs, workers=0, enrich=fake_enrich)['scanned'] == 10
+
+
+def test_keeps_manual_and_corrected_categories():
+    enriched = fake_enrich(['refund'])[0]
+    created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    update = changes_for({'category': 'quality', 'is_manual_category': True, 'created_at': created}, enriched)
+    assert 'category' not in update['$set'] and update['$set']['sla_deadline'].day == 4
+    assert 'category' not in changes_for({'feedback_category': 'quality', 'feedback_given': True}, enriched)['$set']
+    current = dict(enriched, sla_deadline=None)
+    assert changes_for(current, enriched) is None
+
+
+def test_keeps_admin_recategorisations_and_confirmed_categories():
+    enriched = fake_enrich(['refund'])[0]
+    # PUT / bulk update change the category without marking it manual
+    edited = {'category': 'quality', 'ml_category': 'delivery', 'is_manual_category': False}
+    update = changes_for(edited, enriched)
+    assert 'category' not in update['$set'] and update['$set']['ml_category'] == 'billing'
+    # Feedback marked correct sets no feedback_category
+    confirmed = {'category': 'delivery', 'ml_category': 'delivery', 'feedback_given': True, 'feedback_is_correct': True}
+    assert 'category' not in changes_for(confirmed, enriched)['$set']
+    # Still the model's untouched prediction: follows the new model
+    assert changes_for({'category': 'delivery', 'ml_category': 'delivery'}, enriched)['$set']['category'] == 'billing'
+    current = dict(enriched, sla_deadline=None)
+    assert changes_for(current, enriched) is None
+
+
+def test_real_enrichment_batch():
+    enriched = enrich_chunk(["The package arrived broken, this is urgent", "Thanks, great service"])
+    assert enriched[0]['priority'] == 'critical' and enriched[1]['sentiment'] == 'positive'
+
+
+def test_throttle():
+    slept = []
+    throttle = Throttle(max_docs_per_sec=100, latency_target=0.5, sleep=slept.append)
+    throttle.after_write(50, 0.01)
+    throttle.after_write(0, 2.0)
+    assert 0.4 < slept[0] <= 0.5 and slept[1] >= 2.0
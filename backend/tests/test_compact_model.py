@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.utils import murmurhash3_32 as sklearn_murmurhash
+
+from compact_model import export_compact, load_compact, murmurhash3_32
+
+PROBES = ["charged twice for my order", "the app shows an error", "unknown words only", "", "Café crème broken"]
+
+
+def _assert_same_scores(model, vectorizer, path, tolerance=1e-5):
+    compact_model, compact_vectorizer = load_compact(str(path))
+    expected = model.predict_proba(vectorizer.transform(PROBES))
+    actual = compact_model.predict_proba(compact_vectorizer.transform(PROBES))
+    assert np.abs(expected - actual).max() < tolerance
+    assert list(compact_model.classes_) == list(model.classes_)
+
+
+def test_tfidf_logistic_regression_roundtrip(tmp_path, training_corpus):
+    """The NumPy scorer reproduces TF-IDF + multinomial logistic regression"""
+    texts, labels = training_corpus
+    vectorizer = TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True)
+    model = LogisticRegression(max_iter=1000).fit(vectorizer.fit_transform(texts), labels)
+    export_compact(model, vectorizer, str(tmp_path))
+    _assert_same_scores(model, vectorizer, tmp_path)
+
+
+def test_hashing_sgd_roundtrip(tmp_path, training_corpus):
+    """Hashed features + one-vs-rest SGD match, including alternate signs"""
+    texts, labels = training_corpus
+    vectorizer = HashingVectorizer(n_features=2 ** 10, ngram_range=(1, 2))
+    model = SGDClassifier(loss='log_loss', random_state=0).fit(vectorizer.transform(texts), labels)
+    export_compact(model, vectorizer, str(tmp_path))
+    _assert_same_scores(model, vectorizer, tmp_path)
+
+
+def test_int8_quantization_keeps_labels(tmp_path, small_model):
+    model, vectorizer = small_model
+    export_compact(model, vectorizer, str(tmp_path), quantize='int8')
+    compact_model, compact_vectorizer = load_compact(str(tmp_path))
+    expected = model.predict(vectorizer.transform(PROBES[:2]))
+    assert list(compact_model.predict(compact_vectorizer.transform(PROBES[:2]))) == list(expected)
+    assert np.load(tmp_path / 'coef.npy').dtype == np.int8
+
+
+def test_unsupported_vectorizer_is_rejected(tmp_path, training_corpus):
+    texts, labels = training_corpus
+    vectorizer = TfidfVectorizer(analyzer='char')
+    model = LogisticRegression(max_iter=1000).fit(vectorizer.fit_transform(texts), labels)
+    with pytest.raises(ValueError):
+        export_compact(model, vectorizer, str(tmp_path))
+
+
+def test_murmurhash_matches_sklearn():
+    for token in ['', 'a', 'ab', 'abc', 'abcd', 'charged twice', 'crème brûlée', '漢字']:
+        assert murmurhash3_32(token.encode('utf-8')) == sklearn_murmurhash(token, seed=0)
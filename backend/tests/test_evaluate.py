@@ -0,0 +1,58 @@
+import numpy as np
+import mongomock
+from bson import ObjectId, json_util
+from sklearn.metrics import f1_score
+
+from evaluate import calibration_report, classification_report, compare, evaluate, jsonl_source, load_samples
+from model_registry import in_holdout, labelled_complaints
+from train_model import train_seed
+
+
+def test_classification_report_matches_sklearn():
+    y_true = ['billing', 'billing', 'delivery', 'quality', 'quality', 'quality']
+    y_pred = ['billing', 'delivery', 'delivery', 'quality', 'billing', 'quality']
+    labels = ['billing', 'delivery', 'quality', 'service']
+    report = classification_report(y_true, y_pred, labels)
+    assert report['accuracy'] == 4 / 6
+    assert np.isclose(report['macro_f1'], f1_score(y_true, y_pred, average='macro'))
+    assert 'service' not in report['per_category']
+    assert report['confusion_matrix']['matrix'][2] == [1, 0, 2, 0]
+
+
+def test_calibration():
+    proba = np.array([[0.9, 0.1], [0.9, 0.1], [0.6, 0.4], [0.6, 0.4]])
+    report = calibration_report(proba, ['a', 'b'], ['a', 'b', 'a', 'a'], bins=10)
+    assert [row['count'] for row in report['reliability']] == [2, 2]
+    # 0.9 confident but 50% right, 0.6 confident and 100% right
+    assert np.isclose(report['ece'], 0.5 * 0.4 + 0.5 * 0.4)
+
+
+def test_evaluate_exported_complaints(tmp_path):
+    path = tmp_path / 'complaints.jsonl'
+    path.write_text(
+        '{"text": "I was charged twice", "ml_category": "billing", "feedback_given": true}\n'
+        '{"text": "The product arrived damaged", "ml_category": "billing", "feedback_given": true,'
+        ' "feedback_is_correct": false, "feedback_category": "delivery"}\n'
+        '{"text": "no label yet", "ml_category": "quality"}\n')
+    texts, labels = load_samples(jsonl_source(str(path), 1))
+    assert labels == ['billing', 'delivery']
+    model, vectorizer, _, _ = train_seed()
+    report = evaluate(model, vectorizer, texts, labels)
+    assert report['samples'] == 2 and 0.0 <= report['calibration']['ece'] <= 1.0
+    worse = dict(report, accuracy=report['accuracy'] - 0.5)
+    assert compare(report, worse)['accuracy']['better'] is True
+
+
+def test_only_held_out_complaints_are_scored(tmp_path):
+    """The same ids are held out from training and selected for evaluation, whatever the source"""
+    docs = [{'_id': ObjectId(), 'text': f"complaint {i}", 'ml_category': 'billing', 'feedback_given': True}
+            for i in range(400)]
+    held = [d['text'] for d in docs if in_holdout(d['_id'], 20)]
+    assert 5 < len(held) < 40 and not any(in_holdout(d['_id'], 0) for d in docs)
+
+    path = tmp_path / 'complaints.jsonl'
+    path.write_text(''.join(json_util.dumps(d) + '\n' for d in docs))
+    assert load_samples(jsonl_source(str(path), 50, holdout_every=20))[0] == held
+    collection = mongomock.MongoClient().db.complaints
+    collection.insert_many(docs)
+    assert [text for text, _ in labelled_complaints(collection, holdout_every=20)] == held
@@ -0,0 +1,104 @@
+import threading
+import time
+
+import app as app_module
+from event_log import EventLog, FileEventSink
+
+
+class ListSink:
+    def __init__(self, gate=None, fail=False):
+        self.batches = []
+        self.gate = gate
+        self.fail = fail
+
+    def write(self, events):
+        if self.gate is not None:
+            self.gate.wait()
+        if self.fail:
+            raise ConnectionError('sink down')
+        self.batches.append(list(events))
+
+
+def test_events_are_written_in_bounded_batches():
+    sink = ListSink()
+    log = EventLog(sink, batch_size=500, flush_interval=0.05)
+    for i in range(1200):
+        log.record('update', user=f"user{i}")
+    log.flush()
+    assert sum(len(b) for b in sink.batches) == 1200
+    assert max(len(b) for b in sink.batches) <= 500
+    log.close()
+
+
+def test_full_queue_drops_and_close_drains():
+    """A stalled sink fills the queue; producers are refused instead of blocking forever"""
+    gate = threading.Event()
+    sink = ListSink(gate=gate)
+    log = EventLog(sink, max_queue=5, batch_size=2, flush_interval=0.01, put_timeout=0.01)
+    accepted = sum(log.record('create') for _ in range(20))
+    assert log.dropped == 20 - accepted > 0
+    gate.set()
+    log.close()
+    assert sum(len(b) for b in sink.batches) == accepted
+
+
+def test_close_spills_unwritable_events(tmp_path):
+    log = EventLog(ListSink(fail=True), flush_interval=0.01, spill_dir=str(tmp_path))
+    log.record('delete', complaint_id='0' * 24)
+    log.close()
+    spilled = list(tmp_path.glob('event-log-spill-*.jsonl'))
+    assert len(spilled) == 1 and '"delete"' in spilled[0].read_text()
+
+
+def test_close_interrupts_the_retry_backoff(tmp_path):
+    """A writer backing off from a failing sink spills at once instead of outliving the join"""
+    log = EventLog(ListSink(fail=True), flush_interval=20.0, spill_dir=str(tmp_path))
+    log.record('update')
+    log.record('delete')
+    time.sleep(0.2)  # the first write fails and the writer starts a 20s backoff
+    log.close(timeout=2.0)
+    assert not log._thread.is_alive()
+    assert len(list(tmp_path.glob('event-log-spill-*.jsonl'))[0].read_text().splitlines()) == 2
+
+
+def test_events_recorded_after_close_are_not_lost(tmp_path):
+    sink = ListSink()
+    log = EventLog(sink, flush_interval=0.01, spill_dir=str(tmp_path))
+    log.record('create')
+    log.close()
+    assert log.record('update') and sink.batches[-1][0]['action'] == 'update'
+    assert log.written == 2 and log.dropped == 0
+    sink.fail = True
+    log.record('delete')
+    assert '"delete"' in list(tmp_path.glob('event-log-spill-*.jsonl'))[0].read_text()
+
+
+def test_file_sink_rotates_and_pages_history(tmp_path):
+    sink = FileEventSink(str(tmp_path), max_bytes=300)
+    log = EventLog(sink, batch_size=2, flush_interval=0.01)
+    cid = '65a000000000000000000001'
+    for i in range(6):
+        log.record('update', complaint_id=cid, user='admin', changes={'status': str(i)})
+    log.record('update', complaint_id='65a000000000000000000002')
+    log.flush()
+    assert len(list(tmp_path.glob('*.jsonl'))) > 1
+    first = sink.history(cid, limit=4)
+    rest = sink.history(cid, before=first[-1]['_id'], limit=4)
+    assert [e['changes']['status'] for e in first + rest] == ['5', '4', '3', '2', '1', '0']
+    log.close()
+
+
+def test_complaint_history_endpoint(client, mock_db, auth_headers):
+    cid = str(mock_db['complaints'].insert_one({'text': 'late', 'category': 'delivery', 'status': 'pending'}).inserted_id)
+    client.put(f'/api/complaints/{cid}', json={'status': 'resolved'}, headers=auth_headers['admin'])
+    client.post('/api/complaints/bulk', json={'ids': [cid], 'category': 'service'}, headers=auth_headers['admin'])
+    client.delete(f'/api/complaints/{cid}', headers=auth_headers['admin'])
+    app_module.event_log.flush()
+
+    url = f'/api/complaints/{cid}/history'
+    assert client.get(url, headers=auth_headers['testuser']).status_code == 403
+    page = client.get(f'{url}?limit=2', headers=auth_headers['admin']).get_json()
+    assert [e['action'] for e in page['events']] == ['delete', 'bulk_update']
+    rest = client.get(f"{url}?limit=2&before={page['next']}", headers=auth_headers['admin']).get_json()
+    assert [e['action'] for e in rest['events']] == ['update']
+    assert rest['events'][0]['previous'] == {'status': 'pending'}
@@ -0,0 +1,40 @@
+from inference import predict_batch, needs_review
+
+
+def test_predict_batch_matches_predict(small_model):
+    """A single predict_proba call gives the same label as model.predict"""
+    model, vectorizer = small_model
+    texts = ["charged twice on my card", "package arrived damaged", "site is down"]
+    results = predict_batch(model, vectorizer, texts, top_k=3)
+    expected = model.predict(vectorizer.transform(texts))
+    assert [r['category'] for r in results] == list(expected)
+    for r in results:
+        probabilities = [t['probability'] for t in r['top_categories']]
+        assert len(probabilities) == 3
+        assert probabilities == sorted(probabilities, reverse=True)
+        assert r['confidence'] == probabilities[0]
+
+
+def test_predict_batch_without_model():
+    """Missing artifacts fall back to uncategorized"""
+    results = predict_batch(None, None, ["anything"])
+    assert results == [{'category': 'uncategorized', 'confidence': 0.0, 'top_categories': []}]
+    assert predict_batch(None, None, []) == []
+
+
+def test_needs_review_threshold():
+    assert needs_review({'confidence': 0.2}, 0.4)
+    assert not needs_review({'confidence': 0.9}, 0.4)
+
+
+def test_review_queue_is_admin_only(client, mock_db, auth_headers):
+    """Low-confidence complaints are listed for admins, least confident first"""
+    mock_db['complaints'].insert_many([
+        {'text': 'a', 'confidence': 0.3, 'needs_review': True, 'feedback_given': False},
+        {'text': 'b', 'confidence': 0.1, 'needs_review': True, 'feedback_given': False},
+        {'text': 'c', 'confidence': 0.9, 'needs_review': False, 'feedback_given': False},
+    ])
+    assert client.get('/api/complaints/review', headers=auth_headers['testuser']).status_code == 403
+    response = client.get('/api/complaints/review', headers=auth_headers['admin'])
+    assert response.status_code == 200
+    assert [c['text'] for c in response.get_json()['complaints']] == ['b', 'a']
@@ -0,0 +1,60 @@
+import app as app_module
+from languages import LanguageDetector, lexicon_sentiment, PROFILES
+
+
+def test_detects_supported_languages_in_one_batch():
+    detector = LanguageDetector()
+    texts = [
+        "My order never showed up and support ignores me",
+        "Mi pedido nunca llegó y nadie me ayuda con el reembolso",
+        "Ma commande n'est jamais arrivée et personne ne m'aide",
+        "Meine Bestellung ist nie angekommen und niemand hilft mir",
+        "Meu pedido nunca chegou e ninguém me ajuda",
+        "Il mio ordine non è mai arrivato e nessuno mi aiuta",
+    ]
+    assert [lang for lang, _ in detector.detect_batch(texts)] == ['en', 'es', 'fr', 'de', 'pt', 'it']
+
+
+def test_short_and_unknown_script_text():
+    detector = LanguageDetector(default='en')
+    short, cyrillic = detector.detect_batch(["ok thanks", "Заказ не пришёл вовремя, верните деньги"])
+    assert short == ('en', 0.0)
+    assert cyrillic == ('und', 0.0)
+
+
+def test_lexicon_sentiment():
+    assert lexicon_sentiment("El servicio fue pésimo y grosero", PROFILES['es']['lexicon']) < -0.3
+    assert lexicon_sentiment("sin palabras conocidas", PROFILES['es']['lexicon']) == 0.0
+
+
+def test_complaints_are_routed_by_language(monkeypatch):
+    monkeypatch.setattr(app_module.Config, 'SUPPORTED_LANGUAGES', ['en', 'es', 'fr'])
+    # Only Spanish has a classifier of its own
+    classifiers = {'es': (app_module.model, app_module.vectorizer, 'es-1')}
+    monkeypatch.setattr(app_module.language_models, 'get', lambda lang: classifiers.get(lang, (None, None, None)))
+    spanish, french, english, cyrillic = app_module.build_complaint_docs([
+        ("El paquete llegó roto, es urgente que me lo cambien", None),
+        ("Le colis est arrivé cassé, c'est urgent", None),
+        ("The package arrived broken, this is urgent", None),
+        ("Заказ не пришёл вовремя, верните деньги", None),
+    ], 'testuser')
+    assert (spanish['language'], spanish['priority'], spanish['model_version']) == ('es', 'critical', 'es-1')
+    # No French classifier: enriched as the default language rather than skipped
+    assert (french['language'], french['detected_language']) == ('en', 'fr') and 'enrichment_skipped' not in french
+    assert english['language'] == 'en' and english['priority'] == 'critical' and 'enrichment_skipped' not in english
+    assert cyrillic['language'] == 'und' and cyrillic['enrichment_skipped'] == 'unsupported_language'
+    assert (cyrillic['priority'], cyrillic['sentiment'], cyrillic['needs_review']) == ('medium', 'neutral', True)
+
+
+def test_short_english_complaints_stay_english(monkeypatch):
+    texts = ["Internet connection drops every hour", "Terrible customer support experience",
+             "Installation technician no show", "Refund not processed yet"]
+    # Some of these score as French or Italian on their own
+    assert {lang for lang, _ in app_module.language_detector.detect_batch(texts)} != {'en'}
+    expected = [app_module.predict_complaint_category(text)[0] for text in texts]
+    for supported in (['en'], ['en', 'es', 'fr', 'de', 'pt', 'it']):
+        monkeypatch.setattr(app_module.Config, 'SUPPORTED_LANGUAGES', supported)
+        docs = app_module.build_complaint_docs([(text, None) for text in texts], 'testuser')
+        assert [d['language'] for d in docs] == ['en'] * len(texts)
+        assert [d['ml_category'] for d in docs] == expected
+        assert not any('enrichment_skipped' in d for d in docs)
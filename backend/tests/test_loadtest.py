@@ -0,0 +1,39 @@
+import random
+
+import pytest
+
+from loadtest import (CATEGORY_VOCABULARY, MIXES, build_schedule, complaint_text, load_schedule, parse_mix, save_schedule,
+                      users_needed)
+
+
+def test_schedule_is_reproducible_and_follows_the_mix(tmp_path):
+    schedule = build_schedule(MIXES['intake'], rps=200, duration=10, seed=7)
+    assert schedule == build_schedule(MIXES['intake'], rps=200, duration=10, seed=7)
+    assert 1800 < len(schedule) < 2200 and schedule[-1]['at'] < 10
+    creates = [item for item in schedule if item['op'] == 'create']
+    assert 0.75 < len(creates) / len(schedule) < 0.85
+    assert all(item['body']['text'] for item in creates)
+
+    path = str(tmp_path / 'schedule.jsonl')
+    save_schedule(schedule, path)
+    replayed = load_schedule(path, speed=2)
+    assert [item['op'] for item in replayed] == [item['op'] for item in schedule]
+    assert replayed[-1]['at'] == pytest.approx(schedule[-1]['at'] / 2)
+
+
+def test_parse_mix_and_text():
+    assert parse_mix('browse') == MIXES['browse']
+    assert parse_mix('create=3,list') == {'create': 3.0, 'list': 1.0}
+    with pytest.raises(ValueError):
+        parse_mix('delete=1')
+    text = complaint_text(random.Random(1), 'billing')
+    subjects, problems = CATEGORY_VOCABULARY['billing']
+    assert any(s in text for s in subjects) and any(p in text for p in problems)
+
+
+def test_users_needed_covers_the_create_rate():
+    # 50 rps of intake is 40 creates/s; at 30 per 60s each user sustains 0.5/s
+    assert users_needed(50 * 0.8, '30/60') == 80
+    assert users_needed(200 * 0.25, '30/60') == 100
+    assert users_needed(0.4, '30/60') == 1
+    assert users_needed(40, '') == 1 and users_needed(0, '30/60') == 1
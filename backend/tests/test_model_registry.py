@@ -0,0 +1,52 @@
+import pytest
+
+from model_registry import ModelRegistry
+
+
+@pytest.fixture
+def register(small_model, training_corpus):
+    texts, _ = training_corpus
+    model, vectorizer = small_model
+    return lambda registry: registry.register(model, vectorizer, training_size=len(texts), fit_seconds=0.01,
+                                              sample_texts=texts)
+
+
+def test_register_records_metadata(tmp_path, register, training_corpus):
+    """Registration stores artifacts plus size and latency metadata"""
+    registry = ModelRegistry(str(tmp_path))
+    version = register(registry)
+    texts, labels = training_corpus
+    metadata = registry.metadata(version)
+    assert metadata['training_size'] == len(texts)
+    assert metadata['artifact_bytes'] > 0
+    assert metadata['inference_latency']['sample_size'] == len(texts)
+    assert sorted(metadata['classes']) == sorted(set(labels))
+
+
+def test_promote_and_rollback(tmp_path, register):
+    """Promotion keeps the previous version around for a one-step rollback"""
+    registry = ModelRegistry(str(tmp_path))
+    first, second = register(registry), register(registry)
+    assert first != second
+    registry.promote(first)
+    registry.promote(second)
+    assert registry.state()['active'] == second
+    assert registry.state()['previous'] == first
+    assert registry.load_active()[2] == second
+    registry.rollback()
+    assert registry.state()['active'] == first
+
+
+def test_rollback_without_previous_fails(tmp_path):
+    with pytest.raises(ValueError):
+        ModelRegistry(str(tmp_path)).rollback()
+
+
+def test_evaluate_appends_to_metadata(tmp_path, register, training_corpus):
+    """Offline evaluation scores labelled samples and keeps the history"""
+    registry = ModelRegistry(str(tmp_path))
+    version = register(registry)
+    result = registry.evaluate(version, list(zip(*training_corpus)))
+    assert result['samples'] == len(training_corpus[0])
+    assert 0.0 <= result['accuracy'] <= 1.0
+    assert registry.metadata(version)['evaluations'] == [result]
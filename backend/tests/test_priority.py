@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta, timezone
+
+import mongomock
+
+from priority import PriorityEngine, LearnedPriorityModel, build_features, outcome_label, reprioritize, train
+
+
+def cascade(text, sentiment):
+    """The original if/elif priority rules"""
+    text = text.lower()
+    if any(k in text for k in ['urgent', 'critical', 'emergency', 'immediately', 'asap']):
+        return 'critical', 4
+    if any(k in text for k in ['broken', 'not working', 'damaged', 'failed', 'error']):
+        return 'high', 24
+    if sentiment == 'negative':
+        return 'high', 24
+    if sentiment == 'positive':
+        return 'low', 168
+    return 'medium', 72
+
+
+def test_default_rules_match_the_original_cascade():
+    texts = ["URGENT: refund me", "screen is broken", "very slow delivery", "great service thanks",
+             "where is my parcel", "critical error on checkout", ""]
+    sentiments = ['neutral', 'positive', 'negative', 'positive', 'neutral', 'negative', 'neutral']
+    priorities, hours, deadlines = PriorityEngine().assign(build_features(texts, sentiments))
+    assert list(zip(priorities, hours)) == [cascade(t, s) for t, s in zip(texts, sentiments)]
+    assert deadlines[0] - datetime.now(timezone.utc) > timedelta(hours=3, minutes=59)
+
+
+def test_keywords_follow_each_complaints_language():
+    features = build_features(["es urgente", "es urgente"], ['neutral', 'neutral'], languages=['es', 'de'])
+    assert list(PriorityEngine().assign(features)[0]) == ['critical', 'medium']
+
+
+def test_configured_rules_table():
+    engine = PriorityEngine(rules=[
+        {'when': {'critical_keyword': True}, 'priority': 'critical'},
+        {'when': {'category': 'billing', 'sentiment': ['negative', 'neutral']}, 'priority': 'high'},
+        {'when': {'max_confidence': 0.3}, 'priority': 'high'},
+        {'priority': 'low'},
+    ], sla_hours={'high': 12})
+    features = build_features(["charged twice", "charged twice", "charged twice"], ['neutral'] * 3,
+                              categories=['billing', 'delivery', 'delivery'], confidences=[0.9, 0.2, 0.9])
+    priorities, hours, _ = engine.assign(features)
+    assert list(priorities) == ['high', 'high', 'low'] and hours == [12, 12, 168]
+
+
+def test_learned_model_round_trip_and_fallback(tmp_path):
+    now = datetime.now(timezone.utc)
+    docs = []
+    for i in range(40):
+        breached = i % 2 == 0
+        docs.append({'text': 'slow refund' if breached else 'thanks', 'sentiment': 'negative' if breached else 'positive',
+                     'sentiment_score': -0.5 if breached else 0.5, 'category': 'billing', 'confidence': 0.8,
+                     'priority': 'high' if breached else 'low', 'status': 'resolved',
+                     'sla_deadline': now - timedelta(days=2), 'sla_breached': breached,
+                     # Edited after resolving: the edit time says nothing about the SLA outcome
+                     'updated_at': now - timedelta(days=1)})
+    assert outcome_label(docs[0]) == 'critical' and outcome_label(docs[1]) == 'low'
+    assert outcome_label({'priority': 'low', 'status': 'pending', 'sla_deadline': now - timedelta(hours=1)}) == 'medium'
+    path = str(tmp_path / 'priority.npz')
+    train(docs).save(path)
+    engine = PriorityEngine(model=LearnedPriorityModel.load(path))
+    features = build_features(['slow refund', 'thanks'], ['negative', 'positive'], [-0.5, 0.5],
+                              ['billing', 'billing'], [0.8, 0.8])
+    assert list(engine.assign(features)[0]) == ['critical', 'low']
+    engine.model.n_features += 1  # e.g. trained with a different category list
+    assert list(engine.assign(features)[0]) == ['high', 'low']
+
+
+def test_reprioritize_rewrites_only_changed_complaints():
+    collection = mongomock.MongoClient().db.complaints
+    created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    collection.insert_many([
+        {'text': 'urgent', 'sentiment': 'neutral', 'priority': 'medium', 'sla_hours': 72, 'status': 'pending', 'created_at': created},
+        {'text': 'fine', 'sentiment': 'neutral', 'priority': 'medium', 'sla_hours': 72, 'status': 'pending', 'created_at': created},
+        {'text': 'urgent', 'sentiment': 'neutral', 'priority': 'medium', 'sla_hours': 72, 'status': 'resolved', 'created_at': created},
+    ])
+    assert reprioritize(collection, PriorityEngine(), dry_run=True) == {'critical': 1}
+    assert collection.count_documents({'priority': 'critical'}) == 0
+    assert reprioritize(collection, PriorityEngine(), batch_size=1) == {'critical': 1}
+    doc = collection.find_one({'priority': 'critical'})
+    assert doc['sla_hours'] == 4 and doc['sla_deadline'].replace(tzinfo=timezone.utc) == created + timedelta(hours=4)
+    assert collection.count_documents({'status': 'resolved', 'priority': 'medium'}) == 1
+
+
+def test_reprioritize_scores_unenriched_complaints_like_ingest():
+    collection = mongomock.MongoClient().db.complaints
+    created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    # Keywords were not matched at ingest for text in an unknown script
+    collection.insert_one({'text': 'urgent срочно', 'sentiment': 'neutral', 'priority': 'medium', 'sla_hours': 72,
+                           'status': 'pending', 'created_at': created, 'language': 'und',
+                           'enrichment_skipped': 'unsupported_language'})
+    assert reprioritize(collection, PriorityEngine()) == {}
@@ -0,0 +1,74 @@
+import threading
+import time
+
+import app as app_module
+import profiling
+from profiling import SamplingCoordinator, sample_stacks, stage
+
+
+def _busy_loop(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_stage_is_noop_outside_timed_request():
+    assert stage('ml') is stage('sentiment')  # the shared null context
+    profiling._local.timings = {}
+    try:
+        with stage('ml'):
+            time.sleep(0.01)
+        profiling.add_stage_time('mongo', 0.5)
+        assert profiling._local.timings['ml'] >= 0.01
+        assert profiling._local.timings['mongo'] == 0.5
+    finally:
+        profiling._local.timings = None
+
+
+def test_profile_header_is_admin_only(client, mock_db, auth_headers, tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module.Config, 'PROFILE_DIR', str(tmp_path))
+    headers = dict(auth_headers['admin'], **{'X-Profile': '1'})
+    response = client.get('/api/complaints', headers=headers)
+    profile_id = response.headers['X-Profile-Id']
+    assert 'total;dur=' in response.headers['Server-Timing']
+    assert 'X-Profile-Id' not in client.get('/api/complaints', headers=dict(auth_headers['testuser'], **{'X-Profile': '1'})).headers
+
+    stats = client.get(f'/api/admin/profiles/{profile_id}', headers=auth_headers['admin'])
+    assert stats.status_code == 200 and 'list_complaints' in stats.get_data(as_text=True)
+    assert client.get('/api/admin/profiles/..%2Fetc', headers=auth_headers['admin']).status_code == 404
+
+
+def test_slow_requests_are_logged_with_stages(client, mock_db, auth_headers, monkeypatch, capsys):
+    monkeypatch.setattr(app_module.Config, 'SLOW_REQUEST_MS', 0.001)
+    client.get('/api/complaints', headers=auth_headers['admin'])
+    out = capsys.readouterr().out
+    assert 'Slow request GET /api/complaints 200' in out and '"serialize"' in out
+
+
+def test_sampler_collects_busy_threads():
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy_loop, args=(stop,), name='busy')
+    worker.start()
+    try:
+        counts = sample_stacks(0.2, 0.005)
+    finally:
+        stop.set()
+        worker.join()
+    assert any(stack.startswith('busy;') and '_busy_loop' in stack for stack in counts)
+
+
+def test_coordinator_merges_worker_samples(tmp_path):
+    coordinator = SamplingCoordinator(str(tmp_path), poll_interval=0.05, sample_interval=0.005)
+    coordinator.ensure_watcher()
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy_loop, args=(stop,), name='busy')
+    worker.start()
+    try:
+        profile_id, until = coordinator.request(0.3)
+        stacks, workers = coordinator.collect(profile_id, until)
+    finally:
+        stop.set()
+        worker.join()
+    assert workers == 1
+    line = next(l for l in stacks.splitlines() if '_busy_loop' in l)
+    assert int(line.rsplit(' ', 1)[1]) > 0
+    assert not list(tmp_path.glob('*.collapsed'))
@@ -0,0 +1,119 @@
+import threading
+
+import app as app_module
+from backfill import drain_deferred
+from rate_limit import MemoryBucketStore, SQLiteBucketStore, RateLimiter, LoadShedder, parse_rate
+
+
+def test_token_bucket_refills():
+    store = MemoryBucketStore()
+    rate, burst = parse_rate('3/60')
+    results = [store.take('k', rate, burst, now=100.0) for _ in range(4)]
+    assert [allowed for allowed, _ in results] == [True, True, True, False]
+    assert results[-1][1] == 20.0                    # one token every 20 seconds
+    assert store.take('k', rate, burst, now=120.0)[0]
+    assert store.take('other', rate, burst, now=120.0)[0]
+
+
+def test_sqlite_store_is_shared_and_atomic(tmp_path):
+    path = str(tmp_path / 'buckets.sqlite3')
+    first, second = SQLiteBucketStore(path), SQLiteBucketStore(path)
+    allowed = []
+
+    def hit(store):
+        for _ in range(10):
+            allowed.append(store.take('k', 0.001, 12)[0])
+
+    threads = [threading.Thread(target=hit, args=(s,)) for s in (first, second, first, second)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert allowed.count(True) == 12
+
+
+def test_limiter_combines_user_and_tenant_buckets():
+    limiter = RateLimiter(MemoryBucketStore(), {'user': '2/60', 'tenant': '3/60'})
+    assert limiter.check(('user', 'a'), ('tenant', 't')) == 0
+    assert limiter.check(('user', 'a'), ('tenant', 't')) == 0
+    assert limiter.check(('user', 'a'), ('tenant', None)) > 0       # user bucket empty
+    assert limiter.check(('user', 'b'), ('tenant', 't')) == 0
+    assert limiter.check(('user', 'c'), ('tenant', 't')) == 20      # tenant bucket empty
+
+
+def test_shedder_backs_off_after_slow_enrichment():
+    shedder = LoadShedder(max_inflight=2, latency_target=0.0, cooldown=30)
+    assert not shedder.overloaded()
+    with shedder.track():
+        pass
+    assert shedder.overloaded() and shedder.retry_after() > 25
+
+
+def test_create_complaint_rate_limited(client, mock_db, auth_headers, monkeypatch):
+    monkeypatch.setattr(app_module.limiter, 'rules', {'create_complaint': parse_rate('1/60')})
+    monkeypatch.setattr(app_module, 'store_complaint', lambda text, user, category=None: {'text': text})
+    assert client.post('/api/complaints', json={'text': 'a'}, headers=auth_headers['testuser']).status_code == 201
+    response = client.post('/api/complaints', json={'text': 'b'}, headers=auth_headers['testuser'])
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '60'
+    assert client.post('/api/complaints', json={'text': 'c'}, headers=auth_headers['admin']).status_code == 201
+
+
+def test_overload_defers_enrichment(client, mock_db, auth_headers, monkeypatch):
+    monkeypatch.setattr(app_module, 'shedder', LoadShedder(max_inflight=0, latency_target=60, cooldown=1))
+    monkeypatch.setattr(app_module, 'ensure_deferred_enricher', lambda: None)
+    response = client.post('/api/complaints', json={'text': 'The package never arrived', 'category': 'delivery'},
+                           headers=auth_headers['testuser'])
+    assert response.status_code == 202
+    stored = mock_db['complaints'].find_one()
+    assert stored['enrichment_status'] == 'deferred' and 'sentiment' not in stored
+
+    assert app_module.enrich_deferred() == 1
+    stored = mock_db['complaints'].find_one()
+    assert 'enrichment_status' not in stored
+    assert stored['category'] == 'delivery' and stored['is_manual_category'] and 'sentiment' in stored
+    assert app_module.enrich_deferred() == 0
+
+
+def test_enrichment_keeps_a_category_changed_while_deferred(client, mock_db, auth_headers, monkeypatch):
+    monkeypatch.setattr(app_module, 'shedder', LoadShedder(max_inflight=0, latency_target=60, cooldown=1))
+    monkeypatch.setattr(app_module, 'ensure_deferred_enricher', lambda: None)
+    for text in ("The package never arrived", "I was charged twice"):
+        client.post('/api/complaints', json={'text': text}, headers=auth_headers['testuser'])
+    first = mock_db['complaints'].find_one({'text': "The package never arrived"})
+    client.put(f"/api/complaints/{first['_id']}", json={'category': 'service'}, headers=auth_headers['admin'])
+
+    assert app_module.enrich_deferred() == 2
+    first = mock_db['complaints'].find_one({'_id': first['_id']})
+    second = mock_db['complaints'].find_one({'text': "I was charged twice"})
+    assert first['category'] == 'service' and 'sentiment' in first and 'enrichment_status' not in first
+    assert second['category'] == second['ml_category'] != app_module.UNCATEGORIZED
+
+
+def test_every_worker_enriches_complaints_deferred_earlier(client, mock_db, auth_headers, monkeypatch):
+    monkeypatch.setattr(app_module, 'shedder', LoadShedder(max_inflight=0, latency_target=60, cooldown=1))
+    for text in ("The package never arrived", "I was charged twice", "Rude staff"):
+        client.post('/api/complaints', json={'text': text}, headers=auth_headers['testuser'])
+    # A fresh worker starts its enricher on its first request, whatever that request is
+    started = []
+    monkeypatch.setattr(app_module.Config, 'DEFERRED_ENRICH_INTERVAL', 5)
+    monkeypatch.setattr(app_module, 'ensure_deferred_enricher', lambda: started.append(True))
+    client.get('/api/complaints', headers=auth_headers['admin'])
+    assert started
+    # The cron entry drains them all
+    assert drain_deferred(app_module.enrich_deferred, 2) == 3
+    assert mock_db['complaints'].count_documents({'enrichment_status': {'$exists': True}}) == 0
+
+
+def test_overload_rejects_in_reject_mode(client, mock_db, auth_headers, monkeypatch):
+    monkeypatch.setattr(app_module.Config, 'SHED_MODE', 'reject')
+    monkeypatch.setattr(app_module, 'shedder', LoadShedder(max_inflight=0, latency_target=60, cooldown=1))
+    response = client.post('/api/complaints', json={'text': 'x'}, headers=auth_headers['testuser'])
+    assert response.status_code == 429 and int(response.headers['Retry-After']) >= 1
+
+
+def test_login_rate_limited(client, mock_db):
+    for _ in range(10):
+        client.post('/api/auth/login', json={'username': 'admin', 'password': 'wrong'})
+    response = client.post('/api/auth/login', json={'username': 'admin', 'password': 'admin123'})
+    assert response.status_code == 429
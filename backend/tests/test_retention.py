@@ -0,0 +1,112 @@
+import csv
+from datetime import datetime, timedelta
+from io import StringIO
+
+import app as app_module
+from retention import (CollectionArchive, FileArchive, ROLLUP_ID, archive_resolved, merge_rollup,
+                       rebuild_rollups)
+
+OLD = datetime(2025, 1, 15)
+
+
+def _seed(db):
+    recent = datetime.utcnow()
+    db['complaints'].insert_many([
+        {'text': 'old resolved', 'category': 'billing', 'status': 'resolved', 'user': 'u', 'created_at': OLD},
+        {'text': 'old closed', 'category': 'delivery', 'status': 'closed', 'user': 'u',
+         'created_at': OLD + timedelta(days=40)},
+        {'text': 'old open', 'category': 'billing', 'status': 'pending', 'user': 'u', 'created_at': OLD},
+        {'text': 'new resolved', 'category': 'billing', 'status': 'resolved', 'user': 'u', 'created_at': recent},
+    ])
+
+
+def test_archive_moves_old_resolved_and_keeps_rollups(mock_db):
+    _seed(mock_db)
+    archive = CollectionArchive(lambda: mock_db['complaints_archive'])
+    assert archive_resolved(mock_db['complaints'], archive, mock_db['complaint_rollups'], dry_run=True) == {'candidates': 2}
+    stats = archive_resolved(mock_db['complaints'], archive, mock_db['complaint_rollups'], batch_size=1)
+    assert stats == {'archived': 2, 'kept': 0, 'batches': 2}
+    assert sorted(d['text'] for d in mock_db['complaints'].find()) == ['new resolved', 'old open']
+    rollup = mock_db['complaint_rollups'].find_one({'_id': ROLLUP_ID})
+    assert rollup['total'] == 2
+    assert rollup['categories'] == {'billing': 1, 'delivery': 1}
+    assert rollup['months'] == {'2025-01': 1, '2025-02': 1}
+    rebuilt = rebuild_rollups(archive, mock_db['complaint_rollups'])
+    assert (rebuilt['total'], rebuilt['statuses']) == (2, {'resolved': 1, 'closed': 1})
+
+
+def test_reopened_complaint_stays_hot(mock_db):
+    """A complaint reopened while its batch is being archived is not deleted or counted"""
+    _seed(mock_db)
+    archive = CollectionArchive(lambda: mock_db['complaints_archive'])
+    store = archive.store
+
+    def store_then_reopen(docs):
+        store(docs)
+        mock_db['complaints'].update_one({'text': 'old resolved'}, {'$set': {'status': 'in_progress'}})
+
+    archive.store = store_then_reopen
+    stats = archive_resolved(mock_db['complaints'], archive, mock_db['complaint_rollups'])
+    assert (stats['archived'], stats['kept']) == (1, 1)
+    assert mock_db['complaints_archive'].count_documents({}) == 1
+    assert mock_db['complaint_rollups'].find_one()['total'] == 1
+
+
+def test_file_archive_partitions_by_month(mock_db, tmp_path):
+    _seed(mock_db)
+    archive = FileArchive(str(tmp_path), lambda: mock_db['complaints_archive'])
+    archive_resolved(mock_db['complaints'], archive, mock_db['complaint_rollups'])
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['complaints-2025-01.jsonl.gz', 'complaints-2025-02.jsonl.gz']
+    stub = mock_db['complaints_archive'].find_one({'archive_month': '2025-01'})
+    assert set(stub) == {'_id', 'archive_month'}
+    found = archive.find(stub['_id'], {'text': 1})
+    assert found == {'_id': stub['_id'], 'text': 'old resolved'}
+    assert sorted(d['text'] for d in archive.iter_all()) == ['old closed', 'old resolved']
+
+
+def test_file_archive_counts_only_the_current_copy(mock_db, tmp_path):
+    """Archived, restored by a concurrent reopen, then archived again with a new status"""
+    _seed(mock_db)
+    archive = FileArchive(str(tmp_path), lambda: mock_db['complaints_archive'])
+    store = archive.store
+
+    def store_then_reopen(docs):
+        store(docs)
+        mock_db['complaints'].update_one({'text': 'old resolved'}, {'$set': {'status': 'in_progress'}})
+
+    archive.store = store_then_reopen
+    archive_resolved(mock_db['complaints'], archive, mock_db['complaint_rollups'])
+    # The discarded line is still in the file but no longer archived
+    assert sorted(d['text'] for d in archive.iter_all()) == ['old closed']
+    assert rebuild_rollups(archive, mock_db['complaint_rollups'])['total'] == 1
+
+    archive.store = store
+    mock_db['complaints'].update_one({'text': 'old resolved'}, {'$set': {'status': 'closed'}})
+    archive_resolved(mock_db['complaints'], archive, mock_db['complaint_rollups'])
+    docs = list(archive.iter_all())
+    assert sorted((d['text'], d['status']) for d in docs) == [('old closed', 'closed'), ('old resolved', 'closed')]
+    assert archive.find(docs[0]['_id'])['status'] == docs[0]['status']
+    rebuilt = rebuild_rollups(archive, mock_db['complaint_rollups'])
+    assert (rebuilt['total'], rebuilt['statuses']) == (2, {'closed': 2})
+
+
+def test_reads_fall_back_to_archive(client, mock_db, auth_headers):
+    _seed(mock_db)
+    archived_id = mock_db['complaints'].find_one({'text': 'old resolved'})['_id']
+    archive_resolved(mock_db['complaints'], app_module.archive, mock_db['complaint_rollups'])
+
+    response = client.get(f'/api/complaints/{archived_id}', headers=auth_headers['admin'])
+    assert response.status_code == 200
+    assert response.get_json()['archived'] is True
+
+    summary = client.get('/api/dashboard/summary', headers=auth_headers['admin']).get_json()
+    assert summary['total_complaints'] == 4
+    assert {c['_id']: c['count'] for c in summary['categories']} == {'billing': 3, 'delivery': 1}
+
+    exported = client.get('/api/complaints/export?format=csv', headers=auth_headers['admin'])
+    rows = list(csv.reader(StringIO(exported.get_data(as_text=True))))
+    assert len(rows) == 5
+
+
+def test_merge_rollup_without_archive():
+    assert merge_rollup(3, [{'_id': 'billing', 'count': 3}], [], None) == (3, [{'_id': 'billing', 'count': 3}], [])
@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import mongomock
+import pytest
+
+import app as app_module
+from retrain_policy import RetrainPolicy, recency_weights
+
+CONFIG = SimpleNamespace(RETRAIN_MIN_FEEDBACK=5, RETRAIN_FEEDBACK_THRESHOLD=3, RETRAIN_MAX_AGE_HOURS=24,
+                         RETRAIN_DRIFT_MIN_SAMPLES=2, RETRAIN_DRIFT_ERROR_RATE=0.5, RETRAIN_LEASE_SECONDS=60,
+                         RETRAIN_RETRY_SECONDS=60)
+
+
+@pytest.fixture
+def policy():
+    collection = mongomock.MongoClient().db.retrain_state
+    return RetrainPolicy(lambda: collection, CONFIG)
+
+
+def test_triggers(policy):
+    now = datetime.now(timezone.utc)
+    assert policy.should_retrain({'feedback_since_train': 3, 'total_feedback': 4}) is None
+    assert policy.should_retrain({'feedback_since_train': 3, 'total_feedback': 5}) == 'count'
+    assert policy.should_retrain({'feedback_since_train': 1, 'total_feedback': 9,
+                                  'last_trained_at': now - timedelta(hours=25)}) == 'time'
+    assert policy.should_retrain({'feedback_since_train': 0, 'total_feedback': 9,
+                                  'last_trained_at': now - timedelta(hours=25)}) is None
+    assert policy.should_retrain({'feedback_since_train': 2, 'corrections_since_train': 1, 'total_feedback': 2}) == 'drift'
+    assert policy.should_retrain({'feedback_since_train': 2, 'corrections_since_train': 0, 'total_feedback': 2}) is None
+    # Drift wins over count
+    assert policy.should_retrain({'feedback_since_train': 3, 'corrections_since_train': 2, 'total_feedback': 9}) == 'drift'
+    assert policy.should_retrain({'feedback_since_train': 3, 'total_feedback': 5,
+                                  'retry_after': now + timedelta(minutes=1)}) is None
+
+
+def test_lease_coalesces_runs_and_keeps_feedback_given_during_training(policy):
+    for is_correct in (True, False, True):
+        policy.record_feedback({}, is_correct)
+    snapshot = policy.try_acquire('a')
+    assert snapshot['feedback_since_train'] == 3
+    assert policy.try_acquire('b') is None
+    policy.record_feedback({}, False)
+    policy.complete('a', snapshot, 'v2', 'count')
+    state = policy.status()
+    assert (state['feedback_since_train'], state['corrections_since_train'], state['total_feedback']) == (1, 1, 4)
+    assert state['last_version'] == 'v2' and state['lease_owner'] is None
+    assert policy.try_acquire('b') is not None
+    # An expired lease can be taken over
+    assert policy.try_acquire('c', now=datetime.now(timezone.utc) + timedelta(seconds=61)) is not None
+
+
+def test_feedback_is_counted_once_per_complaint(policy):
+    state = policy.record_feedback({}, True)
+    assert (state['feedback_since_train'], state['corrections_since_train'], state['total_feedback']) == (1, 0, 1)
+    given = {'feedback_given': True, 'feedback_is_correct': True}
+    assert policy.record_feedback(given, True)['feedback_since_train'] == 1
+    state = policy.record_feedback(given, False)
+    assert (state['feedback_since_train'], state['corrections_since_train']) == (1, 1)
+    state = policy.record_feedback(dict(given, feedback_is_correct=False), True)
+    assert (state['feedback_since_train'], state['corrections_since_train'], state['total_feedback']) == (1, 0, 1)
+    # Flipping back feedback whose correction a run already used never goes negative
+    assert policy.record_feedback(dict(given, feedback_is_correct=False), True)['corrections_since_train'] == 0
+
+
+def test_total_is_seeded_from_existing_feedback():
+    collection = mongomock.MongoClient().db.retrain_state
+    policy = RetrainPolicy(lambda: collection, CONFIG, count_feedback=lambda: 42)
+    # The count already includes the complaint this first feedback was just stored on
+    assert policy.record_feedback({}, True)['total_feedback'] == 42
+
+
+def test_failed_runs_back_off(policy):
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    for _ in range(3):
+        policy.record_feedback({}, True)
+    policy.try_acquire('a', now=now)
+    policy.fail('a', 'not enough feedback samples', now=now)
+    state = policy.status()
+    assert state['failures'] == 1 and state['lease_owner'] is None
+    assert policy.should_retrain(state, now=now + timedelta(seconds=59)) is None
+    assert policy.try_acquire('b', now=now + timedelta(seconds=59)) is None
+    assert policy.try_acquire('b', now=now + timedelta(seconds=59), force=True) is not None
+    policy.fail('b', 'boom', now=now)
+    assert policy.status()['retry_after'].replace(tzinfo=timezone.utc) == now + timedelta(seconds=120)
+    assert policy.try_acquire('c', now=now + timedelta(seconds=121)) is not None
+    policy.complete('c', {}, 'v3', 'count')
+    assert policy.status()['failures'] == 0 and policy.status()['retry_after'] is None
+
+
+def test_recency_weights():
+    now = datetime(2024, 3, 1, tzinfo=timezone.utc)
+    weights = recency_weights([now, now - timedelta(days=30), datetime(2024, 1, 1), None], now, 30)
+    assert list(weights.round(3)) == [1.0, 0.5, 0.25, 1.0]
+    assert list(recency_weights([now - timedelta(days=90)], now, 0)) == [1.0]
+
+
+def test_feedback_starts_one_background_retrain(client, mock_db, auth_headers, monkeypatch):
+    for name, value in vars(CONFIG).items():
+        monkeypatch.setattr(app_module.Config, name, value)
+    runs = []
+    monkeypatch.setattr(app_module, 'retrain_model', lambda reason=None: runs.append(reason) or f"v{len(runs)}")
+    monkeypatch.setattr(app_module, 'retrain_executor', SimpleNamespace(submit=lambda fn, *args: fn(*args)))
+    ids = mock_db['complaints'].insert_many([{'text': f"complaint {i}", 'ml_category': 'billing'}
+                                             for i in range(5)]).inserted_ids
+
+    replies = [client.post(f"/api/complaints/{cid}/feedback", headers=auth_headers['admin'],
+                           json={'is_correct': True}).get_json() for cid in ids[:4] + ids[:1] + ids[4:]]
+    # Re-submitting feedback on the first complaint counts nothing
+    assert [reply['retrain'] for reply in replies] == [None, None, None, None, None, 'count']
+    assert [reply['feedback_count'] for reply in replies] == [1, 2, 3, 4, 4, 5] and runs == ['count']
+    assert mock_db['complaints'].count_documents({'feedback_given': True}) == 5
+
+    status = client.get('/api/admin/retrain', headers=auth_headers['admin']).get_json()
+    assert status['feedback_since_train'] == 0 and status['last_version'] == 'v1'
+    assert client.post('/api/admin/retrain', headers=auth_headers['admin']).status_code == 202
+    assert runs == ['count', 'manual']
+    assert client.get('/api/admin/retrain', headers=auth_headers['testuser']).status_code == 403
@@ -0,0 +1,43 @@
+import json
+from datetime import datetime, timezone
+
+from bson import ObjectId
+
+from serialization import dumps, parse_fields, compact_text
+
+
+def test_dumps_encodes_objectid_and_datetime():
+    """ObjectId and datetime values are encoded without a pre-pass"""
+    oid = ObjectId('000000000000000000000001')
+    created = datetime(2025, 6, 6, 15, 27, 27, tzinfo=timezone.utc)
+    data = json.loads(dumps({'_id': oid, 'created_at': created}))
+    assert data['_id'] == '000000000000000000000001'
+    assert data['created_at'] == 'Fri, 06 Jun 2025 15:27:27 GMT'
+
+
+def test_parse_fields_builds_projection():
+    """fields= becomes an inclusion projection and drops operators"""
+    assert parse_fields('text, category,$where,') == {'text': 1, 'category': 1}
+    assert parse_fields('') is None
+    assert parse_fields('$where') is None
+
+
+def test_compact_text_truncates_long_text():
+    """Compact mode keeps a snippet of long complaint text"""
+    doc = compact_text({'text': 'a' * 200}, 10)
+    assert doc['text'] == 'a' * 10 + '…'
+    assert compact_text({'text': 'short'}, 10)['text'] == 'short'
+
+
+def test_list_complaints_projection_and_compact(client, mock_db, auth_headers):
+    """The list endpoint pushes the projection down and truncates text"""
+    mock_db['complaints'].insert_one({
+        'text': 'x' * 500, 'category': 'billing', 'status': 'pending',
+        'created_at': datetime.now(timezone.utc),
+    })
+    response = client.get('/api/complaints?fields=text,status&compact=true',
+                          headers=auth_headers['testuser'])
+    assert response.status_code == 200
+    complaint = response.get_json()['complaints'][0]
+    assert set(complaint) == {'_id', 'text', 'status'}
+    assert len(complaint['text']) < 500
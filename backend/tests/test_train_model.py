@@ -0,0 +1,50 @@
+from model_registry import complaint_label
+from train_model import csv_source, make_classifier, make_vectorizer, stream_fit, SEED_TRAINING_DATA
+
+CATEGORIES = ['billing', 'delivery', 'quality', 'service', 'technical']
+
+
+def _source(rows, chunk_size):
+    def stream():
+        for i in range(0, len(rows), chunk_size):
+            chunk = rows[i:i + chunk_size]
+            yield [t for t, _ in chunk], [l for _, l in chunk]
+    return stream
+
+
+def test_stream_fit_trains_in_chunks():
+    """Out-of-core fitting sees every chunk and keeps a bounded holdout"""
+    rows = [(text, label) for text, label in SEED_TRAINING_DATA] * 40
+    vectorizer, classifier = make_vectorizer(2 ** 12), make_classifier(alpha=1e-4, penalty='l2')
+    stats = {}
+    hold_texts, hold_labels = stream_fit(_source(rows, 17), vectorizer, classifier, CATEGORIES,
+                                         epochs=2, holdout_every=10, holdout_limit=5, stats=stats)
+    # Rows 0 and 10 of each 17-row chunk are held out (12 chunks), and never trained on
+    assert stats['rows'] == len(rows) - 24
+    assert len(hold_texts) == len(hold_labels) == 5
+    assert classifier.predict(vectorizer.transform(["I was charged twice"]))[0] == 'billing'
+
+
+def test_stream_fit_skips_unknown_labels():
+    rows = [("The quality is poor", 'quality'), ("whatever", 'not-a-category')] * 5
+    vectorizer, classifier = make_vectorizer(2 ** 10), make_classifier(alpha=1e-4, penalty='l2')
+    stats = {}
+    stream_fit(_source(rows, 4), vectorizer, classifier, CATEGORIES, stats=stats)
+    assert stats['skipped_unknown_label'] == 5
+
+
+def test_csv_source_reads_export_columns(tmp_path):
+    """The exported CSV layout (Text/Category) is picked up without flags"""
+    path = tmp_path / 'complaints.csv'
+    path.write_text('ID,Text,Category\n1,charged twice,billing\n2,box crushed,delivery\n3,,billing\n')
+    chunks = list(csv_source(str(path), 1)())
+    assert chunks == [(['charged twice'], ['billing']), (['box crushed'], ['delivery'])]
+
+
+def test_complaint_label():
+    """Feedback wins over a manual category; unconfirmed predictions have no label"""
+    assert complaint_label({'feedback_given': True, 'feedback_is_correct': False,
+                            'feedback_category': 'billing', 'ml_category': 'service'}) == 'billing'
+    assert complaint_label({'feedback_given': True, 'feedback_is_correct': True, 'ml_category': 'service'}) == 'service'
+    assert complaint_label({'is_manual_category': True, 'category': 'quality'}) == 'quality'
+    assert complaint_label({'ml_category': 'service'}) is None
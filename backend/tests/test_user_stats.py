@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta, timezone
+
+import mongomock
+
+import app as app_module
+from retention import CollectionArchive, archive_resolved
+from user_stats import UserStats, rebuild, stat_delta, sweep_breaches
+
+
+def test_stat_delta():
+    assert stat_delta(None, {'status': 'pending'}) == {'open': 1}
+    assert stat_delta({'status': 'pending'}, {'status': 'closed', 'sla_breached': True}) == \
+        {'open': -1, 'resolved': 1, 'breached': 1}
+    assert stat_delta({'status': 'resolved', 'sla_breached': True}, None) == {'resolved': -1, 'breached': -1}
+    assert stat_delta({'status': 'resolved'}, {'status': 'closed'}) == {}
+
+
+def test_counters_follow_create_update_delete(client, mock_db, auth_headers, monkeypatch):
+    monkeypatch.setattr(app_module.Config, 'SHED_MODE', 'off')
+    ids = []
+    for text in ("The package arrived broken", "Thanks for the quick refund", "Where is my order"):
+        response = client.post('/api/complaints', headers=auth_headers['testuser'], json={'text': text})
+        ids.append(response.get_json()['complaint']['_id'])
+    stats = lambda: client.get('/api/complaints/stats', headers=auth_headers['testuser']).get_json()
+    assert stats() == {'user': 'testuser', 'open': 3, 'resolved': 0, 'breached': 0}
+
+    # Resolved after its deadline: counted as breached once
+    mock_db['complaints'].update_one({'_id': app_module.ObjectId(ids[0])},
+                                     {'$set': {'sla_deadline': datetime.now(timezone.utc) - timedelta(hours=1)}})
+    client.put(f"/api/complaints/{ids[0]}", headers=auth_headers['admin'], json={'status': 'resolved'})
+    client.post('/api/complaints/bulk', headers=auth_headers['admin'], json={'ids': ids[:2], 'status': 'closed'})
+    assert stats() == {'user': 'testuser', 'open': 1, 'resolved': 2, 'breached': 1}
+
+    client.delete(f"/api/complaints/{ids[0]}", headers=auth_headers['admin'])
+    assert stats() == {'user': 'testuser', 'open': 1, 'resolved': 1, 'breached': 0}
+    assert client.get('/api/complaints/stats?user=testuser', headers=auth_headers['admin']).get_json()['open'] == 1
+    assert client.get('/api/complaints/stats?user=admin', headers=auth_headers['testuser']).status_code == 403
+
+    mine = client.get('/api/complaints?mine=true', headers=auth_headers['testuser']).get_json()
+    assert mine['total'] == 2
+    assert client.get('/api/complaints?mine=true', headers=auth_headers['admin']).get_json()['total'] == 0
+    assert client.get('/api/complaints?user=testuser', headers=auth_headers['admin']).get_json()['total'] == 2
+
+
+def test_sweep_flags_overdue_complaints_once_and_rebuild_agrees():
+    db = mongomock.MongoClient().db
+    past = datetime.now(timezone.utc) - timedelta(hours=1)
+    db.complaints.insert_many([
+        {'user': 'ann', 'status': 'pending', 'sla_deadline': past},
+        {'user': 'ann', 'status': 'in_progress', 'sla_deadline': past + timedelta(days=1)},
+        {'user': 'bob', 'status': 'pending', 'sla_deadline': past},
+        {'user': 'bob', 'status': 'resolved', 'sla_deadline': past},
+    ])
+    stats = UserStats(lambda: db.user_stats)
+    assert sweep_breaches(db.complaints, stats, batch_size=1) == 2
+    assert sweep_breaches(db.complaints, stats) == 0
+    assert stats.get('ann') == {'open': 0, 'resolved': 0, 'breached': 1}
+    assert rebuild(db.complaints, db.user_stats) == 2
+    assert stats.get('ann') == {'open': 2, 'resolved': 0, 'breached': 1}
+    assert stats.get('bob') == {'open': 1, 'resolved': 1, 'breached': 1}
+
+
+def test_rebuild_counts_archived_complaints():
+    db = mongomock.MongoClient().db
+    old = datetime.now(timezone.utc) - timedelta(days=400)
+    db.complaints.insert_many([
+        {'user': 'ann', 'status': 'resolved', 'sla_breached': True, 'created_at': old, 'updated_at': old},
+        {'user': 'ann', 'status': 'closed', 'created_at': old, 'updated_at': old},
+        {'user': 'ann', 'status': 'pending', 'created_at': old},
+    ])
+    stats = UserStats(lambda: db.user_stats)
+    stats.created(db.complaints.find())
+    archive = CollectionArchive(lambda: db.complaints_archive)
+    assert archive_resolved(db.complaints, archive, db.complaint_rollups, days=30)['archived'] == 2
+    assert rebuild(db.complaints, db.user_stats, archive) == 1
+    assert stats.get('ann') == {'open': 1, 'resolved': 2, 'breached': 1}
+
+
+def test_bulk_update_counts_from_the_pre_image(mock_db):
+    """A complaint resolved by someone else after the bulk update read it is counted from its real status"""
+    cid = mock_db['complaints'].insert_one({'user': 'ann', 'status': 'resolved'}).inserted_id
+    mock_db['user_stats'].insert_one({'_id': 'ann', 'open': 0, 'resolved': 1, 'breached': 0})
+    stale = [{'_id': cid, 'user': 'ann', 'status': 'pending'}]
+    counts = app_module.bulk_update(iter(stale), {'status': 'closed'}, {}, 'admin')
+    assert counts['matched'] == 1 and mock_db['complaints'].find_one()['status'] == 'closed'
+    assert app_module.user_stats.get('ann') == {'open': 0, 'resolved': 1, 'breached': 0}
+    assert mock_db['complaint_audit'].find_one()['previous'] == {'status': 'resolved'}
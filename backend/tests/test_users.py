@@ -0,0 +1,57 @@
+from werkzeug.security import check_password_hash
+
+
+def _seed_users(mock_db, names):
+    mock_db['users'].insert_many([{'username': name, 'password': 'x', 'role': 'user'} for name in names])
+
+
+def test_user_listing_pages_by_username(client, mock_db, auth_headers):
+    _seed_users(mock_db, ['carol', 'bob', 'dave', 'alice'])
+    first = client.get('/api/admin/users?limit=3', headers=auth_headers['admin']).get_json()
+    assert [u['username'] for u in first['users']] == ['admin', 'alice', 'bob']
+    assert all('password' not in u for u in first['users'])
+    second = client.get(f"/api/admin/users?limit=3&after={first['next']}", headers=auth_headers['admin']).get_json()
+    assert [u['username'] for u in second['users']] == ['carol', 'dave', 'testuser'] and second['next'] == 'testuser'
+    third = client.get(f"/api/admin/users?limit=3&after={second['next']}", headers=auth_headers['admin']).get_json()
+    assert third == {'users': [], 'next': None}
+
+
+def test_user_prefix_search(client, mock_db, auth_headers):
+    _seed_users(mock_db, ['acme.jo', 'acme.al', 'acmex', 'bcme'])
+    body = client.get('/api/admin/users?q=acme.&limit=1', headers=auth_headers['admin']).get_json()
+    assert [u['username'] for u in body['users']] == ['acme.al']
+    body = client.get(f"/api/admin/users?q=acme.&after={body['next']}", headers=auth_headers['admin']).get_json()
+    assert [u['username'] for u in body['users']] == ['acme.jo'] and body['next'] is None
+    assert client.get('/api/admin/users', headers=auth_headers['testuser']).status_code == 403
+
+
+def test_bulk_provision_and_deprovision(client, mock_db, auth_headers):
+    import app as app_module
+    app_module.ensure_indexes()
+    response = client.post('/api/admin/users/bulk', headers=auth_headers['admin'], json={'create': [
+        {'username': 'new1', 'password': 'pw1', 'tenant': 'acme'},
+        {'username': 'new2', 'password': 'pw2', 'role': 'admin'},
+        {'username': 'testuser', 'password': 'pw'},
+        {'username': 'new3'},
+        {'username': 'new1', 'password': 'again'},
+    ]})
+    assert response.get_json() == {'created': 2, 'existing': ['testuser'], 'invalid': ['new3', 'new1'], 'deleted': 0}
+    new1 = mock_db['users'].find_one({'username': 'new1'})
+    assert check_password_hash(new1['password'], 'pw1') and new1['tenant'] == 'acme'
+
+    response = client.post('/api/admin/users/bulk', headers=auth_headers['admin'],
+                           json={'delete': ['new1', 'new2', 'admin', 'ghost']})
+    assert response.get_json()['deleted'] == 2
+    assert mock_db['users'].find_one({'username': 'admin'})
+    assert client.post('/api/admin/users/bulk', headers=auth_headers['admin'], json={}).status_code == 400
+
+
+def test_bulk_size_is_capped_and_duplicate_usernames_do_not_block_startup(client, mock_db, auth_headers, capsys):
+    import app as app_module
+    entries = [{'username': f"u{i}", 'password': 'pw'} for i in range(app_module.Config.USER_BULK_MAX + 1)]
+    response = client.post('/api/admin/users/bulk', headers=auth_headers['admin'], json={'create': entries})
+    assert response.status_code == 400 and mock_db['users'].count_documents({}) == 2
+
+    _seed_users(mock_db, ['testuser'])
+    app_module.ensure_indexes()
+    assert 'duplicate usernames' in capsys.readouterr().out
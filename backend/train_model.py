@@ -1,10 +1,39 @@
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
-import joblib
+#!/usr/bin/env python3
+"""
+Train the complaint classifier and register it as a new model version.
+
+With no data source the model is bootstrapped from SEED_TRAINING_DATA
+(TF-IDF + logistic regression). Given a source, labelled complaints are
+streamed in chunks and fitted out of core with hashed features and
+mini-batch ``partial_fit``, so peak memory depends on --chunk-size rather
+than on the size of the corpus:
+
+    python train_model.py                                    # seed data
+    python train_model.py --mongo                            # MONGO_URI
+    python train_model.py --csv complaints.csv --search      # + grid search
+    python train_model.py --parquet complaints.parquet --epochs 2
+    python train_model.py --mongo --language es              # Spanish classifier
+"""
+
+import argparse
+import csv
+import itertools
 import os
+import resource
+import time
 
-# Sample training data (replace with your actual data)
-training_data = [
+import numpy as np
+from dotenv import load_dotenv
+from joblib import Parallel, delayed
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+
+from config import Config
+from languages import language_registry_dir
+from model_registry import ModelRegistry, complaint_label, in_holdout
+
+# Bootstrap data used when no labelled corpus is available
+SEED_TRAINING_DATA = [
     ("The product arrived damaged", "delivery"),
     ("The quality is poor", "quality"),
     ("I was charged twice", "billing"),
@@ -12,23 +41,303 @@ training_data = [
     ("The service was excellent", "service")
 ]
 
-# Prepare data
-texts = [text for text, _ in training_data]
-labels = [label for _, label in training_data]
+# Hyperparameter grid explored by --search
+SEARCH_GRID = {
+    'alpha': [1e-6, 1e-5, 1e-4],
+    'penalty': ['l2', 'elasticnet'],
+}
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if os.uname().sysname == 'Darwin' else rss / 1024
+
+
+# -- data sources ----------------------------------------------------------
+# Each source is a zero-argument callable returning a fresh iterator of
+# (texts, labels) chunks, so the corpus can be streamed more than once.
+
+def _chunked(pairs, chunk_size):
+    iterator = iter(pairs)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        texts, labels = zip(*chunk)
+        yield list(texts), list(labels)
+
+
+def mongo_source(uri, chunk_size, language=None, holdout_every=0, held_out=False):
+    """Labelled complaints in _id order; with ``holdout_every``, only the training rows
+    (or, with ``held_out``, only the held-out ones, see ``in_holdout``)"""
+    query = {'$or': [{'feedback_given': True}, {'is_manual_category': True}]}
+    if language:
+        # Complaints stored before language detection are in the default language
+        query['language'] = {'$in': [language, None]} if language == Config.DEFAULT_LANGUAGE else language
+
+    def stream():
+        from pymongo import MongoClient
+        client = MongoClient(uri)
+        try:
+            cursor = client.get_default_database().complaints.find(
+                query,
+                {'text': 1, 'category': 1, 'ml_category': 1, 'is_manual_category': 1,
+                 'feedback_given': 1, 'feedback_is_correct': 1, 'feedback_category': 1},
+            ).sort('_id', 1).batch_size(chunk_size)
+            if holdout_every:
+                cursor = (doc for doc in cursor if in_holdout(doc['_id'], holdout_every) == held_out)
+            pairs = ((doc.get('text'), complaint_label(doc)) for doc in cursor)
+            yield from _chunked(((t, l) for t, l in pairs if t and l), chunk_size)
+        finally:
+            client.close()
+    return stream
+
+
+def _pick_column(fieldnames, candidates):
+    for name in candidates:
+        if name in (fieldnames or ()):
+            return name
+    raise SystemExit(f"None of the columns {candidates} found; use --text-column/--label-column")
+
+
+def csv_source(path, chunk_size, text_column=None, label_column=None):
+    def stream():
+        with open(path, newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            text_col = text_column or _pick_column(reader.fieldnames, ('text', 'Text'))
+            label_col = label_column or _pick_column(reader.fieldnames, ('label', 'category', 'Category'))
+            pairs = ((row[text_col], row[label_col]) for row in reader if row.get(text_col) and row.get(label_col))
+            yield from _chunked(pairs, chunk_size)
+    return stream
+
+
+def parquet_source(path, chunk_size, text_column='text', label_column='label'):
+    def stream():
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit('Reading Parquet requires pyarrow (pip install pyarrow)')
+        parquet = pq.ParquetFile(path)
+        for batch in parquet.iter_batches(batch_size=chunk_size, columns=[text_column, label_column]):
+            columns = batch.to_pydict()
+            pairs = [(t, l) for t, l in zip(columns[text_column], columns[label_column]) if t and l]
+            if pairs:
+                texts, labels = zip(*pairs)
+                yield list(texts), list(labels)
+    return stream
+
+
+# -- training --------------------------------------------------------------
+
+def make_vectorizer(n_features):
+    # Stateless: no vocabulary to hold in memory, so it works out of core
+    return HashingVectorizer(n_features=n_features, alternate_sign=False, ngram_range=(1, 2), norm='l2')
+
+
+def make_classifier(alpha, penalty):
+    # log_loss keeps predict_proba available for confidence scores
+    return SGDClassifier(loss='log_loss', alpha=alpha, penalty=penalty, random_state=42)
+
+
+def split_holdout(texts, labels, every):
+    """Deterministically send every Nth row to the holdout set"""
+    train, holdout = ([], []), ([], [])
+    for i, (text, label) in enumerate(zip(texts, labels)):
+        target = holdout if every and i % every == 0 else train
+        target[0].append(text)
+        target[1].append(label)
+    return train, holdout
+
+
+def stream_fit(source, vectorizer, classifier, classes, epochs=1, holdout_every=0, holdout_limit=50000, stats=None):
+    """partial_fit over all chunks; returns a bounded (texts, labels) holdout set"""
+    class_set = set(classes)
+    classes = np.array(classes)
+    holdout_texts, holdout_labels = [], []
+    stats = stats if stats is not None else {}
+    for epoch in range(epochs):
+        for texts, labels in source():
+            (train_texts, train_labels), (hold_texts, hold_labels) = split_holdout(texts, labels, holdout_every)
+            keep = [i for i, label in enumerate(train_labels) if label in class_set]
+            stats['skipped_unknown_label'] = stats.get('skipped_unknown_label', 0) + len(train_labels) - len(keep)
+            if keep:
+                started = time.perf_counter()
+                X = vectorizer.transform([train_texts[i] for i in keep])
+                stats['vectorize_seconds'] = stats.get('vectorize_seconds', 0.0) + time.perf_counter() - started
+                started = time.perf_counter()
+                classifier.partial_fit(X, [train_labels[i] for i in keep], classes=classes)
+                stats['fit_seconds'] = stats.get('fit_seconds', 0.0) + time.perf_counter() - started
+                if epoch == 0:
+                    stats['rows'] = stats.get('rows', 0) + len(keep)
+            if epoch == 0 and len(holdout_texts) < holdout_limit:
+                room = holdout_limit - len(holdout_texts)
+                held = [(t, l) for t, l in zip(hold_texts, hold_labels) if l in class_set][:room]
+                holdout_texts.extend(t for t, _ in held)
+                holdout_labels.extend(l for _, l in held)
+            stats['peak_rss_mb'] = peak_rss_mb()
+    return holdout_texts, holdout_labels
+
+
+def accuracy(vectorizer, classifier, texts, labels):
+    if not texts:
+        return None
+    return float(np.mean(classifier.predict(vectorizer.transform(texts)) == np.array(labels)))
+
+
+def _score_params(params, sample, n_features, classes, epochs):
+    texts, labels = sample
+    vectorizer = make_vectorizer(n_features)
+    classifier = make_classifier(**params)
+    (train_texts, train_labels), (hold_texts, hold_labels) = split_holdout(texts, labels, 5)
+    X = vectorizer.transform(train_texts)
+    for _ in range(epochs):
+        classifier.partial_fit(X, train_labels, classes=np.array(classes))
+    return params, accuracy(vectorizer, classifier, hold_texts, hold_labels)
+
+
+def search_hyperparameters(source, sample_size, n_features, classes, epochs, n_jobs):
+    """Grid search on a bounded sample of the corpus, one candidate per core"""
+    texts, labels = [], []
+    for chunk_texts, chunk_labels in source():
+        for text, label in zip(chunk_texts, chunk_labels):
+            if label in classes:
+                texts.append(text)
+                labels.append(label)
+        if len(texts) >= sample_size:
+            break
+    sample = (texts[:sample_size], labels[:sample_size])
+    grid = [dict(zip(SEARCH_GRID, values)) for values in itertools.product(*SEARCH_GRID.values())]
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(_score_params)(params, sample, n_features, classes, epochs) for params in grid)
+    for params, score in results:
+        print(f"   {params} -> holdout accuracy {score}")
+    best, best_score = max(results, key=lambda r: -1 if r[1] is None else r[1])
+    return best, best_score, len(sample[0])
+
+
+def train_seed():
+    """Bootstrap model from SEED_TRAINING_DATA (TF-IDF + logistic regression)"""
+    texts = [text for text, _ in SEED_TRAINING_DATA]
+    labels = [label for _, label in SEED_TRAINING_DATA]
+    fit_started = time.perf_counter()
+    vectorizer = TfidfVectorizer()
+    X = vectorizer.fit_transform(texts)
+    model = LogisticRegression()
+    model.fit(X, labels)
+    fit_seconds = time.perf_counter() - fit_started
+    return model, vectorizer, texts, {'training_size': len(texts), 'fit_seconds': fit_seconds, 'source': 'seed'}
+
+
+def train_streaming(source, args, holdout_source=None):
+    classes = Config.CATEGORIES
+    params = {'alpha': args.alpha, 'penalty': args.penalty}
+    stats = {}
+    started = time.perf_counter()
+    if args.search:
+        print(f"🔎 Searching {len(list(itertools.product(*SEARCH_GRID.values())))} settings "
+              f"on up to {args.search_sample} rows...")
+        params, score, used = search_hyperparameters(
+            source, args.search_sample, args.n_features, classes, args.epochs, args.n_jobs)
+        stats.update(search_seconds=time.perf_counter() - started, search_rows=used, search_accuracy=score)
+        print(f"   best: {params}")
+
+    vectorizer = make_vectorizer(args.n_features)
+    classifier = make_classifier(**params)
+    # A source that already leaves out its holdout (Mongo) is fitted whole and scored on holdout_source
+    hold_texts, hold_labels = stream_fit(source, vectorizer, classifier, classes, epochs=args.epochs,
+                                         holdout_every=0 if holdout_source else args.holdout_every, stats=stats)
+    if holdout_source:
+        hold_texts, hold_labels = [], []
+        for texts, labels in holdout_source():
+            hold_texts.extend(texts)
+            hold_labels.extend(labels)
+            if len(hold_texts) >= 50000:
+                break
+        hold_texts, hold_labels = hold_texts[:50000], hold_labels[:50000]
+    stats['holdout_every'] = args.holdout_every
+    if not stats.get('rows'):
+        raise SystemExit('No labelled complaints found in the data source')
+    stats['total_seconds'] = time.perf_counter() - started
+    stats['holdout_rows'] = len(hold_texts)
+    stats['holdout_accuracy'] = accuracy(vectorizer, classifier, hold_texts, hold_labels)
+    stats['chunk_size'] = args.chunk_size
+    return classifier, vectorizer, hold_texts, {
+        'training_size': stats['rows'],
+        'fit_seconds': stats['fit_seconds'],
+        'hyperparameters': dict(params, n_features=args.n_features, epochs=args.epochs),
+        'training_stats': stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Train and register the complaint classifier')
+    source_group = parser.add_mutually_exclusive_group()
+    source_group.add_argument('--mongo', action='store_true', help='Stream labelled complaints from MongoDB')
+    source_group.add_argument('--csv', help='CSV with text and label/category columns (e.g. an export)')
+    source_group.add_argument('--parquet', help='Parquet file with text and label columns')
+    parser.add_argument('--mongo-uri', help='Defaults to MONGO_URI')
+    parser.add_argument('--text-column')
+    parser.add_argument('--label-column')
+    parser.add_argument('--chunk-size', type=int, default=50000, help='Rows per partial_fit batch')
+    parser.add_argument('--epochs', type=int, default=1, help='Passes over the corpus')
+    parser.add_argument('--n-features', type=int, default=2 ** 20, help='Hashed feature space size')
+    parser.add_argument('--alpha', type=float, default=1e-5)
+    parser.add_argument('--penalty', default='l2')
+    parser.add_argument('--search', action='store_true', help='Grid search hyperparameters on a sample first')
+    parser.add_argument('--search-sample', type=int, default=100000, help='Rows used by --search')
+    parser.add_argument('--n-jobs', type=int, default=-1, help='Parallel search workers (-1 = all cores)')
+    parser.add_argument('--holdout-every', type=int, default=Config.HOLDOUT_EVERY,
+                        help='Every Nth row is held out (0 = none); from Mongo, by complaint id')
+    parser.add_argument('--no-promote', action='store_true', help='Register as shadow candidate instead of serving it')
+    parser.add_argument('--language', help='Train the classifier for this language (its own registry)')
+    args = parser.parse_args()
+    load_dotenv()
+    language = args.language or Config.DEFAULT_LANGUAGE
+    holdout_source = None
+    if language != Config.DEFAULT_LANGUAGE and not (args.mongo or args.csv or args.parquet):
+        parser.error('the seed data is English; give --mongo, --csv or --parquet for other languages')
 
-# Create and train vectorizer
-vectorizer = TfidfVectorizer()
-X = vectorizer.fit_transform(texts)
+    if args.mongo:
+        uri = args.mongo_uri or os.getenv('MONGO_URI', 'mongodb://localhost:27017/complaint_system')
+        source, source_name = mongo_source(uri, args.chunk_size, args.language, args.holdout_every), 'mongo'
+        if args.holdout_every:
+            holdout_source = mongo_source(uri, args.chunk_size, args.language, args.holdout_every, held_out=True)
+    elif args.csv:
+        source = csv_source(args.csv, args.chunk_size, args.text_column, args.label_column)
+        source_name = f'csv:{os.path.basename(args.csv)}'
+    elif args.parquet:
+        source = parquet_source(args.parquet, args.chunk_size, args.text_column or 'text', args.label_column or 'label')
+        source_name = f'parquet:{os.path.basename(args.parquet)}'
+    else:
+        source = None
 
-# Create and train model
-model = LogisticRegression()
-model.fit(X, labels)
+    if source is None:
+        model, vectorizer, sample_texts, info = train_seed()
+    else:
+        model, vectorizer, sample_texts, info = train_streaming(source, args, holdout_source)
+        info['source'] = source_name
 
-# Create model directory if it doesn't exist
-os.makedirs('model', exist_ok=True)
+    if language == Config.DEFAULT_LANGUAGE:
+        registry = ModelRegistry()
+    else:
+        registry = ModelRegistry(language_registry_dir(Config.MODEL_REGISTRY_DIR, language))
+    extra = {key: info[key] for key in ('hyperparameters', 'training_stats') if key in info}
+    if args.mongo:
+        # Which complaints evaluate.py --mongo may score this version on
+        extra['holdout_every'] = args.holdout_every
+    version = registry.register(model, vectorizer, training_size=info['training_size'], fit_seconds=info['fit_seconds'],
+                                sample_texts=sample_texts, source=info['source'], extra=extra)
+    if args.no_promote:
+        registry.set_candidate(version)
+    else:
+        registry.promote(version)
+    stats = info.get('training_stats', {})
+    if stats:
+        print(f"   rows={stats['rows']} holdout_accuracy={stats['holdout_accuracy']} "
+              f"peak_rss={stats['peak_rss_mb']:.0f}MB total={stats['total_seconds']:.1f}s")
+    print(f"Model and vectorizer have been trained and registered as {version}!")
 
-# Save model and vectorizer
-joblib.dump(model, 'model/complaint_classifier.joblib')
-joblib.dump(vectorizer, 'model/vectorizer.joblib')
 
-print("Model and vectorizer have been trained and saved successfully!") 
\ No newline at end of file
+if __name__ == '__main__':
+    main()
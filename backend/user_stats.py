@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Per-user complaint counters, maintained incrementally.
+
+Each user has one ``user_stats`` document
+``{_id: username, open, resolved, breached}``. Readers fetch it by key
+instead of aggregating over ``complaints``. Create, update and delete apply
+``$inc`` deltas computed from the complaint before and after the change.
+
+* ``open``: status ``pending`` or ``in_progress``
+* ``resolved``: status ``resolved`` or ``closed``
+* ``breached``: complaints flagged ``sla_breached``
+
+A complaint is flagged when it is resolved after its SLA deadline. It is
+also flagged by the sweeper (``sweep_breaches``) once it is still open past
+its deadline. The flag is never cleared, so each complaint counts as
+breached at most once.
+
+Archiving (``retention.py``) moves resolved complaints out of
+``complaints`` without touching the counters, so they keep covering
+archived complaints; ``rebuild`` counts the archive too.
+
+Command line:
+
+    python user_stats.py rebuild    # recount from complaints and the archive (first deploy, or after drift)
+    python user_stats.py sweep      # flag overdue open complaints once
+"""
+
+import argparse
+import os
+from collections import Counter
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+from pymongo import UpdateOne
+
+OPEN_STATUSES = ('pending', 'in_progress')
+RESOLVED_STATUSES = ('resolved', 'closed')
+COUNTERS = ('open', 'resolved', 'breached')
+
+
+def status_bucket(status):
+    if status in OPEN_STATUSES:
+        return 'open'
+    if status in RESOLVED_STATUSES:
+        return 'resolved'
+    return None
+
+
+def _counts(doc):
+    counts = Counter()
+    if doc is not None:
+        bucket = status_bucket(doc.get('status'))
+        if bucket:
+            counts[bucket] += 1
+        if doc.get('sla_breached'):
+            counts['breached'] += 1
+    return counts
+
+
+def stat_delta(before, after):
+    """Counter changes for one complaint going from ``before`` to ``after`` (None = absent)"""
+    delta = Counter(_counts(after))
+    delta.subtract(_counts(before))
+    return {name: n for name, n in delta.items() if n}
+
+
+def _as_utc(value):
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def breached_on_resolve(before, changes, now):
+    """True when ``changes`` resolve an unflagged complaint after its deadline"""
+    deadline = before.get('sla_deadline')
+    return (status_bucket(changes.get('status')) == 'resolved' and not before.get('sla_breached')
+            and deadline is not None and now > _as_utc(deadline))
+
+
+class UserStats:
+    def __init__(self, get_collection):
+        self.get_collection = get_collection
+
+    def apply(self, changes):
+        """Apply ``[(user, before, after)]`` as one unordered bulk of per-user ``$inc``"""
+        per_user = {}
+        for user, before, after in changes:
+            if user is None:
+                continue
+            for name, n in stat_delta(before, after).items():
+                per_user.setdefault(user, Counter())[name] += n
+        updates = [UpdateOne({'_id': user}, {'$inc': {k: v for k, v in inc.items() if v}}, upsert=True)
+                   for user, inc in per_user.items() if any(inc.values())]
+        if updates:
+            self.get_collection().bulk_write(updates, ordered=False)
+
+    def created(self, docs):
+        self.apply([(doc.get('user'), None, doc) for doc in docs])
+
+    def deleted(self, docs):
+        self.apply([(doc.get('user'), doc, None) for doc in docs])
+
+    def get(self, user):
+        doc = self.get_collection().find_one({'_id': user}) or {}
+        return {name: doc.get(name, 0) for name in COUNTERS}
+
+
+def sweep_breaches(complaints, stats, now=None, batch_size=1000):
+    """Flag open complaints past their deadline and count them; returns how many were flagged.
+
+    Several workers may sweep at once: each batch is claimed with an
+    update_many that only matches unflagged complaints and stamps this
+    sweep's time, and only the complaints carrying that stamp are counted.
+    """
+    now = now or datetime.now(timezone.utc)
+    query = {'status': {'$in': list(OPEN_STATUSES)}, 'sla_deadline': {'$lt': now}, 'sla_breached': {'$ne': True}}
+    flagged = 0
+    while True:
+        batch = list(complaints.find(query, {'_id': 1}).limit(batch_size))
+        if not batch:
+            return flagged
+        ids = [doc['_id'] for doc in batch]
+        complaints.update_many(dict(query, _id={'$in': ids}), {'$set': {'sla_breached': True, 'sla_breached_at': now}})
+        claimed = list(complaints.find({'_id': {'$in': ids}, 'sla_breached_at': now}, {'user': 1}))
+        stats.apply([(doc.get('user'), {}, {'sla_breached': True}) for doc in claimed])
+        flagged += len(claimed)
+        if len(batch) < batch_size:
+            return flagged
+
+
+def _archived_counts(archive, complaints, batch_size=1000):
+    """Per-user counters of archived complaints that are not live again"""
+    per_user = {}
+
+    def add(batch):
+        live = {d['_id'] for d in complaints.find({'_id': {'$in': [doc['_id'] for doc in batch]}}, {'_id': 1})}
+        for doc in batch:
+            if doc['_id'] not in live and doc.get('user') is not None:
+                per_user.setdefault(doc['user'], Counter()).update(_counts(doc))
+
+    batch = []
+    for doc in archive.iter_all():
+        batch.append(doc)
+        if len(batch) == batch_size:
+            add(batch)
+            batch = []
+    if batch:
+        add(batch)
+    return per_user
+
+
+def rebuild(complaints, collection, archive=None):
+    """Recount every user's counters from the complaints collection (and the archive, which they keep counting)"""
+    pipeline = [{'$group': {
+        '_id': '$user',
+        'open': {'$sum': {'$cond': [{'$in': ['$status', list(OPEN_STATUSES)]}, 1, 0]}},
+        'resolved': {'$sum': {'$cond': [{'$in': ['$status', list(RESOLVED_STATUSES)]}, 1, 0]}},
+        'breached': {'$sum': {'$cond': [{'$eq': ['$sla_breached', True]}, 1, 0]}},
+    }}]
+    per_user = _archived_counts(archive, complaints) if archive is not None else {}
+    for row in complaints.aggregate(pipeline):
+        if row['_id'] is not None:
+            per_user.setdefault(row['_id'], Counter()).update({name: row[name] for name in COUNTERS})
+    collection.delete_many({'_id': {'$nin': list(per_user)}})
+    if per_user:
+        collection.bulk_write([UpdateOne({'_id': user}, {'$set': {name: counts[name] for name in COUNTERS}},
+                                         upsert=True) for user, counts in per_user.items()], ordered=False)
+    return len(per_user)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Maintain per-user complaint counters')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('rebuild')
+    sub.add_parser('sweep')
+    args = parser.parse_args()
+
+    load_dotenv()
+    from pymongo import MongoClient
+    from retention import make_archive
+    client = MongoClient(os.getenv('MONGO_URI', 'mongodb://localhost:27017/complaint_system'))
+    db = client.get_default_database()
+    if args.command == 'rebuild':
+        print(f"Rebuilt counters for {rebuild(db.complaints, db.user_stats, make_archive(db))} users")
+    else:
+        print(f"Flagged {sweep_breaches(db.complaints, UserStats(lambda: db.user_stats))} overdue complaints")
+
+
+if __name__ == '__main__':
+    main()
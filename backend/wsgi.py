@@ -0,0 +1,12 @@
+"""
+Production WSGI entry point.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+With ``preload_app`` the model, vectorizer and TextBlob corpora are loaded
+here once in the gunicorn master and shared copy-on-write with workers.
+"""
+
+from app import app, warm_up
+
+warm_up()
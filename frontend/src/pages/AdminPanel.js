@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useCallback } from "react";
 import {
   Box,
   Container,
@@ -27,19 +27,26 @@ import {
   CircularProgress,
   IconButton,
   Tooltip,
+  InputAdornment,
 } from "@mui/material";
 import {
   Add as AddIcon,
   Edit as EditIcon,
   Delete as DeleteIcon,
   Refresh as RefreshIcon,
+  Search as SearchIcon,
 } from "@mui/icons-material";
 import { toast } from "react-toastify";
 import api from "../api/axios";
 
+const PAGE_SIZE = 50;
+
 export const AdminPanel = () => {
   const [users, setUsers] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [search, setSearch] = useState("");
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState("");
   const [openDialog, setOpenDialog] = useState(false);
   const [selectedUser, setSelectedUser] = useState(null);
@@ -49,15 +56,15 @@ export const AdminPanel = () => {
     role: "user",
   });
 
-  useEffect(() => {
-    fetchUsers();
-  }, []);
-
-  const fetchUsers = async () => {
+  // Users come in pages ordered by username; "next" is the cursor for the following page
+  const fetchUsers = useCallback(async () => {
     setLoading(true);
     try {
-      const response = await api.get("/admin/users");
-      setUsers(response.data);
+      const response = await api.get("/admin/users", {
+        params: { q: search || undefined, limit: PAGE_SIZE },
+      });
+      setUsers(response.data.users);
+      setNextCursor(response.data.next);
       setError("");
     } catch (err) {
       setError(err.response?.data?.message || "Failed to fetch users");
@@ -65,6 +72,27 @@ export const AdminPanel = () => {
     } finally {
       setLoading(false);
     }
+  }, [search]);
+
+  useEffect(() => {
+    // Debounce the prefix search while typing
+    const timer = setTimeout(fetchUsers, 300);
+    return () => clearTimeout(timer);
+  }, [fetchUsers]);
+
+  const fetchMoreUsers = async () => {
+    setLoadingMore(true);
+    try {
+      const response = await api.get("/admin/users", {
+        params: { q: search || undefined, limit: PAGE_SIZE, after: nextCursor },
+      });
+      setUsers((prev) => [...prev, ...response.data.users]);
+      setNextCursor(response.data.next);
+    } catch (err) {
+      toast.error(err.response?.data?.message || "Failed to fetch users");
+    } finally {
+      setLoadingMore(false);
+    }
   };
 
   const handleOpenDialog = (user = null) => {
@@ -134,7 +162,7 @@ export const AdminPanel = () => {
     }
   };
 
-  if (loading) {
+  if (loading && users.length === 0 && !search) {
     return (
       <Box
         display="flex"
@@ -190,6 +218,22 @@ export const AdminPanel = () => {
                   </Box>
                 </Box>
 
+                <TextField
+                  fullWidth
+                  size="small"
+                  placeholder="Search by username prefix"
+                  value={search}
+                  onChange={(e) => setSearch(e.target.value)}
+                  sx={{ mb: 2 }}
+                  InputProps={{
+                    startAdornment: (
+                      <InputAdornment position="start">
+                        <SearchIcon />
+                      </InputAdornment>
+                    ),
+                  }}
+                />
+
                 <TableContainer component={Paper}>
                   <Table>
                     <TableHead>
@@ -233,6 +277,13 @@ export const AdminPanel = () => {
                     </TableBody>
                   </Table>
                 </TableContainer>
+                {nextCursor && (
+                  <Box sx={{ display: "flex", justifyContent: "center", mt: 2 }}>
+                    <Button onClick={fetchMoreUsers} disabled={loadingMore}>
+                      {loadingMore ? <CircularProgress size={20} /> : "Load more"}
+                    </Button>
+                  </Box>
+                )}
               </CardContent>
             </Card>
           </Grid>